@@ -0,0 +1,192 @@
+"""Server-side admission control
+
+An admission controller sits in front of a server, and queues
+incoming requests for processing by a fixed pool of worker threads.
+Each request is assigned to a request class, with each class having
+its own bounded queue, priority, and maximum queueing time.
+
+Requests are processed in priority order, so that (for example)
+safety-relevant actuator updates are not delayed behind bulk
+retrievals.  A request is rejected with `TooManyRequests` (and a
+retry hint) if its class queue is full, or if it has already spent
+longer than the maximum queueing time waiting to be processed.  A
+request whose deadline passes while it is queued is dropped.
+"""
+
+from collections import deque
+from concurrent.futures import Future
+from math import ceil
+from threading import Condition, Thread
+from time import monotonic
+from .message import Retrieve, Update, Response
+from .status import TooManyRequests, ServiceUnavailable, GatewayTimeout
+
+ACTUATOR = 'actuator'
+"""Request class for updates via the actuator interface"""
+
+WRITE = 'write'
+"""Request class for other state-changing requests"""
+
+READ = 'read'
+"""Request class for retrievals"""
+
+
+class RequestClass():
+    """A request class"""
+
+    def __init__(self, name, priority, capacity=256, max_wait=1.0):
+
+        self.name = name
+        """Request class name"""
+
+        self.priority = priority
+        """Priority (a lower value is a higher priority)"""
+
+        self.capacity = capacity
+        """Maximum number of queued requests"""
+
+        self.max_wait = max_wait
+        """Maximum queueing time (in seconds)"""
+
+        self.queue = deque()
+
+    def __repr__(self):
+        return '%s(%r, %r, capacity=%r, max_wait=%r)' % (
+            self.__class__.__name__, self.name, self.priority,
+            self.capacity, self.max_wait
+        )
+
+    def delay(self, now):
+        """Current queueing delay"""
+        return now - self.queue[0][0] if self.queue else 0
+
+
+def classify(msg):
+    """Default request classifier"""
+    if isinstance(msg, Update):
+        return ACTUATOR if msg.params.get('if') == 'oic.if.a' else WRITE
+    if isinstance(msg, Retrieve):
+        return READ
+    return WRITE
+
+
+class AdmissionController():
+    """An admission controller"""
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, server, workers=4, classes=None, classifier=classify):
+
+        self.server = server
+        """Server processing admitted requests"""
+
+        self.workers = workers
+        """Number of worker threads"""
+
+        if classes is None:
+            classes = [
+                RequestClass(ACTUATOR, 0, capacity=64, max_wait=1.0),
+                RequestClass(WRITE, 1, capacity=128, max_wait=0.5),
+                RequestClass(READ, 2, capacity=256, max_wait=0.25),
+            ]
+        self.classes = {x.name: x for x in classes}
+        """Request classes, indexed by name"""
+
+        self.classifier = classifier
+        """Request classifier"""
+
+        self.order = sorted(classes, key=lambda x: x.priority)
+        self.cond = Condition()
+        self.threads = []
+        self.running = False
+
+    def __repr__(self):
+        return '%s(%r, workers=%r)' % (self.__class__.__name__, self.server,
+                                       self.workers)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @staticmethod
+    def reject(msg, delay):
+        """Construct rejection response with retry hint"""
+        return Response(TooManyRequests, token=msg.token,
+                        retry_after=max(ceil(delay), 1))
+
+    def submit(self, msg):
+        """Submit request for processing
+
+        Returns a future that will be completed with the response.
+        """
+        future = Future()
+        reqclass = self.classes[self.classifier(msg)]
+        with self.cond:
+            if not self.running:
+                future.set_result(Response.empty(ServiceUnavailable,
+                                                 msg.token))
+            elif len(reqclass.queue) >= reqclass.capacity:
+                future.set_result(self.reject(msg, max(
+                    reqclass.delay(monotonic()), reqclass.max_wait
+                )))
+            else:
+                reqclass.queue.append((monotonic(), msg, future))
+                self.cond.notify()
+        return future
+
+    def dispatch(self, msg):
+        """Dispatch request message"""
+        return self.submit(msg).result()
+
+    def next(self):
+        """Wait for next request to process"""
+        with self.cond:
+            while True:
+                reqclass = next((x for x in self.order if x.queue), None)
+                if reqclass is not None:
+                    return (reqclass,) + reqclass.queue.popleft()
+                if not self.running:
+                    return None
+                self.cond.wait()
+
+    def work(self):
+        """Process requests until closed"""
+        while True:
+            item = self.next()
+            if item is None:
+                break
+            (reqclass, queued, msg, future) = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            waited = monotonic() - queued
+            if waited > reqclass.max_wait:
+                future.set_result(self.reject(msg, waited))
+                continue
+            if msg.expired:
+                future.set_result(Response.empty(GatewayTimeout, msg.token))
+                continue
+            try:
+                future.set_result(self.server.dispatch(msg))
+            except Exception as exc:  # pylint: disable=broad-except
+                future.set_exception(exc)
+
+    def start(self):
+        """Start worker threads"""
+        with self.cond:
+            self.running = True
+        self.threads = [Thread(target=self.work, daemon=True)
+                        for _ in range(self.workers)]
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def close(self):
+        """Stop worker threads (after draining queued requests)"""
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
@@ -0,0 +1,163 @@
+"""Compact binary encoding
+
+This is a simple tagged binary encoding of the same data model as the
+JSON representation (plus native UUIDs and byte strings), used for
+persistent storage and capture files.  Each value is encoded as a
+single tag byte followed by any value-specific data.  Lengths and
+counts are encoded as unsigned LEB128 variable-length integers.
+"""
+
+from collections.abc import Iterable, Mapping
+from datetime import date, time
+import struct
+from uuid import UUID
+
+INT = struct.Struct('<q')
+FLOAT = struct.Struct('<d')
+
+TAG_NONE = 0x00
+TAG_FALSE = 0x01
+TAG_TRUE = 0x02
+TAG_INT = 0x03
+TAG_FLOAT = 0x04
+TAG_STR = 0x05
+TAG_BYTES = 0x06
+TAG_UUID = 0x07
+TAG_LIST = 0x08
+TAG_MAP = 0x09
+
+
+class BinaryEncoder():
+    """Binary encoder"""
+
+    def encode(self, o):
+        """Encode value"""
+        out = bytearray()
+        self.encode_into(o, out)
+        return bytes(out)
+
+    @staticmethod
+    def encode_length(length, out):
+        """Encode length or count"""
+        while length > 0x7f:
+            out.append(0x80 | (length & 0x7f))
+            length >>= 7
+        out.append(length)
+
+    def encode_into(self, o, out):
+        """Encode value into buffer"""
+        # pylint: disable=too-many-branches
+        if o is None:
+            out.append(TAG_NONE)
+        elif o is True:
+            out.append(TAG_TRUE)
+        elif o is False:
+            out.append(TAG_FALSE)
+        elif isinstance(o, str):
+            data = o.encode()
+            out.append(TAG_STR)
+            self.encode_length(len(data), out)
+            out += data
+        elif isinstance(o, int):
+            out.append(TAG_INT)
+            out += INT.pack(o)
+        elif isinstance(o, float):
+            out.append(TAG_FLOAT)
+            out += FLOAT.pack(o)
+        elif isinstance(o, (bytes, bytearray, memoryview)):
+            out.append(TAG_BYTES)
+            self.encode_length(len(o), out)
+            out += o
+        elif isinstance(o, UUID):
+            out.append(TAG_UUID)
+            out += o.bytes
+        elif isinstance(o, Mapping):
+            out.append(TAG_MAP)
+            self.encode_length(len(o), out)
+            for key, value in o.items():
+                self.encode_into(key, out)
+                self.encode_into(value, out)
+        elif isinstance(o, (date, time)):
+            self.encode_into(o.isoformat(), out)
+        elif isinstance(o, Iterable):
+            items = list(o)
+            out.append(TAG_LIST)
+            self.encode_length(len(items), out)
+            for item in items:
+                self.encode_into(item, out)
+        else:
+            raise TypeError("Cannot encode %r" % o)
+
+
+class BinaryDecoder():
+    """Binary decoder"""
+
+    def decode(self, data):
+        """Decode value"""
+        (value, pos) = self.decode_from(data, 0)
+        if pos != len(data):
+            raise ValueError("Trailing data at offset %d" % pos)
+        return value
+
+    def decode_from(self, data, pos):
+        """Decode value from buffer at given offset
+
+        Returns the decoded value and the offset immediately following
+        the encoded value.  The buffer may be any object supporting
+        indexing and slicing (such as `bytes` or `mmap`).
+        """
+        # pylint: disable=too-many-return-statements,too-many-branches
+        tag = data[pos]
+        pos += 1
+        if tag == TAG_STR:
+            length = data[pos]
+            pos += 1
+            if length & 0x80:
+                (length, pos) = self.decode_length(data, pos - 1)
+            end = pos + length
+            return (data[pos:end].decode(), end)
+        if tag == TAG_MAP:
+            (count, pos) = self.decode_length(data, pos)
+            value = {}
+            decode_from = self.decode_from
+            for _ in range(count):
+                (key, pos) = decode_from(data, pos)
+                (value[key], pos) = decode_from(data, pos)
+            return (value, pos)
+        if tag == TAG_TRUE:
+            return (True, pos)
+        if tag == TAG_FALSE:
+            return (False, pos)
+        if tag == TAG_INT:
+            return (INT.unpack_from(data, pos)[0], pos + INT.size)
+        if tag == TAG_FLOAT:
+            return (FLOAT.unpack_from(data, pos)[0], pos + FLOAT.size)
+        if tag == TAG_LIST:
+            (count, pos) = self.decode_length(data, pos)
+            value = []
+            decode_from = self.decode_from
+            for _ in range(count):
+                (item, pos) = decode_from(data, pos)
+                value.append(item)
+            return (value, pos)
+        if tag == TAG_NONE:
+            return (None, pos)
+        if tag == TAG_UUID:
+            return (UUID(bytes=bytes(data[pos:pos + 16])), pos + 16)
+        if tag == TAG_BYTES:
+            (length, pos) = self.decode_length(data, pos)
+            return (bytes(data[pos:pos + length]), pos + length)
+        raise ValueError("Invalid tag %#02x at offset %d" % (tag, pos - 1))
+
+    @staticmethod
+    def decode_length(data, pos):
+        """Decode length or count"""
+        length = 0
+        shift = 0
+        while True:
+            byte = data[pos]
+            pos += 1
+            length |= (byte & 0x7f) << shift
+            if not byte & 0x80:
+                return (length, pos)
+            shift += 7
@@ -0,0 +1,191 @@
+"""Serialised representation cache
+
+A representation cache holds the encoded response content for
+retrievals of hosted resources, indexed by resource, interface, and
+content format, so that repeated retrievals of an unchanged resource
+need neither reconstruct nor re-encode its representation.
+
+Cached content is invalidated precisely via change tracking: a change
+to any property visible through an interface invalidates only the
+representations retrieved through that interface.  The total size of
+cached content is bounded by a byte budget, with the least recently
+used representations being evicted first.
+
+Only resources whose representation is determined entirely by their
+tracked state may be cached: a resource that overrides `load` (to
+read values from elsewhere), or whose state does not support change
+tracking, is always retrieved directly.  Resources constructed on
+demand (see `Server.route`) are never cached, since each retrieval
+would construct a new resource.
+
+Change tracking callbacks are registered only once per property of
+each cached resource, and the cache holds only weak references to
+resources other than those with cached content.
+"""
+
+from collections import OrderedDict
+from threading import Lock
+from weakref import WeakKeyDictionary, ref
+from .content import APPLICATION_JSON, ContentFormats
+from .interface import Interfaces
+from .profile import phase
+from .resource import Resource
+
+
+class CacheWatch():
+    """Change tracking state for a cached resource"""
+
+    __slots__ = ['names', 'intfs', 'generations']
+
+    def __init__(self):
+
+        self.names = set()
+        """Tracked property names"""
+
+        self.intfs = set()
+        """Interfaces for which all visible properties are tracked"""
+
+        self.generations = {}
+        """Invalidation count for each interface"""
+
+
+class RepresentationCache():
+    """A serialised representation cache"""
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, budget=16 * 1024 * 1024,
+                 content_type=APPLICATION_JSON):
+
+        self.budget = budget
+        """Maximum total size of cached content (in bytes)"""
+
+        self.content_type = content_type
+        """Default content format"""
+
+        self.size = 0
+        """Current total size of cached content (in bytes)"""
+
+        self.hits = 0
+        """Number of cache hits"""
+
+        self.misses = 0
+        """Number of cache misses"""
+
+        self.entries = OrderedDict()
+        self.watches = WeakKeyDictionary()
+        self.content_types = set()
+        self.lock = Lock()
+        self.watching = Lock()
+
+    def __repr__(self):
+        return '%s(budget=%r, content_type=%r)' % (
+            self.__class__.__name__, self.budget, self.content_type
+        )
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def cacheable(resource, params):
+        """Check if retrieval may be cached"""
+        return (type(resource).load is Resource.load and
+                hasattr(resource.state, 'track') and
+                all(x == 'if' for x in params) and
+                str(params.get('if', resource.default_intf)) in Interfaces)
+
+    def watch(self, resource, intf):
+        """Track changes to properties visible via an interface"""
+        with self.watching:
+            watch = self.watches.get(resource)
+            if watch is None:
+                watch = self.watches[resource] = CacheWatch()
+                self.track(resource, watch, 'rt')
+            if intf in watch.intfs:
+                return watch
+            visible = Interfaces[intf].visible
+            meta = resource.rt
+            for name in meta:
+                if (name != 'rt' and name not in watch.names and
+                        visible(meta[name])):
+                    self.track(resource, watch, name)
+            watch.intfs.add(intf)
+            return watch
+
+    def track(self, resource, watch, name):
+        """Register change tracking callback for a property"""
+        weak = ref(resource)
+        watch.names.add(name)
+        resource.state.track(name, lambda: self.changed(weak(), name))
+
+    def changed(self, resource, name):
+        """Invalidate representations affected by a property change"""
+        watch = self.watches.get(resource)
+        if watch is None:
+            return
+        if name == 'rt':
+            # Visible properties may differ for the new resource type
+            with self.watching:
+                intfs = list(watch.generations)
+                watch.intfs.clear()
+        else:
+            meta = resource.rt
+            intfs = [x for x in list(watch.generations)
+                     if name not in meta or Interfaces[x].visible(meta[name])]
+        for intf in intfs:
+            self.invalidate(resource, intf)
+
+    def invalidate(self, resource, intf):
+        """Invalidate cached representations"""
+        with self.lock:
+            watch = self.watches.get(resource)
+            if watch is not None:
+                watch.generations[intf] = watch.generations.get(intf, 0) + 1
+            for content_type in self.content_types:
+                content = self.entries.pop((resource, intf, content_type),
+                                           None)
+                if content is not None:
+                    self.size -= len(content)
+
+    def get(self, resource, params, retrieve=None, content_type=None):
+        """Get encoded representation
+
+        The representation is retrieved (using ``retrieve``, if
+        specified) and cached if not already present.  Returns None if
+        the retrieval may not be cached.
+        """
+        if not self.cacheable(resource, params):
+            return None
+        intf = str(params.get('if', resource.default_intf))
+        if content_type is None:
+            content_type = self.content_type
+        key = (resource, intf, content_type)
+        with self.lock:
+            content = self.entries.get(key)
+            if content is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return content
+            self.misses += 1
+        watch = self.watch(resource, intf)
+        with self.lock:
+            generation = watch.generations.setdefault(intf, 0)
+        state = (retrieve() if retrieve is not None else
+                 resource.retrieve(params))
+        with phase('encode'):
+            content = ContentFormats[content_type].encode(state)
+        with self.lock:
+            if (len(content) <= self.budget and key not in self.entries and
+                    watch.generations[intf] == generation):
+                self.entries[key] = content
+                self.content_types.add(content_type)
+                self.size += len(content)
+                while self.size > self.budget:
+                    self.size -= len(self.entries.popitem(last=False)[1])
+        return content
+
+    def clear(self):
+        """Discard all cached representations"""
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
@@ -0,0 +1,307 @@
+"""Traffic capture
+
+A recorder captures each request sent via an endpoint (i.e. each
+message passed to a transport), together with its response status and
+timing, in a compact binary capture file.  Each record holds the
+request method, endpoint, URI, query parameters, and resource state
+(in the compact binary encoding), followed by the response status,
+the time at which the request was sent (relative to the start of the
+capture), and the time taken to receive the response (or, for a
+streamed response, the response headers).  A request that fails in
+the transport (e.g. because the connection is refused) is captured
+with a gateway status (see `failure`).
+
+Capturing is enabled only while a recorder is installed.  Otherwise
+the cost is a single check per request.  Records are encoded by the
+sending thread and appended to a large write buffer, so that capturing
+is cheap enough to leave enabled at full production rates.  Since
+production traffic tends to repeat the same few methods, endpoints,
+and URIs, the encoding of each such combination is cached.
+
+As in the persistent resource store, each record carries a length and
+a CRC32 checksum, so that a record left partially written (by a crash
+during capture) is detected and ignored.  A capture file is
+memory-mapped and decoded one record at a time, so that even a very
+large capture may be read without loading it into memory.
+
+Captured traffic may be reissued via a `Replayer`.
+"""
+
+import mmap
+import struct
+from threading import Lock
+from time import monotonic, time_ns
+from zlib import crc32
+from .binary import BinaryEncoder, BinaryDecoder, TAG_LIST
+from .message import RequestTypes
+from .status import (Status, StatusCode, StatusException, BadGateway,
+                     GatewayTimeout)
+
+CAPTURE_HEADER = struct.Struct('<4sIQ')
+"""Capture file header (magic, version, start time in nanoseconds)"""
+
+CAPTURE_MAGIC = b'IOTC'
+
+RECORD_HEADER = struct.Struct('<II')
+"""Capture record header (length, CRC32)"""
+
+RECORD = struct.Struct('<QIH')
+"""Capture record timing and status (offset and duration in
+microseconds, status code)"""
+
+VERSION = 1
+
+NO_PARAMS = bytes((TAG_LIST, 0))
+"""Encoded empty query parameter list"""
+
+_recorder = None
+
+
+def set_recorder(recorder):
+    """Install recorder (or None to disable), returning the old one"""
+    global _recorder  # pylint: disable=global-statement
+    (old, _recorder) = (_recorder, recorder)
+    return old
+
+
+def recorder():
+    """Get installed recorder (if any)"""
+    return _recorder
+
+
+def failure(exc):
+    """Determine status representing a failed request (if any)
+
+    A transport failure (such as a refused connection or a socket
+    timeout) is represented as a gateway failure status.
+    """
+    if isinstance(exc, StatusException):
+        return type(exc)
+    if isinstance(exc, TimeoutError):
+        return GatewayTimeout
+    if isinstance(exc, OSError):
+        return BadGateway
+    return None
+
+
+class CaptureRecord():
+    """A captured request"""
+
+    __slots__ = ('offset', 'duration', 'status', 'method', 'ep', 'uri',
+                 'params', 'state')
+
+    def __init__(self, offset, duration, status, method, ep, uri,
+                 params=(), state=None):
+        # pylint: disable=too-many-arguments
+
+        self.offset = offset
+        """Time at which request was sent (in seconds since start)"""
+
+        self.duration = duration
+        """Time taken to receive response (in seconds)"""
+
+        self.status = status
+        """Response status"""
+
+        self.method = method
+        """Request method"""
+
+        self.ep = ep
+        """Endpoint URI"""
+
+        self.uri = uri
+        """Request URI"""
+
+        self.params = params
+        """Query parameters (as a list of ``(name, value)`` pairs)"""
+
+        self.state = state
+        """Request resource state data (if any)"""
+
+    def __repr__(self):
+        return '%s(%r, %r, %r, %s)' % (self.__class__.__name__, self.method,
+                                       self.ep, self.uri, self.status)
+
+    def request(self):
+        """Construct request message"""
+        return RequestTypes[self.method](self.uri, self.state,
+                                         params=self.params)
+
+
+class Recorder():
+    """A traffic recorder
+
+    A recorder may be used as a context manager, in which case it is
+    installed (and captures all requests sent via any endpoint) for
+    the duration of the context.
+    """
+
+    encoder = BinaryEncoder()
+
+    def __init__(self, path, buffering=1024 * 1024, max_prefixes=4096):
+
+        self.path = path
+        """Capture file path"""
+
+        self.max_prefixes = max_prefixes
+        """Maximum number of cached encoded (method, endpoint, URI)"""
+
+        self.count = 0
+        """Number of captured requests"""
+
+        self.lock = Lock()
+        self.previous = None
+        self.prefixes = {}
+        self.file = open(path, 'wb', buffering=buffering)
+        self.file.write(CAPTURE_HEADER.pack(CAPTURE_MAGIC, VERSION,
+                                            time_ns()))
+        self.start = monotonic()
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.path)
+
+    def __enter__(self):
+        self.previous = set_recorder(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        set_recorder(self.previous)
+        self.close()
+
+    def send(self, ep, msg, transport, timeout):
+        """Send message via endpoint, capturing the request"""
+        return self.call(ep, msg, ep.send, msg, transport, timeout)
+
+    def stream(self, ep, msg, transport, timeout):
+        """Send message via endpoint, capturing the streamed request"""
+        return self.call(ep, msg, transport.stream, ep, msg,
+                         timeout=timeout)
+
+    def call(self, ep, msg, func, *args, **kwargs):
+        """Call function to send message, capturing the request"""
+        start = monotonic()
+        try:
+            rsp = func(*args, **kwargs)
+        except (StatusException, OSError) as exc:
+            status = failure(exc)
+            if status is not None:
+                self.record(ep.uri, msg, status, start, monotonic())
+            raise
+        self.record(ep.uri, msg, rsp.status, start, monotonic())
+        return rsp
+
+    def record(self, ep, msg, status, start, end):
+        """Capture request"""
+        # pylint: disable=too-many-arguments
+        key = (msg.method, ep, msg.uri)
+        prefix = self.prefixes.get(key)
+        if prefix is None:
+            if len(self.prefixes) >= self.max_prefixes:
+                self.prefixes.clear()
+            prefix = self.prefixes.setdefault(key, b''.join(
+                self.encoder.encode(x) for x in key
+            ))
+        record = bytearray(RECORD.pack(
+            max(round((start - self.start) * 1e6), 0),
+            min(round((end - start) * 1e6), 0xffffffff), status.code,
+        ))
+        record += prefix
+        if msg.params:
+            self.encoder.encode_into(list(msg.params.items()), record)
+        else:
+            record += NO_PARAMS
+        state = msg.state
+        self.encoder.encode_into(state.data if state is not None else None,
+                                 record)
+        header = RECORD_HEADER.pack(len(record), crc32(record))
+        with self.lock:
+            if self.file.closed:
+                return
+            self.file.write(header)
+            self.file.write(record)
+            self.count += 1
+
+    def flush(self):
+        """Flush captured requests to disk"""
+        with self.lock:
+            self.file.flush()
+
+    def close(self):
+        """Close capture file"""
+        with self.lock:
+            self.file.close()
+
+
+class Capture():
+    """A traffic capture file
+
+    A capture may be used as a context manager, in which case the file
+    is unmapped on leaving the context.
+    """
+
+    decoder = BinaryDecoder()
+
+    def __init__(self, path):
+
+        self.path = path
+        """Capture file path"""
+
+        try:
+            with open(path, 'rb') as f:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as exc:
+            # Empty files cannot be mapped
+            raise ValueError("Invalid capture %s" % path) from exc
+        if len(self.data) < CAPTURE_HEADER.size:
+            self.close()
+            raise ValueError("Invalid capture %s" % path)
+        (magic, version, started) = CAPTURE_HEADER.unpack_from(self.data, 0)
+        if magic != CAPTURE_MAGIC or version != VERSION:
+            self.close()
+            raise ValueError("Invalid capture %s" % path)
+
+        self.started = started / 1e9
+        """Wall clock time at which capture started"""
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __iter__(self):
+        data = self.data
+        pos = CAPTURE_HEADER.size
+        while pos + RECORD_HEADER.size <= len(data):
+            (length, crc) = RECORD_HEADER.unpack_from(data, pos)
+            start = pos + RECORD_HEADER.size
+            record = data[start:start + length]
+            if len(record) != length or crc32(record) != crc:
+                # Discard any partially written record
+                break
+            (offset, duration, code) = RECORD.unpack_from(record, 0)
+            fields = []
+            field = RECORD.size
+            while field < length:
+                (value, field) = self.decoder.decode_from(record, field)
+                fields.append(value)
+            if len(fields) != 5:
+                raise ValueError("Invalid capture record at offset %d" %
+                                 start)
+            (method, ep, uri, params, state) = fields
+            yield CaptureRecord(offset / 1e6, duration / 1e6,
+                                Status(StatusCode(code)), method, ep, uri,
+                                [tuple(x) for x in params], state)
+            pos = start + length
+
+    def records(self):
+        """List captured requests"""
+        return list(self)
+
+    def close(self):
+        """Unmap capture file"""
+        self.data.close()
+
@@ -0,0 +1,285 @@
+"""CoAP mapping
+
+This provides encoding and decoding of CoAP messages (as defined in
+RFC 7252), and the mapping between CoAP messages and OCF messages.
+OCF status codes use the same encoding as CoAP response codes.
+"""
+
+import struct
+from time import monotonic
+from . import status
+from .content import APPLICATION_JSON
+from .message import Create, Retrieve, Update, Delete, Notify, Response
+from .trace import OPTION_TIMEOUT, OPTION_TRACEPARENT, TraceContext
+from .transport import Transport
+
+VERSION = 1
+
+CON = 0
+"""Confirmable message"""
+
+NON = 1
+"""Non-confirmable message"""
+
+ACK = 2
+"""Acknowledgement message"""
+
+RST = 3
+"""Reset message"""
+
+GET = 0x01
+POST = 0x02
+PUT = 0x03
+DELETE = 0x04
+
+OPTION_OBSERVE = 6
+OPTION_URI_PATH = 11
+OPTION_CONTENT_FORMAT = 12
+OPTION_MAX_AGE = 14
+OPTION_URI_QUERY = 15
+OPTION_ACCEPT = 17
+
+FORMAT_JSON = 50
+"""Content format number for ``application/json``"""
+
+PAYLOAD_MARKER = 0xff
+
+HEADER = struct.Struct('!BBH')
+"""Message header (version/type/token length, code, message ID)"""
+
+
+class CoapMessage():
+    """A CoAP message"""
+
+    # pylint: disable=too-many-arguments
+
+    def __init__(self, code, mtype=NON, mid=0, token=b'', options=(),
+                 payload=b''):
+
+        self.code = code
+        """Request method or response status code"""
+
+        self.mtype = mtype
+        """Message type"""
+
+        self.mid = mid
+        """Message ID"""
+
+        self.token = token
+        """Token"""
+
+        self.options = sorted(options, key=lambda x: x[0])
+        """Options, as a list of (number, value) tuples"""
+
+        self.payload = payload
+        """Payload"""
+
+    def __repr__(self):
+        return '%s(%#04x, mtype=%r, mid=%r, token=%r, options=%r%s)' % (
+            self.__class__.__name__, self.code, self.mtype, self.mid,
+            self.token, self.options,
+            ', payload=%r' % self.payload if self.payload else ''
+        )
+
+    @staticmethod
+    def uint(value):
+        """Encode unsigned integer option value"""
+        return value.to_bytes((value.bit_length() + 7) // 8, 'big')
+
+    def option(self, number, default=None):
+        """Get first value of option"""
+        return next((v for n, v in self.options if n == number), default)
+
+    def option_values(self, number):
+        """Get all values of option"""
+        return [v for n, v in self.options if n == number]
+
+    def add_option(self, number, value):
+        """Add option"""
+        if isinstance(value, int):
+            value = self.uint(value)
+        elif isinstance(value, str):
+            value = value.encode()
+        self.options.append((number, value))
+        self.options.sort(key=lambda x: x[0])
+
+    @property
+    def uri(self):
+        """URI path"""
+        return '/' + '/'.join(x.decode()
+                              for x in self.option_values(OPTION_URI_PATH))
+
+    @uri.setter
+    def uri(self, value):
+        self.options = [x for x in self.options if x[0] != OPTION_URI_PATH]
+        for segment in value.strip('/').split('/'):
+            if segment:
+                self.add_option(OPTION_URI_PATH, segment)
+
+    @property
+    def query(self):
+        """URI query parameters, as a list of (name, value) tuples"""
+        return [tuple(x.decode().partition('=')[::2])
+                for x in self.option_values(OPTION_URI_QUERY)]
+
+    @query.setter
+    def query(self, value):
+        self.options = [x for x in self.options if x[0] != OPTION_URI_QUERY]
+        for name, val in value:
+            self.add_option(OPTION_URI_QUERY, '%s=%s' % (name, val))
+
+    @property
+    def content_format(self):
+        """Content format"""
+        value = self.option(OPTION_CONTENT_FORMAT)
+        return None if value is None else int.from_bytes(value, 'big')
+
+    @staticmethod
+    def encode_nibble(value):
+        """Encode option delta or length nibble and extension"""
+        if value < 13:
+            return (value, b'')
+        if value < 269:
+            return (13, bytes((value - 13,)))
+        return (14, struct.pack('!H', value - 269))
+
+    def encode(self):
+        """Encode message"""
+        out = bytearray(HEADER.pack((VERSION << 6) | (self.mtype << 4) |
+                                    len(self.token), self.code, self.mid))
+        out += self.token
+        previous = 0
+        for number, value in self.options:
+            (delta, delta_ext) = self.encode_nibble(number - previous)
+            (length, length_ext) = self.encode_nibble(len(value))
+            out.append((delta << 4) | length)
+            out += delta_ext + length_ext + value
+            previous = number
+        if self.payload:
+            out.append(PAYLOAD_MARKER)
+            out += self.payload
+        return bytes(out)
+
+    @staticmethod
+    def decode_nibble(value, data, pos):
+        """Decode option delta or length nibble and extension"""
+        if value == 13:
+            return (data[pos] + 13, pos + 1)
+        if value == 14:
+            return (struct.unpack_from('!H', data, pos)[0] + 269, pos + 2)
+        if value == 15:
+            raise ValueError("Invalid option nibble")
+        return (value, pos)
+
+    @classmethod
+    def decode(cls, data):
+        """Decode message"""
+        (first, code, mid) = HEADER.unpack_from(data, 0)
+        if first >> 6 != VERSION:
+            raise ValueError("Unsupported CoAP version")
+        tkl = first & 0x0f
+        pos = HEADER.size
+        token = bytes(data[pos:pos + tkl])
+        pos += tkl
+        options = []
+        number = 0
+        payload = b''
+        while pos < len(data):
+            byte = data[pos]
+            pos += 1
+            if byte == PAYLOAD_MARKER:
+                payload = bytes(data[pos:])
+                break
+            (delta, pos) = cls.decode_nibble(byte >> 4, data, pos)
+            (length, pos) = cls.decode_nibble(byte & 0x0f, data, pos)
+            number += delta
+            options.append((number, bytes(data[pos:pos + length])))
+            pos += length
+        return cls(code, mtype=(first >> 4) & 0x03, mid=mid, token=token,
+                   options=options, payload=payload)
+
+
+class CoapTransport(Transport):
+    """A CoAP transport"""
+    # pylint: disable=abstract-method
+
+    METHOD_MAP = {
+        Create.method: POST,
+        Retrieve.method: GET,
+        Update.method: POST,
+        Delete.method: DELETE,
+        Notify.method: POST,
+    }
+    """Map from OCF method to CoAP method"""
+
+    REQUEST_MAP = {
+        GET: Retrieve,
+        POST: Update,
+        PUT: Create,
+        DELETE: Delete,
+    }
+    """Map from CoAP method to OCF request type"""
+
+    @classmethod
+    def request_message(cls, msg, mtype=NON, mid=0):
+        """Construct CoAP request message from OCF request"""
+        coap = CoapMessage(cls.METHOD_MAP[msg.method], mtype=mtype, mid=mid,
+                           token=msg.token or b'')
+        coap.uri = msg.uri
+        coap.query = msg.params.items()
+        if msg.state is not None:
+            coap.add_option(OPTION_CONTENT_FORMAT, FORMAT_JSON)
+            coap.payload = msg.encode()
+        coap.add_option(OPTION_ACCEPT, FORMAT_JSON)
+        if msg.trace is not None:
+            coap.add_option(OPTION_TRACEPARENT, msg.trace.encode())
+        if msg.deadline is not None:
+            coap.add_option(OPTION_TIMEOUT,
+                            max(int(msg.remaining() * 1000), 0))
+        return coap
+
+    @classmethod
+    def request(cls, coap):
+        """Construct OCF request from CoAP request message"""
+        reqtype = cls.REQUEST_MAP.get(coap.code)
+        if reqtype is None:
+            raise status.MethodNotAllowed("Unsupported method %#04x" %
+                                          coap.code)
+        if coap.payload and coap.content_format != FORMAT_JSON:
+            raise status.UnsupportedContentFormat
+        timeout = coap.option(OPTION_TIMEOUT)
+        return reqtype(coap.uri, content=(coap.payload or None),
+                       content_type=APPLICATION_JSON, token=coap.token,
+                       params=coap.query,
+                       trace=TraceContext.decode(
+                           coap.option(OPTION_TRACEPARENT)
+                       ),
+                       deadline=(monotonic() +
+                                 int.from_bytes(timeout, 'big') / 1000
+                                 if timeout is not None else None))
+
+    @classmethod
+    def response_message(cls, rsp, mtype=NON, mid=0):
+        """Construct CoAP response message from OCF response"""
+        coap = CoapMessage(rsp.status.code, mtype=mtype, mid=mid,
+                           token=rsp.token or b'')
+        if rsp.retry_after is not None:
+            coap.add_option(OPTION_MAX_AGE, int(rsp.retry_after + 0.5))
+        if rsp.state is not None:
+            coap.add_option(OPTION_CONTENT_FORMAT, FORMAT_JSON)
+            coap.payload = rsp.encode()
+        return coap
+
+    @classmethod
+    def response(cls, coap):
+        """Construct OCF response from CoAP response message"""
+        content = (coap.payload
+                   if coap.payload and coap.content_format == FORMAT_JSON
+                   else None)
+        max_age = coap.option(OPTION_MAX_AGE)
+        stat = status.Status(status.StatusCode(coap.code))
+        # Max-Age on a failure response indicates when to retry
+        retry_after = (int.from_bytes(max_age, 'big')
+                       if max_age is not None and not stat.success else None)
+        return Response(stat, content=content, content_type=APPLICATION_JSON,
+                        token=coap.token, retry_after=retry_after)
@@ -0,0 +1,214 @@
+"""Compact resources
+
+A compact resource is a memory-optimised resource representation,
+intended for gateways hosting very large numbers of (typically
+simulated) resources:
+
+* resource and state objects are slotted,
+
+* state values are held in a flat list, indexed via a key layout that
+  is shared between all states constructed with the same keys (in
+  the manner of CPython's key-sharing instance dictionaries), so that
+  resources of the same type share a single layout,
+
+* property names and ``rt``/``if`` values are interned, and identical
+  ``rt``/``if`` values are shared as a single tuple,
+
+* change-tracking tables are allocated only when first used, and
+
+* resource type classes are cached per distinct ``rt`` value rather
+  than per resource.
+
+A compact binary switch resource (with ``rt``, ``if``, ``n`` and
+``value`` properties) occupies approximately 270 bytes (including its
+name string), compared with approximately 870 bytes for a standard
+`Resource`.
+"""
+
+from collections import defaultdict
+from collections.abc import MutableMapping
+from sys import intern
+from .json import JSONEncoder
+from .resource import Resource
+from .rt import ResourceType
+
+Missing = object()
+
+INTERNED_VALUES = frozenset(('rt', 'if'))
+"""Properties with interned (and shared) values"""
+
+Layouts = {}
+"""Registry of shared state layouts"""
+
+Values = {}
+"""Registry of shared ``rt``/``if`` values"""
+
+ResourceTypeClasses = {}
+"""Cache of resource type classes, indexed by ``rt`` value"""
+
+
+def intern_value(value):
+    """Intern ``rt``/``if`` value as a shared tuple of interned strings"""
+    value = tuple(intern(x) for x in value)
+    return Values.setdefault(value, value)
+
+
+def resource_type(rt):
+    """Get (cached) resource type class for an interned ``rt`` value"""
+    cls = ResourceTypeClasses.get(rt)
+    if cls is None:
+        cls = ResourceTypeClasses.setdefault(rt, ResourceType.from_rt(*rt))
+    return cls
+
+
+class StateLayout():
+    """A shared state layout"""
+
+    __slots__ = ['keys', 'index']
+
+    def __init__(self, keys):
+
+        self.keys = keys
+        """Property names"""
+
+        self.index = {k: i for i, k in enumerate(keys)}
+        """Value index, indexed by property name"""
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.keys)
+
+    @classmethod
+    def get(cls, keys):
+        """Get shared layout for property names"""
+        keys = tuple(intern(x) for x in keys)
+        layout = Layouts.get(keys)
+        if layout is None:
+            layout = Layouts.setdefault(keys, cls(keys))
+        return layout
+
+
+class CompactResourceState(MutableMapping):
+    """Compact resource state representation with change tracking
+
+    Properties absent from the shared layout (i.e. those added after
+    construction) are held in a separate dictionary, allocated only
+    when required.
+    """
+
+    __slots__ = ['layout', 'values', 'extra', 'tracked', 'watchers']
+
+    json_encoder = JSONEncoder()
+
+    def __init__(self, data=None):
+        data = dict(data or ())
+        self.layout = StateLayout.get(data)
+        self.values = [self.canonicalise(k, v) for k, v in data.items()]
+        self.extra = None
+        self.tracked = None
+        self.watchers = None
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.data)
+
+    @staticmethod
+    def canonicalise(key, value):
+        """Convert to stored value"""
+        if key in INTERNED_VALUES and not isinstance(value, str):
+            return intern_value(value)
+        return value
+
+    def __getitem__(self, key):
+        index = self.layout.index.get(key)
+        if index is not None:
+            value = self.values[index]
+            if value is not Missing:
+                return value
+        elif self.extra is not None:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        value = self.canonicalise(key, value)
+        old = self.get(key) if self.watchers is not None else None
+        index = self.layout.index.get(key)
+        if index is not None:
+            self.values[index] = value
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[intern(key)] = value
+        self.notify(key, old, value)
+
+    def __delitem__(self, key):
+        old = self.get(key) if self.watchers is not None else None
+        index = self.layout.index.get(key)
+        if index is not None and self.values[index] is not Missing:
+            self.values[index] = Missing
+        elif self.extra is not None and key in self.extra:
+            del self.extra[key]
+        else:
+            raise KeyError(key)
+        self.notify(key, old, None)
+
+    def __contains__(self, key):
+        index = self.layout.index.get(key)
+        if index is not None:
+            return self.values[index] is not Missing
+        return self.extra is not None and key in self.extra
+
+    def __iter__(self):
+        for key, value in zip(self.layout.keys, self.values):
+            if value is not Missing:
+                yield key
+        if self.extra is not None:
+            yield from self.extra
+
+    def __len__(self):
+        return (len(self.values) - self.values.count(Missing) +
+                (len(self.extra) if self.extra is not None else 0))
+
+    @property
+    def data(self):
+        """Raw resource state dictionary"""
+        return dict(self.items())
+
+    @property
+    def json(self):
+        """JSON serialisation of resource state"""
+        return self.json_encoder.encode(self.data)
+
+    def notify(self, key, old, new):
+        """Notify callbacks and watchers of change"""
+        if self.tracked is not None and key in self.tracked:
+            for callback in self.tracked[key]:
+                callback()
+        if self.watchers is not None:
+            for watcher in self.watchers:
+                watcher(key, old, new)
+
+    def track(self, key, callback):
+        """Track changes"""
+        if self.tracked is None:
+            self.tracked = defaultdict(list)
+        self.tracked[key].append(callback)
+
+    def watch(self, watcher):
+        """Watch all changes"""
+        self.watchers = (*(self.watchers or ()), watcher)
+
+
+class CompactResource(Resource):
+    """A compact resource"""
+
+    __slots__ = []
+
+    def __init__(self, state=None):
+        # pylint: disable=super-init-not-called
+        self.state = CompactResourceState(state)
+
+    @property
+    def rt(self):
+        """Resource type (cached per distinct ``rt`` value)"""
+        return resource_type(self.state.get('rt', ()))
+
+    rt = rt.setter(Resource.rt.fset).deleter(Resource.rt.fdel)
@@ -0,0 +1,437 @@
+"""Compression (HTTP content codings)
+
+Collection payloads (such as links lists and discovery responses)
+typically contain many near-identical entries, and so compress very
+well.  Response bodies may be compressed using any content coding
+accepted by the client: ``gzip`` and ``deflate`` are always
+available, and ``zstd`` is available if the optional `zstandard`
+library is installed.
+
+Payloads smaller than a size threshold are never compressed, since
+the saving would be negligible.  Payloads larger than a streaming
+threshold are compressed incrementally, so that transmission may
+begin before compression is complete.
+
+A shared dictionary (typically trained on representative OCF
+payloads) may be configured on both client and server.  The client
+advertises the dictionary via an ``Available-Dictionary`` header, and
+the server then uses dictionary-compressed Zstandard (``dcz``, as
+defined by RFC 9842).  This requires the `zstandard` library.
+"""
+
+import base64
+from hashlib import sha256
+from io import BytesIO
+import zlib
+from .status import RequestEntityTooLarge, UnsupportedContentFormat
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ACCEPT_ENCODING_HEADER = 'Accept-Encoding'
+CONTENT_ENCODING_HEADER = 'Content-Encoding'
+AVAILABLE_DICTIONARY_HEADER = 'Available-Dictionary'
+
+DCZ_MAGIC = b'\x5e\x2a\x4d\x18\x20\x00\x00\x00'
+"""Dictionary-compressed Zstandard stream header magic"""
+
+ContentCodings = {}
+"""Registry of available content codings"""
+
+
+class ContentCoding():
+    """A content coding"""
+
+    name = None
+    """Coding name (or None if unavailable)"""
+
+    dictionary = False
+    """Coding requires a shared dictionary"""
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.name is not None:
+            ContentCodings[cls.name] = cls()
+
+    def __repr__(self):
+        return '%s()' % self.__class__.__name__
+
+    def compressor(self, level=None, dictionary=None):
+        """Construct incremental compressor
+
+        The compressor provides ``compress`` and ``flush`` methods,
+        as for `zlib.compressobj`.
+        """
+        raise NotImplementedError
+
+    def compress(self, data, level=None, dictionary=None):
+        """Compress data"""
+        compressor = self.compressor(level, dictionary)
+        return compressor.compress(data) + compressor.flush()
+
+    def decompressor(self, dictionary=None):
+        """Construct incremental decompressor"""
+        raise NotImplementedError
+
+    def decompress(self, data, dictionary=None, limit=None):
+        """Decompress data (of at most ``limit`` bytes, if specified)"""
+        raise NotImplementedError
+
+
+class ZlibCoding(ContentCoding):
+    """A content coding using `zlib`"""
+
+    wbits = zlib.MAX_WBITS
+
+    def compressor(self, level=None, dictionary=None):
+        return zlib.compressobj(-1 if level is None else level,
+                                zlib.DEFLATED, self.wbits)
+
+    def decompressor(self, dictionary=None):
+        return zlib.decompressobj(self.wbits)
+
+    def decompress(self, data, dictionary=None, limit=None):
+        decompressor = self.decompressor(dictionary)
+        try:
+            if limit is None:
+                return decompressor.decompress(data) + decompressor.flush()
+            content = decompressor.decompress(data, limit + 1)
+        except zlib.error as exc:
+            raise ValueError(str(exc)) from exc
+        if len(content) > limit:
+            raise RequestEntityTooLarge("Decompressed body too large")
+        return content
+
+
+class GzipCoding(ZlibCoding):
+    """The ``gzip`` content coding"""
+
+    name = 'gzip'
+
+    wbits = zlib.MAX_WBITS | 16
+
+
+class DeflateCoding(ZlibCoding):
+    """The ``deflate`` content coding (zlib format)"""
+
+    name = 'deflate'
+
+
+class ZstdCoding(ContentCoding):
+    """The ``zstd`` content coding
+
+    This coding is available only if the optional `zstandard` library
+    is installed.
+    """
+
+    name = 'zstd' if zstandard is not None else None
+
+    def compressor(self, level=None, dictionary=None):
+        return zstandard.ZstdCompressor(
+            level=3 if level is None else level,
+            dict_data=dictionary.zstd if dictionary is not None else None,
+        ).compressobj()
+
+    @staticmethod
+    def zstd(dictionary=None):
+        """Construct Zstandard decompressor"""
+        return zstandard.ZstdDecompressor(
+            dict_data=dictionary.zstd if dictionary is not None else None,
+        )
+
+    def decompressor(self, dictionary=None):
+        return self.zstd(dictionary).decompressobj()
+
+    def decompress(self, data, dictionary=None, limit=None):
+        decompressor = self.zstd(dictionary)
+        try:
+            if limit is None:
+                return decompressor.decompressobj().decompress(data)
+            content = decompressor.stream_reader(BytesIO(data)).read(
+                limit + 1
+            )
+        except zstandard.ZstdError as exc:
+            raise ValueError(str(exc)) from exc
+        if len(content) > limit:
+            raise RequestEntityTooLarge("Decompressed body too large")
+        return content
+
+
+class DictionaryCompressor():
+    """An incremental compressor prefixing a stream header"""
+
+    def __init__(self, header, compressor):
+        self.header = header
+        self.compressor = compressor
+
+    def compress(self, data):
+        """Compress data"""
+        (header, self.header) = (self.header, b'')
+        return header + self.compressor.compress(data)
+
+    def flush(self):
+        """Finish compression"""
+        (header, self.header) = (self.header, b'')
+        return header + self.compressor.flush()
+
+
+class DictionaryDecompressor():
+    """An incremental decompressor consuming a stream header"""
+
+    def __init__(self, header, decompressor):
+        self.header = header
+        self.pending = b''
+        self.decompressor = decompressor
+
+    def decompress(self, data):
+        """Decompress data"""
+        if self.header:
+            self.pending += data
+            if len(self.pending) < len(self.header):
+                return b''
+            if self.pending[:len(self.header)] != self.header:
+                raise ValueError("Dictionary mismatch")
+            data = self.pending[len(self.header):]
+            self.header = self.pending = b''
+        return self.decompressor.decompress(data)
+
+    def flush(self):
+        """Finish decompression"""
+        if self.header:
+            raise ValueError("Truncated stream header")
+        return self.decompressor.flush()
+
+
+class DictionaryZstdCoding(ZstdCoding):
+    """The ``dcz`` (dictionary-compressed Zstandard) content coding
+
+    Each stream is prefixed by a header identifying the dictionary by
+    its SHA-256 hash.
+    """
+
+    name = 'dcz' if zstandard is not None else None
+
+    dictionary = True
+
+    def compressor(self, level=None, dictionary=None):
+        return DictionaryCompressor(DCZ_MAGIC + dictionary.hash,
+                                    super().compressor(level, dictionary))
+
+    def decompressor(self, dictionary=None):
+        return DictionaryDecompressor(DCZ_MAGIC + dictionary.hash,
+                                      super().decompressor(dictionary))
+
+    def decompress(self, data, dictionary=None, limit=None):
+        header = DCZ_MAGIC + dictionary.hash
+        if data[:len(header)] != header:
+            raise ValueError("Dictionary mismatch")
+        return super().decompress(data[len(header):], dictionary, limit)
+
+
+class Dictionary():
+    """A shared compression dictionary"""
+
+    def __init__(self, data):
+
+        self.data = bytes(data)
+        """Dictionary content"""
+
+        self.hash = sha256(self.data).digest()
+        """SHA-256 hash"""
+
+        self.cached_zstd = None
+
+    def __repr__(self):
+        return '%s(%s)' % (self.__class__.__name__, self.hash.hex()[:16])
+
+    @property
+    def header(self):
+        """``Available-Dictionary`` header value"""
+        return ':%s:' % base64.b64encode(self.hash).decode()
+
+    @property
+    def zstd(self):
+        """Zstandard dictionary"""
+        if self.cached_zstd is None:
+            self.cached_zstd = zstandard.ZstdCompressionDict(self.data)
+        return self.cached_zstd
+
+    @classmethod
+    def train(cls, samples, size=16384):
+        """Train dictionary on sample payloads
+
+        If the `zstandard` library is installed, then a Zstandard
+        dictionary is trained.  Otherwise, a raw content dictionary is
+        constructed from the distinct samples (in order of increasing
+        frequency, since content nearer the end of a raw dictionary is
+        cheaper to reference).
+        """
+        samples = [bytes(x) for x in samples]
+        if zstandard is not None:
+            try:
+                return cls(zstandard.train_dictionary(size, samples)
+                           .as_bytes())
+            except zstandard.ZstdError:
+                # Too few samples: fall back to a raw content dictionary
+                pass
+        counts = {}
+        for sample in samples:
+            counts[sample] = counts.get(sample, 0) + 1
+        data = b''.join(sorted(counts, key=counts.get))
+        return cls(data[-size:])
+
+
+def parse_accept_encoding(value):
+    """Parse ``Accept-Encoding`` header into a map of quality values"""
+    accepted = {}
+    for item in (value or '').split(','):
+        (name, _, params) = item.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            (key, _, val) = param.strip().partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(val)
+                except ValueError:
+                    quality = 0.0
+        accepted[name] = quality
+    return accepted
+
+
+class Compression():
+    """A compression policy
+
+    Codings are listed in order of preference.  Any coding that is
+    not available (such as ``zstd`` without the `zstandard` library)
+    is ignored.
+    """
+
+    def __init__(self, codings=('zstd', 'gzip', 'deflate'), min_size=1024,
+                 stream_size=65536, level=None, dictionary=None,
+                 max_size=16777216):
+        # pylint: disable=too-many-arguments
+
+        self.codings = [x for x in codings if x in ContentCodings]
+        """Available codings (in order of preference)"""
+
+        self.min_size = min_size
+        """Minimum payload size to be compressed"""
+
+        self.stream_size = stream_size
+        """Minimum payload size to be compressed incrementally"""
+
+        self.level = level
+        """Compression level (or None for each coding's default)"""
+
+        self.dictionary = dictionary
+        """Shared dictionary (if any)"""
+
+        self.max_size = max_size
+        """Maximum decompressed request body size"""
+
+    def __repr__(self):
+        return '%s(%r, min_size=%r)' % (self.__class__.__name__,
+                                        self.codings, self.min_size)
+
+    @property
+    def dictionary_coding(self):
+        """Dictionary coding name (if usable)"""
+        if self.dictionary is None or 'dcz' not in ContentCodings:
+            return None
+        return 'dcz'
+
+    def accept_encoding(self):
+        """Construct ``Accept-Encoding`` header value"""
+        codings = list(self.codings)
+        if self.dictionary_coding is not None:
+            codings.insert(0, self.dictionary_coding)
+        return ', '.join(codings) if codings else 'identity'
+
+    def request_headers(self):
+        """Construct client request headers"""
+        headers = {ACCEPT_ENCODING_HEADER: self.accept_encoding()}
+        if self.dictionary_coding is not None:
+            headers[AVAILABLE_DICTIONARY_HEADER] = self.dictionary.header
+        return headers
+
+    def negotiate(self, accept_encoding, available_dictionary=None):
+        """Choose response coding (returning None for no compression)"""
+        accepted = parse_accept_encoding(accept_encoding)
+        if not accepted:
+            return None
+        coding = self.dictionary_coding
+        if (coding is not None and accepted.get(coding, 0) > 0 and
+                available_dictionary == self.dictionary.header):
+            return coding
+        wildcard = accepted.get('*', 0)
+        candidates = [x for x in self.codings
+                      if accepted.get(x, wildcard) > 0]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda x: accepted.get(x, wildcard))
+
+    def lookup(self, coding):
+        """Look up coding and the dictionary (if any) that it requires"""
+        res = ContentCodings.get(coding.strip().lower())
+        if res is None or (res.dictionary and self.dictionary is None):
+            raise UnsupportedContentFormat("Unsupported encoding %s" %
+                                           coding)
+        return (res, self.dictionary if res.dictionary else None)
+
+    def compressor(self, coding):
+        """Construct incremental compressor for a coding"""
+        (res, dictionary) = self.lookup(coding)
+        return res.compressor(self.level, dictionary)
+
+    def compress(self, coding, data):
+        """Compress data using a coding"""
+        (res, dictionary) = self.lookup(coding)
+        return res.compress(data, self.level, dictionary)
+
+    def decompressor(self, coding):
+        """Construct incremental decompressor for a coding"""
+        (res, dictionary) = self.lookup(coding)
+        return res.decompressor(dictionary)
+
+    def decompress(self, coding, data, limit=None):
+        """Decompress data using a coding"""
+        (res, dictionary) = self.lookup(coding)
+        return res.decompress(data, dictionary, limit)
+
+    def decompress_stream(self, coding, chunks):
+        """Decompress chunks incrementally"""
+        decompressor = self.decompressor(coding)
+        for chunk in chunks:
+            data = decompressor.decompress(chunk)
+            if data:
+                yield data
+        data = decompressor.flush()
+        if data:
+            yield data
+
+    def stream(self, coding, chunks, size=None):
+        """Compress chunks incrementally
+
+        Chunks are re-split to at most ``size`` bytes (if specified)
+        before compression, so that compressed output is produced
+        regularly even from a single large input chunk.
+        """
+        compressor = self.compressor(coding)
+        for chunk in chunks:
+            if size is not None and len(chunk) > size:
+                pieces = (chunk[i:i + size] for i in range(0, len(chunk),
+                                                            size))
+            else:
+                pieces = (chunk,)
+            for piece in pieces:
+                data = compressor.compress(piece)
+                if data:
+                    yield data
+        data = compressor.flush()
+        if data:
+            yield data
@@ -0,0 +1,131 @@
+"""Content formats
+
+A content format converts between a resource state and its serialised
+representation as raw bytes, without any intermediate text decoding
+beyond that required by the format itself.
+"""
+
+from functools import lru_cache
+from types import MappingProxyType
+from .json import JSONStreamDecoder
+from .state import ResourceState
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+APPLICATION_JSON = 'application/json'
+"""JSON MIME type"""
+
+ContentFormats = {}
+
+
+class ContentFormat():
+    """A content format"""
+
+    mimetype = None
+    """MIME type"""
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.mimetype is not None:
+            ContentFormats[cls.mimetype] = cls()
+
+    def __repr__(self):
+        return '%s()' % self.__class__.__name__
+
+    def encode(self, state):
+        """Serialise resource state to bytes"""
+        raise NotImplementedError
+
+    def decode(self, content, charset=None):
+        """Deserialise resource state from bytes"""
+        raise NotImplementedError
+
+    def iterdecode(self, chunks, key='links', charset=None):
+        """Deserialise collection members from an iterable of byte chunks
+
+        The members are the elements of the top-level array, or of
+        the array that is the value of the named top-level property.
+        Each member is yielded as a resource state.  This generic
+        implementation must first receive the complete body.
+        """
+        data = self.decode(b''.join(chunks), charset).data
+        members = data if isinstance(data, list) else data.get(key, ())
+        for member in members:
+            yield member_state(member)
+
+
+def member_state(member):
+    """Construct resource state for a collection member"""
+    if not isinstance(member, dict):
+        raise ValueError("Collection member is not an object")
+    return ResourceState(member)
+
+
+class JSONContentFormat(ContentFormat):
+    """JSON content format"""
+
+    mimetype = APPLICATION_JSON
+
+    def encode(self, state):
+        return state.json.encode()
+
+    def decode(self, content, charset=None):
+        return ResourceState(json=str(content, charset or 'utf-8'))
+
+    def iterdecode(self, chunks, key='links', charset=None):
+        """Deserialise collection members incrementally
+
+        Each member is yielded as soon as it has been received.
+        """
+        decoder = JSONStreamDecoder(key, charset)
+        for member in decoder.decode(chunks):
+            yield member_state(member)
+
+
+class CBORContentFormat(ContentFormat):
+    """CBOR content format
+
+    This format is available only if the optional `cbor2` library is
+    installed.
+    """
+
+    mimetype = 'application/cbor' if cbor2 is not None else None
+
+    def encode(self, state):
+        return cbor2.dumps(state.data)
+
+    def decode(self, content, charset=None):
+        return ResourceState(cbor2.loads(content))
+
+
+class OCFCBORContentFormat(CBORContentFormat):
+    """OCF CBOR content format"""
+
+    mimetype = 'application/vnd.ocf+cbor' if cbor2 is not None else None
+
+
+@lru_cache(maxsize=64)
+def parse_content_type(value):
+    """Parse Content-Type header value
+
+    Returns a tuple of the (lower-case) MIME type and a read-only
+    dictionary of parameters.  Results are cached, since a client will
+    typically see only a handful of distinct header values.
+    """
+    (mimetype, _, rest) = value.partition(';')
+    params = {}
+    while rest:
+        (param, _, rest) = rest.partition(';')
+        (key, sep, val) = param.partition('=')
+        if sep:
+            params[key.strip().lower()] = val.strip().strip('"')
+    return (mimetype.strip().lower(), MappingProxyType(params))
+
+
+def content_format(value):
+    """Look up content format (and character set) from Content-Type"""
+    (mimetype, params) = parse_content_type(value)
+    return (ContentFormats.get(mimetype), params.get('charset'))
@@ -0,0 +1,239 @@
+"""Resource discovery
+
+The discovery resource (``/oic/res``) lists links to all discoverable
+resources hosted by a server.  The list of links may be filtered by
+resource type (via an ``rt`` query parameter) and by interface (via
+an ``if`` query parameter naming an interface that is not itself an
+interface of the discovery resource).
+
+Since a resource representation is a dictionary, the links list is
+represented as the ``links`` property of the discovery resource.
+"""
+
+from threading import Lock, Thread, Event
+from time import monotonic
+from types import MappingProxyType
+from .endpoint import Endpoint
+from .interface import Interfaces, LinksListInterface
+from .resource import Resource
+
+DISCOVERY_URI = '/oic/res'
+"""Discovery resource URI"""
+
+
+def getall(params, key):
+    """Get all values of a query parameter"""
+    if hasattr(params, 'getall'):
+        return params.getall(key, [])
+    value = params.get(key)
+    return [] if value is None else [value]
+
+
+class DiscoveryResource(Resource):
+    """The discovery resource (``/oic/res``)"""
+
+    default_intf = LinksListInterface
+
+    def __init__(self, server):
+        super().__init__({
+            'rt': ['oic.wk.res'],
+            'if': ['oic.if.ll', 'oic.if.baseline'],
+        })
+
+        self.server = server
+        """Server hosting the discoverable resources"""
+
+    def interface(self, params=MappingProxyType({})):
+        # An "if" parameter that does not name an interface of the
+        # discovery resource itself is a filter on the links list
+        intf = next((x for x in getall(params, 'if') if x in self.intf),
+                    None)
+        return Interfaces[intf] if intf is not None else self.default_intf
+
+    def load(self, names, params):
+        if 'links' in names:
+            self.state['links'] = self.links(params)
+
+    def links(self, params=MappingProxyType({})):
+        """Construct list of links to matching resources"""
+        rts = set(getall(params, 'rt'))
+        intfs = set(x for x in getall(params, 'if') if x not in self.intf)
+        eps = [{'ep': ep.uri, 'pri': ep.priority}
+               for ep in sorted(self.server.endpoints)]
+        links = []
+        for uri, resource in self.server.items():
+            if resource is self:
+                continue
+            rt = list(resource.state.get('rt', ()))
+            intf = list(resource.state.get('if', ()))
+            if rts and rts.isdisjoint(rt):
+                continue
+            if intfs and intfs.isdisjoint(intf):
+                continue
+            link = {'href': uri, 'rt': rt, 'if': intf}
+            if eps:
+                link['eps'] = eps
+            links.append(link)
+        return links
+
+
+class Link():
+    """A discovered link to a resource"""
+
+    def __init__(self, href, rt=(), intf=(), anchor=None, endpoints=()):
+        # pylint: disable=too-many-arguments
+
+        self.href = href
+        """Target resource URI path"""
+
+        self.rt = list(rt)
+        """Target resource type names"""
+
+        self.intf = list(intf)
+        """Target resource interface names"""
+
+        self.anchor = anchor
+        """Link context (the hosting device)"""
+
+        self.endpoints = sorted(set(endpoints))
+        """Endpoints through which the target may be reached"""
+
+    def __repr__(self):
+        return '%s(%r, rt=%r, intf=%r, anchor=%r, endpoints=%r)' % (
+            self.__class__.__name__, self.href, self.rt, self.intf,
+            self.anchor, self.endpoints
+        )
+
+    @property
+    def key(self):
+        """Identity of the target resource"""
+        return (self.anchor, self.href)
+
+    @classmethod
+    def from_state(cls, link, source=None):
+        """Construct from link representation
+
+        If the link specifies no endpoints then the source endpoint
+        (i.e. the endpoint from which the link was received) is used.
+        """
+        endpoints = [Endpoint(x['ep'], priority=x.get('pri', 1))
+                     for x in link.get('eps', ())]
+        if not endpoints and source is not None:
+            endpoints = [source]
+        return cls(link['href'], rt=link.get('rt', ()),
+                   intf=link.get('if', ()), anchor=link.get('anchor'),
+                   endpoints=endpoints)
+
+    def merge(self, other):
+        """Merge endpoints from another link to the same target"""
+        self.endpoints = sorted(set(self.endpoints) | set(other.endpoints))
+
+
+def merge_links(links):
+    """Merge links to the same target resource"""
+    merged = {}
+    for link in links:
+        if link.key in merged:
+            merged[link.key].merge(link)
+        else:
+            merged[link.key] = link
+    return list(merged.values())
+
+
+class DiscoveryCacheEntry():
+    """A discovery cache entry"""
+
+    def __init__(self):
+        self.links = None
+        self.error = None
+        self.fetched = None
+        self.ready = Event()
+        self.refreshing = False
+
+
+class DiscoveryCache():
+    """A cache of discovery results
+
+    Results are cached for each distinct discovery query.  A cached
+    result is refreshed in the background once it reaches the refresh
+    age, and is discarded once it reaches the expiry age (time to
+    live).  Concurrent lookups for the same query share a single
+    discovery operation.
+    """
+
+    def __init__(self, discover, ttl=60.0, refresh=0.75):
+
+        self.discover = discover
+        """Discovery function
+
+        This is called with optional ``rt`` and ``intf`` keyword
+        arguments, and must return a list of `Link` objects.
+        """
+
+        self.ttl = ttl
+        """Time to live (in seconds)"""
+
+        self.refresh = refresh
+        """Refresh age (as a fraction of the time to live)"""
+
+        self.entries = {}
+        self.lock = Lock()
+
+    def __repr__(self):
+        return '%s(%r, ttl=%r)' % (self.__class__.__name__, self.discover,
+                                   self.ttl)
+
+    def fetch(self, key, entry):
+        """Perform discovery and update cache entry"""
+        (rt, intf) = key
+        try:
+            links = self.discover(rt=rt, intf=intf)
+            error = None
+        except Exception as exc:  # pylint: disable=broad-except
+            error = exc
+        with self.lock:
+            if error is None:
+                entry.links = links
+                entry.fetched = monotonic()
+            elif entry.links is None:
+                # Do not cache failures; a stale result is retained
+                # until it expires if a background refresh fails
+                entry.error = error
+                if self.entries.get(key) is entry:
+                    del self.entries[key]
+            entry.refreshing = False
+        entry.ready.set()
+
+    def get(self, rt=None, intf=None):
+        """Get (possibly cached) discovery results"""
+        key = (rt, intf)
+        with self.lock:
+            entry = self.entries.get(key)
+            now = monotonic()
+            if entry is not None and entry.fetched is not None:
+                age = now - entry.fetched
+                if age >= self.ttl:
+                    del self.entries[key]
+                    entry = None
+                elif age >= self.ttl * self.refresh and not entry.refreshing:
+                    entry.refreshing = True
+                    Thread(target=self.fetch, args=(key, entry),
+                           daemon=True).start()
+            if entry is None:
+                entry = self.entries[key] = DiscoveryCacheEntry()
+                entry.refreshing = True
+                owner = True
+            else:
+                owner = False
+        if owner:
+            self.fetch(key, entry)
+        else:
+            entry.ready.wait()
+        if entry.links is None:
+            raise entry.error
+        return list(entry.links)
+
+    def clear(self):
+        """Discard all cached results"""
+        with self.lock:
+            self.entries.clear()
@@ -1,7 +1,12 @@
 """Endpoints"""
 
 from functools import total_ordering
+from time import monotonic
 from urllib.parse import urlparse
+from . import capture, trace
+from .message import Retrieve, Response
+from .singleflight import SingleFlight
+from .status import GatewayTimeout
 from .transport import Transports
 
 
@@ -13,6 +18,12 @@ class Endpoint():
     accessed.
     """
 
+    flights = SingleFlight()
+    """Coalescing group for concurrent identical retrievals
+
+    This may be set to None to disable coalescing.
+    """
+
     def __init__(self, uri, priority=1):
         self.uri = uri
         self.scheme = urlparse(uri).scheme
@@ -30,6 +41,9 @@ class Endpoint():
             return NotImplemented
         return (self.priority, self.uri) == (other.priority, other.uri)
 
+    def __hash__(self):
+        return hash((self.priority, self.uri))
+
     def __lt__(self, other):
         """Allow endpoints to be sorted
 
@@ -46,8 +60,83 @@ class Endpoint():
         """Default transport"""
         return Transports[self.scheme]
 
-    def dispatch(self, msg, transport=None):
-        """Dispatch message"""
+    def dispatch(self, msg, transport=None, timeout=None):
+        """Dispatch message
+
+        Concurrent identical retrievals through the same transport are
+        coalesced into a single request, with each caller receiving a
+        copy of the response.  A caller joining an in-flight request
+        still waits no longer than its own timeout.
+
+        A message without a deadline inherits the deadline of any
+        request currently being handled by the calling thread.  The
+        timeout is limited to the time remaining until the deadline,
+        and a message whose deadline has already passed is not sent.
+
+        The message is captured by the installed recorder (if any).
+        """
+        timeout = self.budget(msg, timeout)
+        if transport is None:
+            transport = self.transport
+        recorder = capture.recorder()
+        with trace.span('send', msg) as span:
+            if recorder is None:
+                rsp = self.send(msg, transport, timeout)
+            else:
+                rsp = recorder.send(self, msg, transport, timeout)
+            span.set_status(rsp.status)
+        return rsp
+
+    def stream(self, msg, transport=None, timeout=None):
+        """Dispatch message, streaming the response body
+
+        The transport must support streaming (see e.g.
+        `RequestsTransport.stream`).  Streamed retrievals are never
+        coalesced.
+
+        The message is captured by the installed recorder (if any).
+        """
+        timeout = self.budget(msg, timeout)
         if transport is None:
             transport = self.transport
-        return transport.dispatch(self, msg)
+        recorder = capture.recorder()
+        with trace.span('send', msg) as span:
+            if recorder is None:
+                rsp = transport.stream(self, msg, timeout=timeout)
+            else:
+                rsp = recorder.stream(self, msg, transport, timeout)
+            span.set_status(rsp.status)
+        return rsp
+
+    @staticmethod
+    def budget(msg, timeout):
+        """Apply deadline to message, returning the permitted timeout"""
+        if msg.deadline is None:
+            msg.deadline = trace.deadline()
+        if msg.deadline is not None:
+            remaining = msg.deadline - monotonic()
+            if remaining <= 0:
+                raise GatewayTimeout("Deadline exceeded")
+            timeout = remaining if timeout is None else min(timeout,
+                                                             remaining)
+        return timeout
+
+    def send(self, msg, transport, timeout):
+        """Send message via transport, coalescing identical retrievals"""
+        kwargs = {'timeout': timeout} if timeout is not None else {}
+        if self.flights is None or not isinstance(msg, Retrieve):
+            return transport.dispatch(self, msg, **kwargs)
+        key = (self.uri, msg.uri, msg.method, tuple(msg.params.items()),
+               transport)
+        try:
+            (rsp, shared) = self.flights.do(key, transport.dispatch, self,
+                                            msg, wait=timeout, **kwargs)
+        except TimeoutError as exc:
+            raise GatewayTimeout("Timed out awaiting coalesced request"
+                                 ) from exc
+        if shared:
+            rsp = Response(rsp.status, token=msg.token,
+                           state=(rsp.state.copy() if rsp.state is not None
+                                  else None),
+                           retry_after=rsp.retry_after)
+        return rsp
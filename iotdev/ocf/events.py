@@ -0,0 +1,268 @@
+"""Event bus
+
+An event bus delivers resource change events (identifying the changed
+resource and property, with the property's old and new values) to
+subscribers.  Publishing an event merely queues it for each matching
+subscriber: events are delivered from a separate thread for each
+subscriber (or from a task on an asyncio event loop, for a subscriber
+that is a coroutine function), so that a slow subscriber delays
+neither the writer nor any other subscriber.
+
+Each subscriber has a bounded queue.  When the queue is full, either
+the oldest or the newest event is dropped.  Alternatively, pending
+events for the same resource property may be merged into a single
+event (retaining the oldest old value and the newest new value), so
+that a subscriber that cares only about the latest state never misses
+a change to a property.  Events may also be delivered in batches.
+"""
+
+import asyncio
+from collections import OrderedDict, deque
+from threading import Condition, Lock, Thread, current_thread
+from .rt import ResourceTypes
+
+DROP_OLDEST = 'drop-oldest'
+"""Drop oldest queued event when queue is full"""
+
+DROP_NEWEST = 'drop-newest'
+"""Drop newly published event when queue is full"""
+
+MERGE = 'merge'
+"""Merge queued events for the same resource property"""
+
+
+class ChangeEvent():
+    """A resource property change event
+
+    A deleted or previously absent property value is represented as
+    None.
+    """
+
+    __slots__ = ['resource', 'key', 'old', 'new']
+
+    def __init__(self, resource, key, old, new):
+        self.resource = resource
+        self.key = key
+        self.old = old
+        self.new = new
+
+    def __repr__(self):
+        return '%s(%r, %r, %r, %r)' % (self.__class__.__name__,
+                                       self.resource, self.key, self.old,
+                                       self.new)
+
+    def merge(self, other):
+        """Merge with subsequent event for the same property"""
+        return ChangeEvent(self.resource, self.key, self.old, other.new)
+
+
+class Subscription():
+    """An event bus subscription"""
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, callback, key=None, rt=None, resource=None,
+                 maxsize=1024, policy=DROP_OLDEST, batch=None):
+        # pylint: disable=too-many-arguments
+
+        self.callback = callback
+        """Subscriber callback"""
+
+        self.key = key
+        """Property name filter (or None to match all properties)"""
+
+        self.rt = ResourceTypes[rt] if isinstance(rt, str) else rt
+        """Resource type filter (or None to match all resources)"""
+
+        self.resource = resource
+        """Resource filter (or None to match all resources)"""
+
+        self.maxsize = maxsize
+        """Maximum queue length"""
+
+        self.policy = policy
+        """Queue overflow policy"""
+
+        self.batch = batch
+        """Maximum batch size (or None to deliver single events)"""
+
+        self.dropped = 0
+        """Number of events dropped due to queue overflow"""
+
+        self.errors = 0
+        """Number of exceptions raised by the subscriber callback"""
+
+        self.queue = OrderedDict() if policy == MERGE else deque()
+        self.cond = Condition()
+        self.closed = False
+        self.thread = None
+        self.loop = None
+        self.future = None
+        self.wakeup = None
+
+    def __repr__(self):
+        return '%s(%r, key=%r, rt=%r, policy=%r)' % (
+            self.__class__.__name__, self.callback, self.key, self.rt,
+            self.policy
+        )
+
+    def matches(self, event):
+        """Check if event matches subscription filters"""
+        return ((self.key is None or event.key == self.key) and
+                (self.resource is None or event.resource is self.resource)
+                and (self.rt is None or
+                     issubclass(event.resource.rt, self.rt)))
+
+    def offer(self, event):
+        """Queue event for delivery"""
+        with self.cond:
+            if self.closed:
+                return
+            if self.policy == MERGE:
+                ident = (id(event.resource), event.key)
+                pending = self.queue.get(ident)
+                if pending is not None:
+                    self.queue[ident] = pending.merge(event)
+                    return
+                if len(self.queue) >= self.maxsize:
+                    self.queue.popitem(last=False)
+                    self.dropped += 1
+                self.queue[ident] = event
+            else:
+                if len(self.queue) >= self.maxsize:
+                    self.dropped += 1
+                    if self.policy == DROP_NEWEST:
+                        return
+                    self.queue.popleft()
+                self.queue.append(event)
+            self.cond.notify()
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.wake)
+
+    def take(self):
+        """Remove next batch of events from queue"""
+        count = min(self.batch or 1, len(self.queue))
+        if self.policy == MERGE:
+            return [self.queue.popitem(last=False)[1] for _ in range(count)]
+        return [self.queue.popleft() for _ in range(count)]
+
+    def wake(self):
+        """Wake asyncio delivery task"""
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+    def run(self):
+        """Deliver events until closed"""
+        while True:
+            with self.cond:
+                while not self.queue and not self.closed:
+                    self.cond.wait()
+                if not self.queue:
+                    return
+                events = self.take()
+            try:
+                self.callback(events if self.batch else events[0])
+            except Exception:  # pylint: disable=broad-except
+                self.errors += 1
+
+    async def arun(self):
+        """Deliver events via asyncio until closed"""
+        self.wakeup = asyncio.Event()
+        while True:
+            self.wakeup.clear()
+            with self.cond:
+                events = self.take() if self.queue else None
+                closed = self.closed
+            if events is None:
+                if closed:
+                    return
+                await self.wakeup.wait()
+                continue
+            try:
+                await self.callback(events if self.batch else events[0])
+            except Exception:  # pylint: disable=broad-except
+                self.errors += 1
+
+    def start(self, loop=None):
+        """Start delivering events"""
+        if asyncio.iscoroutinefunction(self.callback):
+            if loop is None:
+                loop = asyncio.get_running_loop()
+            self.loop = loop
+            self.future = asyncio.run_coroutine_threadsafe(self.arun(),
+                                                           self.loop)
+        else:
+            self.thread = Thread(target=self.run, daemon=True)
+            self.thread.start()
+        return self
+
+    def close(self):
+        """Stop delivering events (after delivering any queued events)"""
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.wake)
+        if self.thread is not None and self.thread is not current_thread():
+            self.thread.join()
+
+
+class EventBus():
+    """An event bus"""
+
+    def __init__(self):
+        self.subscriptions = ()
+        self.lock = Lock()
+
+    def __repr__(self):
+        return '%s(%d subscriptions)' % (self.__class__.__name__,
+                                         len(self.subscriptions))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def subscribe(self, callback, key=None, rt=None, resource=None,
+                  maxsize=1024, policy=DROP_OLDEST, batch=None, loop=None):
+        """Subscribe to change events
+
+        The callback is invoked with each event (or with a list of
+        events, if a maximum batch size is specified).  A coroutine
+        function callback is run on the specified asyncio event loop
+        (defaulting to the running event loop).
+        """
+        # pylint: disable=too-many-arguments
+        subscription = Subscription(callback, key=key, rt=rt,
+                                    resource=resource, maxsize=maxsize,
+                                    policy=policy, batch=batch)
+        subscription.start(loop)
+        with self.lock:
+            self.subscriptions = (*self.subscriptions, subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Cancel subscription"""
+        with self.lock:
+            self.subscriptions = tuple(x for x in self.subscriptions
+                                       if x is not subscription)
+        subscription.close()
+
+    def publish(self, event):
+        """Publish change event"""
+        for subscription in self.subscriptions:
+            if subscription.matches(event):
+                subscription.offer(event)
+
+    def attach(self, resource):
+        """Publish change events for a resource"""
+        resource.state.watch(lambda key, old, new: self.publish(
+            ChangeEvent(resource, key, old, new)
+        ))
+        return resource
+
+    def close(self):
+        """Cancel all subscriptions"""
+        for subscription in self.subscriptions:
+            self.unsubscribe(subscription)
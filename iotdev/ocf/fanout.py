@@ -0,0 +1,115 @@
+"""Concurrent dispatch to many endpoints
+
+A fan-out dispatcher accepts many (endpoint, message) pairs,
+dispatches them concurrently using a bounded pool of worker threads,
+and returns the responses in order of completion.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from time import monotonic
+from .status import GatewayTimeout
+
+
+class FanOut():
+    """A fan-out dispatcher
+
+    Each result is returned as an ``(endpoint, message, response)``
+    tuple.  If dispatching a message fails, the exception is returned
+    in place of the response.  A message that does not complete
+    within the per-request timeout, or before the deadline for the
+    whole batch, is returned with a `GatewayTimeout` exception.
+    """
+
+    def __init__(self, workers=16, timeout=None, deadline=None):
+
+        self.workers = workers
+        """Maximum number of concurrently dispatched messages"""
+
+        self.timeout = timeout
+        """Per-request timeout (in seconds)"""
+
+        self.deadline = deadline
+        """Time allowed for the whole batch (in seconds)"""
+
+    def __repr__(self):
+        return '%s(workers=%r, timeout=%r, deadline=%r)' % (
+            self.__class__.__name__, self.workers, self.timeout,
+            self.deadline
+        )
+
+    def call(self, ep, msg, end):
+        """Dispatch a single message"""
+        timeout = self.timeout
+        if end is not None:
+            remaining = max(end - monotonic(), 0)
+            timeout = remaining if timeout is None else min(timeout,
+                                                             remaining)
+        try:
+            return ep.dispatch(msg, timeout=timeout)
+        except Exception as exc:  # pylint: disable=broad-except
+            return exc
+
+    def dispatch(self, requests):
+        """Dispatch messages, yielding results as they complete"""
+        # pylint: disable=too-many-locals
+        end = (monotonic() + self.deadline if self.deadline is not None
+               else None)
+        started = {}
+
+        def call(index, ep, msg):
+            started[index] = monotonic()
+            return self.call(ep, msg, end)
+
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            pending = {
+                executor.submit(call, index, ep, msg): (index, ep, msg)
+                for index, (ep, msg) in enumerate(requests)
+            }
+            while pending:
+                # Wait until something completes, or until the
+                # earliest possible expiry time
+                expiries = [] if end is None else [end]
+                if self.timeout is not None:
+                    expiries.append(min(
+                        (started[index] for index, _, _ in pending.values()
+                         if index in started), default=monotonic()
+                    ) + self.timeout)
+                timeout = (max(min(expiries) - monotonic(), 0) if expiries
+                           else None)
+                done, _ = wait(pending, timeout=timeout,
+                               return_when=FIRST_COMPLETED)
+                for future in done:
+                    (_, ep, msg) = pending.pop(future)
+                    yield (ep, msg, future.result())
+                # Abandon any expired requests
+                now = monotonic()
+                for future, (index, ep, msg) in list(pending.items()):
+                    if end is not None and now >= end:
+                        reason = "Batch deadline exceeded"
+                    elif (self.timeout is not None and index in started and
+                          now >= started[index] + self.timeout):
+                        reason = "Request timed out"
+                    else:
+                        continue
+                    future.cancel()
+                    del pending[future]
+                    yield (ep, msg, GatewayTimeout(reason))
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def adispatch(self, requests):
+        """Dispatch messages, asynchronously yielding results"""
+        loop = asyncio.get_running_loop()
+        results = self.dispatch(requests)
+        finished = object()
+        try:
+            while True:
+                result = await loop.run_in_executor(None, next, results,
+                                                    finished)
+                if result is finished:
+                    break
+                yield result
+        finally:
+            await loop.run_in_executor(None, results.close)
@@ -0,0 +1,172 @@
+"""Resource groups
+
+A group resource (an OCF collection) names a set of member resources
+hosted by the same server: either listed explicitly by URI, or
+selected by resource type, or both.  An update sent to the group via
+the batch interface (``oic.if.b``, the group's default interface)
+applies the same state to every member in a single request, as is
+needed for scenes and for building-wide commands such as "all off".
+
+The update is validated only once per distinct member resource type,
+rather than once per member.  The members are then written, and
+finally saved to their backend(s) as a single batch.  The response
+carries the status of the update to each individual member.  If no
+member could be updated, then the update fails as a whole.
+"""
+
+from collections import defaultdict
+from types import MappingProxyType
+from .interface import Interface
+from .property import ArrayProperty
+from .resource import Resource
+from .rt import ResourceType
+from .state import ResourceState
+from .status import (StatusException, BadRequest, Changed,
+                     InternalServerError)
+
+
+class Collection(ResourceType, name='oic.wk.col'):
+    """Collection of resources"""
+
+    links = ArrayProperty(writable=False)
+
+
+class BatchInterface(Interface, name='oic.if.b'):
+    """Batch interface
+
+    Provides access to the operational properties of all members of a
+    collection at once.
+    """
+
+    @staticmethod
+    def visible(prop):
+        return not prop.meta
+
+    def retrieve(self, params=MappingProxyType({})):
+        return ResourceState({'links': [
+            {'href': uri, 'rep': member.retrieve().data}
+            for uri, member in self.resource.members()
+        ]})
+
+    def update(self, data, params=MappingProxyType({})):
+        return self.resource.apply(data, params)
+
+
+class GroupResource(Resource):
+    """A group of resources
+
+    Members may be listed explicitly by URI, or selected by resource
+    type (in which case any hosted resource with at least one of the
+    specified resource types is a member).  Other groups are never
+    members.
+    """
+
+    default_intf = BatchInterface
+
+    def __init__(self, server, uris=(), rt=(), name=None):
+        super().__init__({
+            'rt': ['oic.wk.col'],
+            'if': ['oic.if.b', 'oic.if.ll', 'oic.if.baseline'],
+            **({'n': name} if name is not None else {}),
+        })
+
+        self.server = server
+        """Server hosting the member resources"""
+
+        self.uris = list(uris)
+        """Explicitly listed member URIs"""
+
+        self.rts = frozenset([rt] if isinstance(rt, str) else rt)
+        """Resource types selecting members"""
+
+    def members(self):
+        """List ``(URI, resource)`` pairs for current members"""
+        members = {uri: self.server[uri] for uri in self.uris
+                   if uri in self.server}
+        if self.rts:
+            members.update(
+                (uri, resource) for uri, resource in self.server.items()
+                if not self.rts.isdisjoint(resource.state.get('rt', ()))
+            )
+        return [(uri, resource) for uri, resource in members.items()
+                if not isinstance(resource, GroupResource)]
+
+    def load(self, names, params):
+        if 'links' in names:
+            self.state['links'] = [
+                {'href': uri, 'rt': list(resource.state.get('rt', ())),
+                 'if': list(resource.state.get('if', ()))}
+                for uri, resource in self.members()
+            ]
+
+    @staticmethod
+    def validate(meta, data):
+        """Validate update for a member resource type
+
+        Returns the canonicalised values of the properties to be
+        written to each member of this type.
+        """
+        visible = BatchInterface.visible
+        names = [x for x in data if x in meta and visible(meta[x])]
+        readonly = [x for x in names if not meta[x].writable]
+        if readonly:
+            raise BadRequest('Not writable: %s' % ', '.join(readonly))
+        if not names:
+            raise BadRequest('No applicable properties')
+        try:
+            return {x: meta[x].canonicalise(data[x]) for x in names}
+        except (TypeError, ValueError) as exc:
+            raise BadRequest(str(exc)) from exc
+
+    def apply(self, data, params=MappingProxyType({})):
+        """Apply update to all members, returning a status summary
+
+        If a batch of members cannot be saved, then each member in the
+        batch is saved individually, so that only the members that
+        could not be saved are reported as having failed.
+        """
+        types = defaultdict(list)
+        for uri, resource in self.members():
+            types[tuple(resource.state.get('rt', ()))].append((uri, resource))
+        statuses = {}
+        written = defaultdict(list)
+        for members in types.values():
+            try:
+                values = self.validate(members[0][1].rt, data)
+            except StatusException as exc:
+                statuses.update((uri, type(exc)) for uri, _ in members)
+                continue
+            for uri, resource in members:
+                with resource.batch():
+                    for name, value in values.items():
+                        resource.state[name] = value
+                statuses[uri] = Changed
+                written[(type(resource), tuple(values))].append(
+                    (uri, resource)
+                )
+        for (cls, names), members in written.items():
+            try:
+                cls.save_all([x for _, x in members], list(names), params)
+            except Exception:  # pylint: disable=broad-except
+                statuses.update(self.save_each(members, list(names), params))
+        if statuses and Changed not in statuses.values():
+            failed = set(statuses.values())
+            raise (failed.pop() if len(failed) == 1 else BadRequest)(
+                "No members updated"
+            )
+        return ResourceState({'links': [
+            {'href': uri, 'status': str(status)}
+            for uri, status in statuses.items()
+        ]})
+
+    @staticmethod
+    def save_each(members, names, params):
+        """Save members individually, yielding ``(URI, status)`` pairs"""
+        for uri, resource in members:
+            try:
+                resource.save(names, params)
+            except Exception:  # pylint: disable=broad-except
+                yield (uri, InternalServerError)
+            else:
+                yield (uri, Changed)
+
@@ -1,8 +1,12 @@
 """HTTP mapping"""
 
+from datetime import datetime, timezone
 from http import HTTPStatus
+from math import isfinite
+from time import monotonic
 from . import status
 from .message import Create, Retrieve, Update, Delete, Notify
+from .trace import TIMEOUT_HEADER, TRACEPARENT_HEADER, TraceContext
 from .transport import Transport
 
 
@@ -64,6 +68,35 @@ class HttpClientTransport(Transport):
             res = request.success
         return res
 
+    @staticmethod
+    def headers(msg):
+        """Construct trace context and deadline headers"""
+        headers = {}
+        if msg.trace is not None:
+            headers[TRACEPARENT_HEADER] = str(msg.trace)
+        if msg.deadline is not None:
+            headers[TIMEOUT_HEADER] = '%.3f' % max(msg.remaining(), 0)
+        return headers
+
+    @staticmethod
+    def retry_after(value):
+        """Construct retry delay (in seconds) from HTTP Retry-After value"""
+        if not value:
+            return None
+        try:
+            delay = float(value)
+        except ValueError:
+            pass
+        else:
+            return max(delay, 0) if isfinite(delay) else None
+        # pylint: disable=import-outside-toplevel
+        from email.utils import parsedate_to_datetime
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max((when - datetime.now(timezone.utc)).total_seconds(), 0)
+
 
 class HttpServerTransport(Transport):
     """An HTTP server transport"""
@@ -97,6 +130,40 @@ class HttpServerTransport(Transport):
 
     STATUS_NO_CONTENT = {HTTPStatus.NO_CONTENT, HTTPStatus.NOT_MODIFIED}
 
+    REQUEST_MAP = {
+        'GET': Retrieve,
+        'PUT': Update,
+        'POST': Notify,
+        'DELETE': Delete,
+    }
+    """Map from HTTP method to OCF request type"""
+
+    @classmethod
+    def request(cls, method):
+        """Construct OCF request type from HTTP method"""
+        res = cls.REQUEST_MAP.get(method)
+        if res is None:
+            raise status.MethodNotAllowed("Unsupported method %s" % method)
+        return res
+
+    @staticmethod
+    def propagate(msg, headers):
+        """Apply trace context and deadline headers to OCF request
+
+        An unparseable or non-finite remaining time is ignored, and a
+        negative remaining time is treated as zero.
+        """
+        msg.trace = TraceContext.parse(headers.get(TRACEPARENT_HEADER))
+        timeout = headers.get(TIMEOUT_HEADER)
+        if timeout:
+            try:
+                timeout = float(timeout)
+            except ValueError:
+                return msg
+            if isfinite(timeout):
+                msg.deadline = monotonic() + max(timeout, 0.0)
+        return msg
+
     @classmethod
     def status(cls, stat, content=None):
         """Construct HTTP status code from OCF status"""
@@ -5,6 +5,7 @@ and a corresponding list of permitted requests and responses.
 """
 
 from types import MappingProxyType
+from .profile import phase
 from .state import ResourceState
 from .status import BadRequest
 
@@ -40,16 +41,20 @@ class Interface(metaclass=InterfaceMeta):
 
     def retrieve(self, params=MappingProxyType({})):
         """Retrieve resource representation"""
-        prop = self.resource.prop
-        meta = type(prop)
+        meta = self.resource.rt
         # Determine visible and readable properties
         names = [x for x in meta if meta[x].readable and self.visible(meta[x])]
         # Load required property values
-        self.resource.load(names, params)
+        with phase('load'):
+            self.resource.load(names, params)
+        # Read from a consistent snapshot of the resource state
+        prop = self.resource.snapshot().prop
         # Retrieve visible, readable, and existent (or required) properties
-        return ResourceState({
+        state = ResourceState({
             x: prop[x] for x in names if x in prop or meta[x].required
         })
+        state.json_encoder = meta.json_encoder
+        return state
 
     def update(self, data, params=MappingProxyType({})):
         """Update resource representation"""
@@ -61,9 +66,10 @@ class Interface(metaclass=InterfaceMeta):
         readonly = [x for x in names if not meta[x].writable]
         if readonly:
             raise BadRequest('Not writable: %s' % ', '.join(readonly))
-        # Update visible and writable properties
-        for name in names:
-            prop[name] = data[name]
+        # Update visible and writable properties (as a single change)
+        with self.resource.batch():
+            for name in names:
+                prop[name] = data[name]
         # Save property values
         self.resource.save(names, params)
 
@@ -124,3 +130,16 @@ class ReadWriteInterface(Interface, name='oic.if.rw'):
     @staticmethod
     def visible(prop):
         return prop.writable
+
+
+class LinksListInterface(Interface, name='oic.if.ll'):
+    """Links list interface
+
+    Provides access to the list of links to other resources (such as
+    the members of a collection, or the resources listed by the
+    discovery resource).
+    """
+
+    @staticmethod
+    def visible(prop):
+        return prop.name == 'links'
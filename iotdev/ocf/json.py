@@ -1,9 +1,34 @@
-"""JSON encoding"""
+"""JSON encoding and decoding"""
 
+import codecs
 from collections.abc import Iterable
 from datetime import date, time
 import json
+from json.encoder import encode_basestring_ascii
+import re
 from uuid import UUID
+from .property import (BooleanProperty, IntegerProperty,
+                       StringProperty, NumericProperty, UUIDProperty,
+                       ArrayProperty, OrderedSetProperty)
+
+BOOLEANS = {True: 'true', False: 'false'}
+
+STRING = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+"""Complete JSON string"""
+
+TOKEN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[\[\]{}"]', re.DOTALL)
+"""Structural token (or start of an incomplete string)"""
+
+SCALAR = re.compile(r'[^,\]}\s]*')
+"""JSON number or literal"""
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+"""JSON whitespace"""
+
+INCOMPLETE = object()
+
+CompiledEncoders = {}
+"""Cache of compiled encoders, indexed by resource type properties"""
 
 
 class JSONEncoder(json.JSONEncoder):
@@ -23,3 +48,297 @@ class JSONEncoder(json.JSONEncoder):
 class JSONDecoder(json.JSONDecoder):
     """JSON decoder"""
     pass
+
+
+def encode_number(value):
+    """Encode numeric value"""
+    text = repr(value + 0)
+    if text[-1] in 'nf':
+        raise ValueError("Non-finite value %s" % text)
+    return text
+
+
+def encode_uuid(value):
+    """Encode UUID value"""
+    return encode_basestring_ascii(str(value))
+
+
+class CompiledJSONEncoder(JSONEncoder):
+    """JSON encoder specialised for a set of resource type properties
+
+    Each known property is encoded directly by a function specific to
+    the property type, with a preconstructed key fragment.  Unknown or
+    null properties are encoded by the generic encoder, as is the
+    entire state if any property value turns out not to be of the
+    expected type.
+    """
+
+    SIMPLE = [
+        (BooleanProperty, BOOLEANS.__getitem__),
+        (IntegerProperty, '%d'.__mod__),
+        (StringProperty, encode_basestring_ascii),
+        (NumericProperty, encode_number),
+        (UUIDProperty, encode_uuid),
+    ]
+    """Encoding functions for simple property types"""
+
+    def __init__(self, properties):
+        super().__init__()
+        self.fields = {
+            name: (encode_basestring_ascii(name) + ': ', self.compile(prop))
+            for name, prop in properties.items()
+        }
+        """Key fragments and encoding functions, indexed by name"""
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, list(self.fields))
+
+    def compile(self, prop):
+        """Construct encoding function for a property (or property type)"""
+        cls = prop if isinstance(prop, type) else type(prop)
+        for base, func in self.SIMPLE:
+            if issubclass(cls, base):
+                return func
+        if issubclass(cls, (ArrayProperty, OrderedSetProperty)):
+            element = self.compile(cls.element)
+            return lambda value: '[%s]' % ', '.join(map(element, value))
+        return super().encode
+
+    def encode(self, o):
+        if not isinstance(o, dict):
+            return super().encode(o)
+        fields = self.fields
+        parts = []
+        try:
+            for key, value in o.items():
+                field = fields.get(key) if value is not None else None
+                if field is None:
+                    parts.append('%s: %s' % (super().encode(key),
+                                             super().encode(value)))
+                else:
+                    parts.append(field[0] + field[1](value))
+        except (TypeError, ValueError, KeyError):
+            return super().encode(o)
+        return '{%s}' % ', '.join(parts)
+
+    @classmethod
+    def cached(cls, properties):
+        """Get (cached) compiled encoder for resource type properties"""
+        key = tuple(properties.items())
+        encoder = CompiledEncoders.get(key)
+        if encoder is None:
+            encoder = CompiledEncoders.setdefault(key, cls(properties))
+        return encoder
+
+
+class JSONStreamDecoder():
+    """Incremental decoder for JSON collection payloads
+
+    The members of a collection (i.e. the elements of a top-level
+    array, or of the array that is the value of the named top-level
+    property) are returned as soon as each has been completely
+    received.  Only the member currently being received is ever held
+    in memory as text.  Any other top-level properties are collected
+    in `properties`.
+
+    Each member is parsed by the standard JSON decoder.  If a member
+    cannot yet be parsed (typically because it straddles a chunk
+    boundary), then its end is located by a regular expression
+    scanner that resumes where it left off as more data arrives, and
+    parsing is retried only once the member is complete.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, key='links', charset=None):
+
+        self.key = key
+        """Name of collection property"""
+
+        self.properties = {}
+        """Other top-level properties"""
+
+        self.decoder = JSONDecoder()
+        self.text = codecs.getincrementaldecoder(charset or 'utf-8')()
+        self.buf = ''
+        self.pos = 0
+        self.scan = None
+        self.state = self.start
+        self.first = True
+        self.nested = False
+        self.name = None
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.key)
+
+    @property
+    def finished(self):
+        """Complete payload has been decoded"""
+        return self.state == self.end
+
+    def feed(self, data, final=False):
+        """Decode chunk of raw bytes, returning list of completed members"""
+        if self.pos:
+            self.buf = self.buf[self.pos:]
+            if self.scan is not None:
+                self.scan = (self.scan[0] - self.pos, self.scan[1])
+            self.pos = 0
+        self.buf += self.text.decode(data, final)
+        members = []
+        while self.step(members, final):
+            pass
+        return members
+
+    def close(self):
+        """Finish decoding, returning list of any remaining members"""
+        members = self.feed(b'', final=True)
+        if not self.finished:
+            raise ValueError("Truncated JSON collection")
+        return members
+
+    def decode(self, chunks):
+        """Decode iterable of raw byte chunks, yielding members"""
+        for chunk in chunks:
+            yield from self.feed(chunk)
+        yield from self.close()
+
+    def step(self, members, final):
+        """Decode next item (returning False if no progress is possible)"""
+        self.pos = WHITESPACE.match(self.buf, self.pos).end()
+        if self.pos == len(self.buf):
+            return False
+        return self.state(self.buf[self.pos], members, final)
+
+    def punctuation(self, char, expected):
+        """Consume expected punctuation character"""
+        if char not in expected:
+            raise ValueError("Expected %r at %r" % (expected, char))
+        self.pos += 1
+        return True
+
+    def start(self, char, members, final):
+        """Decode start of payload"""
+        self.punctuation(char, '[{')
+        self.state = self.member if char == '[' else self.property
+        return True
+
+    def property(self, char, members, final):
+        """Decode property name"""
+        if char == '}' and self.first:
+            self.pos += 1
+            self.state = self.end
+            return True
+        if char != '"':
+            raise ValueError("Expected property name at %r" % char)
+        name = self.value(final)
+        if name is INCOMPLETE:
+            return False
+        self.name = name
+        self.state = self.colon
+        return True
+
+    def colon(self, char, members, final):
+        """Decode name separator"""
+        self.state = self.property_value
+        return self.punctuation(char, ':')
+
+    def property_value(self, char, members, final):
+        """Decode property value (or start of collection)"""
+        if self.name == self.key and char == '[':
+            self.pos += 1
+            (self.state, self.first, self.nested) = (self.member, True, True)
+            return True
+        value = self.value(final)
+        if value is INCOMPLETE:
+            return False
+        self.properties[self.name] = value
+        self.state = self.property_next
+        return True
+
+    def property_next(self, char, members, final):
+        """Decode property separator or end of object"""
+        self.punctuation(char, ',}')
+        (self.state, self.first) = ((self.property, False) if char == ','
+                                    else (self.end, False))
+        return True
+
+    def member(self, char, members, final):
+        """Decode collection member"""
+        if char == ']' and self.first:
+            return self.member_next(char, members, final)
+        value = self.value(final)
+        if value is INCOMPLETE:
+            return False
+        members.append(value)
+        self.state = self.member_next
+        return True
+
+    def member_next(self, char, members, final):
+        """Decode member separator or end of collection"""
+        self.punctuation(char, ',]')
+        if char == ',':
+            (self.state, self.first) = (self.member, False)
+        elif self.nested:
+            (self.state, self.first) = (self.property_next, False)
+        else:
+            self.state = self.end
+        return True
+
+    def end(self, char, members, final):
+        """Reject trailing data"""
+        raise ValueError("Extra data at %r" % char)
+
+    def value(self, final):
+        """Decode complete value (or return `INCOMPLETE`)"""
+        (buf, start) = (self.buf, self.pos)
+        char = buf[start]
+        if char in '[{' and self.scan is None:
+            # Optimistically parse (the common case of) a complete value
+            try:
+                (value, self.pos) = self.decoder.raw_decode(buf, start)
+                return value
+            except ValueError:
+                pass
+        if char in '[{':
+            end = self.container()
+        elif char == '"':
+            match = STRING.match(buf, start)
+            end = match.end() if match else None
+        else:
+            end = SCALAR.match(buf, start).end()
+            if end == len(buf) and not final:
+                end = None
+        if end is None:
+            if final:
+                raise ValueError("Truncated JSON value")
+            return INCOMPLETE
+        (value, stop) = self.decoder.raw_decode(buf, start)
+        if stop != end:
+            raise ValueError("Invalid JSON value at offset %d" % stop)
+        self.pos = end
+        self.scan = None
+        return value
+
+    def container(self):
+        """Find end of container value (or return None if incomplete)
+
+        Scanning resumes from where it previously left off.
+        """
+        (pos, depth) = self.scan if self.scan is not None else (self.pos, 0)
+        buf = self.buf
+        while True:
+            match = TOKEN.search(buf, pos)
+            if match is None:
+                self.scan = (len(buf), depth)
+                return None
+            token = match.group()
+            if token == '"':
+                self.scan = (match.start(), depth)
+                return None
+            pos = match.end()
+            if token in '[{':
+                depth += 1
+            elif token in ']}':
+                depth -= 1
+                if not depth:
+                    return pos
@@ -0,0 +1,220 @@
+"""Load generation
+
+A load generator drives a configurable mix of retrieve, update, and
+notify requests against a set of target resources (such as those
+hosted by a simulated fleet), from a pool of worker threads, and
+reports the achieved throughput and latency percentiles.
+
+Update and notify requests carry randomly generated values for the
+operational properties of each target's resource type: writable
+properties only for an update, and all properties for a notification.
+"""
+
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from math import ceil
+import random
+from threading import Lock
+from time import monotonic, sleep
+from .message import Notify, Retrieve, Update
+from .simulator import random_value
+from .throttle import TokenBucket
+
+DEFAULT_MIX = {
+    Retrieve.method: 0.8,
+    Update.method: 0.15,
+    Notify.method: 0.05,
+}
+"""Default request mix"""
+
+PERCENTILES = (50, 90, 99, 99.9)
+"""Reported latency percentiles"""
+
+
+def percentile(values, pct):
+    """Calculate (nearest rank) percentile of sorted values"""
+    if not values:
+        return None
+    return values[max(ceil(pct / 100 * len(values)) - 1, 0)]
+
+
+class LoadReport():
+    """A load generation report"""
+
+    def __init__(self, elapsed, latencies, outcomes):
+
+        self.elapsed = elapsed
+        """Elapsed time (in seconds)"""
+
+        self.latencies = {k: sorted(v) for k, v in latencies.items()}
+        """Sorted request latencies (in seconds) for each method"""
+
+        self.outcomes = outcomes
+        """Count of each response status (or exception type)"""
+
+    def __repr__(self):
+        return '%s(requests=%r, throughput=%.1f)' % (
+            self.__class__.__name__, self.requests, self.throughput
+        )
+
+    def __str__(self):
+        lines = ['%d requests in %.2fs (%.1f/s), %d errors' % (
+            self.requests, self.elapsed, self.throughput, self.errors
+        )]
+        for method, latencies in sorted(self.latencies.items()):
+            lines.append('%-8s %7d  %s  max %.2fms' % (
+                method, len(latencies), '  '.join(
+                    'p%g %.2fms' % (pct, percentile(latencies, pct) * 1000)
+                    for pct in PERCENTILES
+                ), latencies[-1] * 1000
+            ))
+        return '\n'.join(lines)
+
+    @property
+    def requests(self):
+        """Total number of requests"""
+        return sum(self.outcomes.values())
+
+    @property
+    def errors(self):
+        """Number of failed requests"""
+        return sum(count for outcome, count in self.outcomes.items()
+                   if not getattr(outcome, 'success', False))
+
+    @property
+    def throughput(self):
+        """Throughput (in requests per second)"""
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, pct, method=None):
+        """Calculate latency percentile (in seconds)"""
+        if method is None:
+            return percentile(sorted(x for v in self.latencies.values()
+                                     for x in v), pct)
+        return percentile(self.latencies.get(method, []), pct)
+
+
+class LoadGenerator():
+    """A load generator
+
+    Targets are specified as a list of ``(endpoint, URI, resource
+    type)`` tuples, such as those returned by `Fleet.targets`.  The
+    request mix maps request methods to relative weights.  If a rate
+    (in requests per second) is specified, then requests are issued at
+    that rate (as far as the workers can sustain it); otherwise each
+    worker issues its next request as soon as the previous one has
+    completed.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, targets, mix=DEFAULT_MIX, workers=16, rate=None,
+                 timeout=None, seed=None):
+        # pylint: disable=too-many-arguments
+
+        self.targets = list(targets)
+        """Target resources"""
+
+        self.mix = dict(mix)
+        """Relative weight of each request method"""
+
+        self.workers = workers
+        """Number of worker threads"""
+
+        self.rate = rate
+        """Target request rate (in requests per second)"""
+
+        self.timeout = timeout
+        """Request timeout (in seconds)"""
+
+        self.rng = random.Random(seed)
+        self.writable = [x for x in self.targets if self.properties(x[2])]
+        self.lock = Lock()
+        self.remaining = None
+        self.end = None
+
+    def __repr__(self):
+        return '%s(%d targets, mix=%r, workers=%r, rate=%r)' % (
+            self.__class__.__name__, len(self.targets), self.mix,
+            self.workers, self.rate
+        )
+
+    @staticmethod
+    def properties(rt, writable=True):
+        """List operational (and optionally only writable) properties"""
+        return [x for x in rt if not rt[x].meta and
+                (rt[x].writable or not writable)]
+
+    def values(self, rt, rng, writable=True):
+        """Construct random values for properties"""
+        values = {x: random_value(rt[x], rng)
+                  for x in self.properties(rt, writable)}
+        return {k: v for k, v in values.items() if v is not None}
+
+    def request(self, rng):
+        """Construct random (endpoint, message) pair"""
+        methods = list(self.mix)
+        weights = [self.mix[x] if x != Update.method or self.writable else 0
+                   for x in methods]
+        method = rng.choices(methods, weights)[0]
+        if method == Update.method:
+            (ep, uri, rt) = rng.choice(self.writable)
+            return (ep, Update(uri, self.values(rt, rng)))
+        (ep, uri, rt) = rng.choice(self.targets)
+        if method == Notify.method:
+            return (ep, Notify(uri, self.values(rt, rng, writable=False)))
+        return (ep, Retrieve(uri))
+
+    def proceed(self):
+        """Check whether another request should be issued"""
+        if self.end is not None and monotonic() >= self.end:
+            return False
+        if self.remaining is not None:
+            with self.lock:
+                if self.remaining <= 0:
+                    return False
+                self.remaining -= 1
+        return True
+
+    def work(self, bucket, seed):
+        """Issue requests until finished (in a worker thread)"""
+        rng = random.Random(seed)
+        latencies = defaultdict(list)
+        outcomes = Counter()
+        while self.proceed():
+            if bucket is not None:
+                delay = bucket.reserve()
+                if delay:
+                    sleep(delay)
+            (ep, msg) = self.request(rng)
+            start = monotonic()
+            try:
+                outcome = ep.dispatch(msg, timeout=self.timeout).status
+            except Exception as exc:  # pylint: disable=broad-except
+                outcome = type(exc)
+            latencies[msg.method].append(monotonic() - start)
+            outcomes[outcome] += 1
+        return (latencies, outcomes)
+
+    def run(self, duration=None, requests=None):
+        """Generate load for a duration (in seconds) or request count"""
+        if duration is None and requests is None:
+            raise ValueError("Specify a duration or a number of requests")
+        bucket = (TokenBucket(self.rate, burst=1) if self.rate is not None
+                  else None)
+        self.remaining = requests
+        start = monotonic()
+        self.end = start + duration if duration is not None else None
+        with ThreadPoolExecutor(self.workers) as executor:
+            futures = [executor.submit(self.work, bucket,
+                                       self.rng.getrandbits(64))
+                       for _ in range(self.workers)]
+            results = [x.result() for x in futures]
+        elapsed = monotonic() - start
+        latencies = defaultdict(list)
+        outcomes = Counter()
+        for worker_latencies, worker_outcomes in results:
+            for method, values in worker_latencies.items():
+                latencies[method].extend(values)
+            outcomes.update(worker_outcomes)
+        return LoadReport(elapsed, latencies, outcomes)
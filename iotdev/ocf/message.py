@@ -1,9 +1,14 @@
 """Messages"""
 
 from abc import ABC, abstractmethod
+from time import monotonic
 from multidict import MultiDict
+from .content import APPLICATION_JSON, ContentFormats, content_format
+from .profile import phase
+from .router import Query
 from .state import ResourceState
-from .status import Created, Deleted, Changed, Content
+from .status import (Created, Deleted, Changed, Content, Valid,
+                     UnsupportedContentFormat)
 
 RequestTypes = {}
 
@@ -11,33 +16,109 @@ RequestTypes = {}
 class Message(ABC):
     """A message"""
 
-    def __init__(self, data=None, *, json=None, state=None, token=None):
-        if data is not None or json is not None:
-            if state is not None:
-                raise TypeError("Specify at most one of 'data', 'json', "
-                                "or 'state'")
-            state = ResourceState(data=data, json=json)
-        self.state = state
+    __slots__ = ('_state', '_raw', 'token', 'content_type', 'trace',
+                 'deadline')
+
+    def __init__(self, data=None, *, json=None, state=None, token=None,
+                 content=None, content_type=None, trace=None, deadline=None):
+        # pylint: disable=too-many-arguments
+        if ((data is not None) + (json is not None) + (state is not None) +
+                (content is not None) > 1):
+            raise TypeError("Specify at most one of 'data', 'json', "
+                            "'content', or 'state'")
+        self._state = state
+        self._raw = (data if data is not None else
+                     json if json is not None else content)
         self.token = token
 
+        self.content_type = content_type
+        """Content format of encoded content (if any)"""
+
+        self.trace = trace
+        """Trace context (if any)"""
+
+        self.deadline = deadline
+        """Absolute deadline, as a `time.monotonic` value (if any)"""
+
+    def remaining(self):
+        """Time remaining until deadline (in seconds, or None)"""
+        if self.deadline is None:
+            return None
+        return self.deadline - monotonic()
+
+    @property
+    def expired(self):
+        """Deadline has passed"""
+        return self.deadline is not None and self.deadline <= monotonic()
+
+    @property
+    def state(self):
+        """Resource state (constructed on first access)"""
+        raw = self._raw
+        if raw is not None:
+            if isinstance(raw, str):
+                self._state = ResourceState(json=raw)
+            elif isinstance(raw, bytes):
+                fmt = ContentFormats.get(self.content_type)
+                if fmt is None:
+                    raise UnsupportedContentFormat(self.content_type)
+                with phase('decode'):
+                    self._state = fmt.decode(raw)
+            else:
+                self._state = ResourceState(data=raw)
+            self._raw = None
+        return self._state
+
+    @state.setter
+    def state(self, value):
+        self._state = value
+        self._raw = None
+
     @property
     def json(self):
         """State serialised as JSON"""
-        return self.state.json if self.state is not None else None
+        raw = self._raw
+        if isinstance(raw, str):
+            return raw
+        if isinstance(raw, bytes) and self.content_type == APPLICATION_JSON:
+            return raw.decode()
+        state = self.state
+        return state.json if state is not None else None
 
     @json.setter
     def json(self, value):
-        self.state = ResourceState(json=value) if value else None
+        self._state = None
+        self._raw = value or None
+
+    def encode(self, content_type=APPLICATION_JSON):
+        """State serialised as bytes in the specified content format"""
+        raw = self._raw
+        if isinstance(raw, bytes) and self.content_type == content_type:
+            return raw
+        if isinstance(raw, str) and content_type == APPLICATION_JSON:
+            return raw.encode()
+        state = self.state
+        if state is None:
+            return None
+        with phase('encode'):
+            return ContentFormats[content_type].encode(state)
 
 
 class Request(Message):
     """A request message"""
 
+    __slots__ = ('uri', '_params')
+
     def __init__(self, uri, data=None, *, json=None, state=None, token=None,
-                 params=()):
-        super().__init__(data=data, json=json, state=state, token=token)
+                 params=(), content=None, content_type=None, trace=None,
+                 deadline=None):
+        # pylint: disable=too-many-arguments
+        super().__init__(data=data, json=json, state=state, token=token,
+                         content=content, content_type=content_type,
+                         trace=trace, deadline=deadline)
         self.uri = uri
-        self.params = MultiDict(params)
+        self._params = (params if isinstance(params, Query) else
+                        MultiDict(params) if params else None)
 
     def __repr__(self):
         return '%s(%r%s)' % (self.__class__.__name__, self.uri, ''.join((
@@ -46,6 +127,17 @@ class Request(Message):
             ', params=%r' % list(self.params.items()) if self.params else '',
         )))
 
+    @property
+    def params(self):
+        """Query parameters (constructed on first access)"""
+        if self._params is None:
+            self._params = MultiDict()
+        return self._params
+
+    @params.setter
+    def params(self, value):
+        self._params = value
+
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
         RequestTypes[cls.method] = cls
@@ -66,6 +158,8 @@ class Request(Message):
 class Create(Request):
     """A CREATE message"""
 
+    __slots__ = ()
+
     method = 'CREATE'
     success = Created
 
@@ -73,6 +167,8 @@ class Create(Request):
 class Retrieve(Request):
     """A RETRIEVE message"""
 
+    __slots__ = ()
+
     method = 'RETRIEVE'
     success = Content
 
@@ -80,6 +176,8 @@ class Retrieve(Request):
 class Update(Request):
     """An UPDATE message"""
 
+    __slots__ = ()
+
     method = 'UPDATE'
     success = Changed
 
@@ -87,6 +185,8 @@ class Update(Request):
 class Delete(Request):
     """A DELETE message"""
 
+    __slots__ = ()
+
     method = 'DELETE'
     success = Deleted
 
@@ -94,6 +194,8 @@ class Delete(Request):
 class Notify(Request):
     """A NOTIFY message"""
 
+    __slots__ = ()
+
     method = 'NOTIFY'
     success = Content
 
@@ -101,13 +203,109 @@ class Notify(Request):
 class Response(Message):
     """A response message"""
 
+    __slots__ = ('status', 'retry_after')
+
     def __init__(self, status, data=None, *, json=None, state=None,
-                 token=None):
-        super().__init__(data=data, json=json, state=state, token=token)
+                 token=None, retry_after=None, content=None,
+                 content_type=None):
+        # pylint: disable=too-many-arguments
+        super().__init__(data=data, json=json, state=state, token=token,
+                         content=content, content_type=content_type)
         self.status = status
 
+        self.retry_after = retry_after
+        """Time (in seconds) after which a failed request may be retried"""
+
     def __repr__(self):
         return '%s(%r%s)' % (self.__class__.__name__, self.status, ''.join((
             ', state=%r' % self.state if self.state is not None else '',
             ', token=%r' % self.token if self.token is not None else '',
+            (', retry_after=%r' % self.retry_after
+             if self.retry_after is not None else ''),
         )))
+
+    @classmethod
+    def empty(cls, status, token=None):
+        """Construct response with no state
+
+        A response with neither state nor token is preconstructed and
+        shared between all callers, and so cannot be modified.
+        """
+        if token is not None:
+            return cls(status, token=token)
+        rsp = EmptyResponses.get(status)
+        if rsp is None:
+            rsp = EmptyResponses.setdefault(status, EmptyResponse(status))
+        return rsp
+
+
+class EmptyResponse(Response):
+    """A preconstructed (and immutable) response with no state"""
+
+    __slots__ = ('frozen',)
+
+    def __init__(self, status):
+        super().__init__(status)
+        self.frozen = True
+
+    def __setattr__(self, name, value):
+        if getattr(self, 'frozen', False):
+            raise AttributeError("%s is immutable" %
+                                 self.__class__.__name__)
+        super().__setattr__(name, value)
+
+
+EmptyResponses = {x: EmptyResponse(x) for x in (Created, Deleted, Changed,
+                                                 Valid)}
+"""Preconstructed empty responses"""
+
+
+class StreamingResponse(Response):
+    """A response message with a streamed body
+
+    The body is made available as an iterator over raw byte chunks,
+    and is never held in memory in its entirety.  The response should
+    be closed once the body is no longer required.
+    """
+
+    __slots__ = ('chunks', 'closer')
+
+    def __init__(self, status, chunks, *, content_type=None, token=None,
+                 retry_after=None, close=None):
+        super().__init__(status, token=token, retry_after=retry_after)
+
+        self.chunks = chunks
+        """Iterator over raw body chunks"""
+
+        self.content_type = content_type
+        """Content type of body"""
+
+        self.closer = close
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+    def members(self, key='links'):
+        """Decode collection members incrementally
+
+        Each member of a collection (such as each link within a
+        discovery response) is yielded as a resource state as soon as
+        it has been received.  See `ContentFormat.iterdecode`.
+        """
+        (fmt, charset) = content_format(self.content_type or
+                                        APPLICATION_JSON)
+        if fmt is None:
+            raise UnsupportedContentFormat(self.content_type)
+        return fmt.iterdecode(self.chunks, key, charset)
+
+    def close(self):
+        """Release underlying connection"""
+        if self.closer is not None:
+            self.closer()
+            self.closer = None
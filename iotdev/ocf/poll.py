@@ -0,0 +1,267 @@
+"""Adaptive polling
+
+A poller periodically retrieves resources from devices that do not
+support notifications, and feeds the results into local resources.
+Polls are scheduled via a heap ordered by due time, so that very large
+numbers of (endpoint, URI) pairs may be polled by a single scheduler
+thread and a fixed pool of worker threads.
+
+Each poll interval is jittered to avoid synchronised bursts of
+requests, and is adapted to how often the polled state actually
+changes: the interval is reduced whenever a change is observed, and
+increased (up to a maximum) whenever the state is found to be
+unchanged.  The number of concurrent polls outstanding to any single
+endpoint is capped, with excess polls being deferred until an earlier
+poll to the same endpoint has completed.
+"""
+
+import heapq
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+import random
+from threading import Condition, Thread
+from time import monotonic
+from .message import Retrieve
+
+
+class PollTarget():
+    """A polled resource"""
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, ep, uri, resource=None, interval=60.0, params=()):
+        # pylint: disable=too-many-arguments
+
+        self.ep = ep
+        """Endpoint"""
+
+        self.uri = uri
+        """Resource URI"""
+
+        self.resource = resource
+        """Local resource updated with polled state (if any)"""
+
+        self.interval = interval
+        """Current poll interval (in seconds)"""
+
+        self.params = params
+        """Query parameters"""
+
+        self.state = None
+        """Most recently polled state"""
+
+        self.polls = 0
+        """Number of completed polls"""
+
+        self.changes = 0
+        """Number of polls that observed a change"""
+
+        self.failures = 0
+        """Number of failed polls"""
+
+        self.due = None
+        self.removed = False
+
+    def __repr__(self):
+        return '%s(%r, %r, interval=%r)' % (self.__class__.__name__,
+                                            self.ep, self.uri, self.interval)
+
+
+class Poller():
+    """An adaptive poller"""
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, workers=16, concurrency=4, minimum=1.0, maximum=300.0,
+                 decrease=0.5, increase=1.25, jitter=0.1, timeout=None):
+        # pylint: disable=too-many-arguments
+
+        self.workers = workers
+        """Number of worker threads"""
+
+        self.concurrency = concurrency
+        """Maximum number of concurrent polls per endpoint"""
+
+        self.minimum = minimum
+        """Minimum poll interval (in seconds)"""
+
+        self.maximum = maximum
+        """Maximum poll interval (in seconds)"""
+
+        self.decrease = decrease
+        """Interval multiplier applied when a change is observed"""
+
+        self.increase = increase
+        """Interval multiplier applied when no change is observed"""
+
+        self.jitter = jitter
+        """Maximum relative jitter applied to each interval"""
+
+        self.timeout = timeout
+        """Request timeout (in seconds)"""
+
+        self.heap = []
+        self.seq = count()
+        self.active = defaultdict(int)
+        self.deferred = defaultdict(deque)
+        self.cond = Condition()
+        self.running = False
+        self.thread = None
+        self.executor = None
+
+    def __repr__(self):
+        return '%s(workers=%r, concurrency=%r)' % (
+            self.__class__.__name__, self.workers, self.concurrency
+        )
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def schedule(self, target, delay):
+        """Schedule next poll (with the lock held)"""
+        target.due = monotonic() + delay
+        heapq.heappush(self.heap, (target.due, next(self.seq), target))
+        self.cond.notify()
+
+    def add(self, ep, uri, resource=None, interval=None, params=()):
+        """Add polled resource
+
+        The first poll is scheduled at a random point within the
+        initial interval, to spread the load of newly added targets.
+        """
+        # pylint: disable=too-many-arguments
+        if interval is None:
+            interval = self.minimum
+        target = PollTarget(ep, uri, resource=resource,
+                            interval=min(max(interval, self.minimum),
+                                         self.maximum),
+                            params=params)
+        with self.cond:
+            self.schedule(target, random.uniform(0, target.interval))
+        return target
+
+    def remove(self, target):
+        """Remove polled resource"""
+        with self.cond:
+            target.removed = True
+
+    def jittered(self, interval):
+        """Apply random jitter to interval"""
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def adapt(self, target, changed):
+        """Adapt poll interval"""
+        if changed:
+            target.interval = max(target.interval * self.decrease,
+                                  self.minimum)
+        else:
+            target.interval = min(target.interval * self.increase,
+                                  self.maximum)
+
+    @staticmethod
+    def apply(target, state):
+        """Apply polled state to local resource, returning True if changed
+
+        Properties that have disappeared from the polled state since
+        the previous poll are deleted from the local resource.  Other
+        local properties (e.g. those omitted from the polled
+        interface) are left unchanged.
+        """
+        previous = target.state
+        if previous is not None and state == previous:
+            return False
+        target.state = state
+        if target.resource is not None:
+            local = target.resource.state
+            with target.resource.batch():
+                for key, value in state.items():
+                    if key not in local or local[key] != value:
+                        local[key] = value
+                for key in previous or ():
+                    if key not in state and key in local:
+                        del local[key]
+        return True
+
+    def poll(self, target):
+        """Poll resource (in a worker thread)
+
+        Any failure (including a transport exception) is counted, and
+        the poll is retried after the current interval (or after any
+        retry delay requested by the endpoint, if longer).
+        """
+        delay = None
+        try:
+            rsp = target.ep.dispatch(Retrieve(target.uri,
+                                              params=target.params),
+                                     timeout=self.timeout)
+        except Exception:  # pylint: disable=broad-except
+            rsp = None
+        if rsp is not None and rsp.status.success:
+            changed = self.apply(target, rsp.state.data
+                                 if rsp.state is not None else {})
+            target.polls += 1
+            target.changes += changed
+            self.adapt(target, changed)
+        else:
+            target.failures += 1
+            if rsp is not None:
+                delay = rsp.retry_after
+        delay = max(self.jittered(target.interval), delay or 0)
+        with self.cond:
+            self.active[target.ep] -= 1
+            deferred = self.deferred[target.ep]
+            if deferred and self.running:
+                self.submit(deferred.popleft())
+            elif not self.active[target.ep]:
+                del self.active[target.ep]
+                del self.deferred[target.ep]
+            if not target.removed:
+                self.schedule(target, delay)
+
+    def submit(self, target):
+        """Submit poll (with the lock held)"""
+        self.active[target.ep] += 1
+        self.executor.submit(self.poll, target)
+
+    def run(self):
+        """Schedule polls until closed"""
+        with self.cond:
+            while self.running:
+                if not self.heap:
+                    self.cond.wait()
+                    continue
+                (due, _, target) = self.heap[0]
+                delay = due - monotonic()
+                if delay > 0:
+                    self.cond.wait(delay)
+                    continue
+                heapq.heappop(self.heap)
+                if target.removed:
+                    continue
+                if self.active[target.ep] >= self.concurrency:
+                    self.deferred[target.ep].append(target)
+                else:
+                    self.submit(target)
+
+    def start(self):
+        """Start polling"""
+        self.executor = ThreadPoolExecutor(self.workers)
+        with self.cond:
+            self.running = True
+        self.thread = Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def close(self):
+        """Stop polling"""
+        with self.cond:
+            self.running = False
+            self.cond.notify()
+        if self.thread is not None:
+            self.thread.join()
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,274 @@
+"""Per-request profiling
+
+A profiler times each phase of handling a request (such as interface
+resolution, resource type construction, property loading, interface
+retrieval or update, serialisation, and transport send and receive).
+Phases are reported via `phase`, which returns a shared no-op context
+manager whenever no request is being profiled on the calling thread,
+so that the instrumentation costs almost nothing unless enabled.
+
+A sample of requests is additionally run under `cProfile` (and
+optionally with `tracemalloc` allocation tracing).  Any request that
+exceeds the latency threshold is recorded in a structured slow-request
+log, along with its phase timings and any captured profile.
+"""
+
+from collections import deque
+from contextlib import contextmanager, nullcontext
+import json
+import random
+from threading import Lock, local
+from time import perf_counter, time
+
+NULL_PHASE = nullcontext()
+"""Shared no-op phase context manager"""
+
+
+class ProfileLocal(local):
+    """Per-thread profiling state
+
+    The default is a class attribute, since looking up a missing
+    thread-local attribute (via an exception) is comparatively slow.
+    """
+
+    profile = None
+
+
+_current = ProfileLocal()
+
+
+def current():
+    """Get request profile for the calling thread (if any)"""
+    return _current.profile
+
+
+def phase(name):
+    """Time a phase of handling the current request (if profiled)"""
+    profile = _current.profile
+    if profile is None:
+        return NULL_PHASE
+    return profile.phase(name)
+
+
+class RequestProfile():
+    """Profile of a single request"""
+
+    def __init__(self, msg):
+
+        self.msg = msg
+        """Request message"""
+
+        self.phases = {}
+        """Total time spent in each phase (in seconds)"""
+
+        self.counts = {}
+        """Number of times each phase was entered"""
+
+        self.duration = None
+        """Total request duration (in seconds)"""
+
+        self.status = None
+        """Response status (if any)"""
+
+        self.stats = None
+        """Captured function profile (if sampled)"""
+
+        self.memory = None
+        """Captured allocation statistics (if sampled)"""
+
+        self.start = perf_counter()
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.msg)
+
+    @contextmanager
+    def phase(self, name):
+        """Time a phase of handling this request"""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = (self.phases.get(name, 0) +
+                                 perf_counter() - start)
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def record(self):
+        """Construct structured log record"""
+        msg = self.msg
+        record = {
+            'time': time(),
+            'method': getattr(msg, 'method', None),
+            'uri': getattr(msg, 'uri', None),
+            'params': list(msg.params.items()) if msg is not None else [],
+            'status': str(self.status) if self.status is not None else None,
+            'duration': self.duration,
+            'phases': {k: {'time': v, 'count': self.counts[k]}
+                       for k, v in self.phases.items()},
+        }
+        if self.stats is not None:
+            record['profile'] = self.stats
+        if self.memory is not None:
+            record['memory'] = self.memory
+        return record
+
+
+class Profiler():
+    """A request profiler
+
+    Every profiled request has its phases timed.  A random sample of
+    requests (in the specified proportion) is also run under
+    `cProfile`, and (if enabled) with allocations traced via
+    `tracemalloc`.  Both function profiling (since Python 3.12) and
+    allocation tracing are process-wide, and so are each performed for
+    at most one request at a time: a sampled request that overlaps
+    another is not profiled.
+
+    Requests taking longer than the threshold (in seconds) are
+    recorded in a bounded list of recent slow requests and, if a log
+    stream is specified, written to it as JSON lines.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, threshold=0.1, sample=0.01, memory=False, top=20,
+                 log=None, maxlen=100):
+        # pylint: disable=too-many-arguments
+
+        self.threshold = threshold
+        """Slow request latency threshold (in seconds)"""
+
+        self.sample = sample
+        """Proportion of requests to run under cProfile"""
+
+        self.memory = memory
+        """Trace allocations within sampled requests"""
+
+        self.top = top
+        """Number of entries to record from each captured profile"""
+
+        self.log = log
+        """Slow request log stream (if any)"""
+
+        self.slow = deque(maxlen=maxlen)
+        """Recent slow request records"""
+
+        self.requests = 0
+        """Number of profiled requests"""
+
+        self.profiling = Lock()
+        self.tracing = Lock()
+        self.writing = Lock()
+        self.counting = Lock()
+
+    def __repr__(self):
+        return '%s(threshold=%r, sample=%r)' % (self.__class__.__name__,
+                                                self.threshold, self.sample)
+
+    @contextmanager
+    def request(self, msg):
+        """Profile handling of a request
+
+        Nested requests on the same thread (e.g. a server dispatch
+        within a transport's request handler) are profiled as part of
+        the outermost request.
+        """
+        if current() is not None:
+            yield current()
+            return
+        profile = RequestProfile(msg)
+        with self.counting:
+            self.requests += 1
+        sampled = self.sample and random.random() < self.sample
+        _current.profile = profile
+        try:
+            if sampled:
+                with self.capture(profile):
+                    yield profile
+            else:
+                yield profile
+        finally:
+            _current.profile = None
+            profile.duration = perf_counter() - profile.start
+            if profile.duration >= self.threshold:
+                self.report(profile)
+
+    def dispatch(self, msg, dispatch):
+        """Profile dispatch of a request, recording the response status"""
+        with self.request(msg) as profile:
+            rsp = dispatch(msg)
+            profile.status = rsp.status
+            return rsp
+
+    @contextmanager
+    def capture(self, profile):
+        """Capture function profile and allocations"""
+        # pylint: disable=import-outside-toplevel
+        import cProfile
+        trace = self.memory and self.tracing.acquire(blocking=False)
+        if trace:
+            import tracemalloc
+            started = not tracemalloc.is_tracing()
+            if started:
+                tracemalloc.start()
+            before = tracemalloc.take_snapshot()
+        prof = None
+        if self.profiling.acquire(blocking=False):
+            prof = cProfile.Profile()
+            try:
+                prof.enable()
+            except ValueError:
+                # Another profiling tool is already active
+                prof = None
+                self.profiling.release()
+        try:
+            yield
+        finally:
+            if prof is not None:
+                prof.disable()
+            if trace:
+                after = tracemalloc.take_snapshot()
+                if started:
+                    tracemalloc.stop()
+                self.tracing.release()
+                ignore = [tracemalloc.Filter(False, x) for x in (
+                    tracemalloc.__file__, __file__,
+                    contextmanager.__code__.co_filename,
+                )]
+                profile.memory = self.allocations(
+                    before.filter_traces(ignore), after.filter_traces(ignore)
+                )
+            if prof is not None:
+                self.profiling.release()
+                profile.stats = self.functions(prof)
+
+    def functions(self, prof):
+        """Summarise function profile"""
+        # pylint: disable=import-outside-toplevel
+        import pstats
+        stats = pstats.Stats(prof).stats
+        entries = sorted(stats.items(), key=lambda x: x[1][3], reverse=True)
+        return [{
+            'function': '%s:%d(%s)' % key,
+            'calls': calls,
+            'tottime': tottime,
+            'cumtime': cumtime,
+        } for key, (_, calls, tottime, cumtime, _) in entries[:self.top]]
+
+    def allocations(self, before, after):
+        """Summarise allocation differences"""
+        return [{
+            'location': str(stat.traceback),
+            'size': stat.size_diff,
+            'count': stat.count_diff,
+        } for stat in after.compare_to(before, 'lineno')[:self.top]
+                if stat.size_diff > 0]
+
+    def report(self, profile):
+        """Record slow request"""
+        record = profile.record()
+        self.slow.append(record)
+        if self.log is not None:
+            line = json.dumps(record, default=str)
+            with self.writing:
+                self.log.write(line + '\n')
+                self.log.flush()
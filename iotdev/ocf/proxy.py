@@ -0,0 +1,162 @@
+"""Forwarding gateway
+
+A gateway accepts requests (typically via a server transport such as
+`HttpServer`), maps each request URI onto a target endpoint, and
+forwards the request through the appropriate client transport.  For
+example, an edge gateway might expose the resources of devices on a
+local network to a cloud service.
+
+Request and response bodies are relayed as encoded content: a body
+is decoded (and re-encoded) only if the content formats used on the
+two sides differ.  Retrievals may optionally be streamed through, so
+that a large response body need never be held in memory in its
+entirety.  Status codes are mapped through the OCF status model on
+each side, so that (for example) an HTTP 503 from a device reaches an
+HTTP client as a 503, and reaches a CoAP client as a 5.03.
+"""
+
+from . import trace
+from .content import APPLICATION_JSON
+from .message import EmptyResponse, Response, Retrieve
+from .status import (StatusException, BadGateway, GatewayTimeout,
+                     ProxyingNotSupported)
+from .transport import Transports
+
+
+class Route():
+    """A gateway route"""
+
+    def __init__(self, prefix, ep, path='', transport=None):
+
+        self.prefix = prefix.rstrip('/')
+        """Local URI path prefix"""
+
+        self.ep = ep
+        """Target endpoint"""
+
+        self.path = path.rstrip('/')
+        """Target URI path prefix"""
+
+        self.transport = transport
+        """Client transport (or None to use the endpoint's default)"""
+
+    def __repr__(self):
+        return '%s(%r, %r, path=%r)' % (self.__class__.__name__,
+                                        self.prefix, self.ep, self.path)
+
+    def matches(self, uri):
+        """Check if route matches a local URI path"""
+        return (uri == self.prefix or uri.startswith(self.prefix + '/') or
+                not self.prefix)
+
+    def rewrite(self, uri):
+        """Rewrite local URI path to target URI path"""
+        return (self.path + uri[len(self.prefix):]) or '/'
+
+
+class Gateway():
+    """A forwarding gateway
+
+    Routes are matched by longest local URI path prefix.  A request
+    matching no route is rejected with `ProxyingNotSupported`.
+
+    If streaming is enabled, then retrievals forwarded through a
+    transport that supports streaming are returned as a
+    `StreamingResponse`, which must then be relayed by a server
+    transport that supports streaming (such as `HttpServer`).
+    """
+
+    def __init__(self, routes=(), streaming=False, timeout=None):
+
+        self.routes = []
+        """Routes (in order of decreasing prefix length)"""
+
+        self.streaming = streaming
+        """Stream retrieved response bodies"""
+
+        self.timeout = timeout
+        """Upstream request timeout (in seconds)"""
+
+        self.forwarded = 0
+        """Number of forwarded requests"""
+
+        for route in routes:
+            self.routes.append(route)
+        self.routes.sort(key=lambda x: len(x.prefix), reverse=True)
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.routes)
+
+    def add(self, prefix, ep, path='', transport=None):
+        """Add route"""
+        route = Route(prefix, ep, path=path, transport=transport)
+        self.routes.append(route)
+        self.routes.sort(key=lambda x: len(x.prefix), reverse=True)
+        return route
+
+    def route(self, uri):
+        """Find route for a local URI path"""
+        route = next((x for x in self.routes if x.matches(uri)), None)
+        if route is None:
+            raise ProxyingNotSupported(uri)
+        return route
+
+    @staticmethod
+    def upstream(msg, route, transport):
+        """Construct upstream request message
+
+        The body is passed through as encoded content, which is
+        transcoded only if the upstream transport uses a different
+        content format.
+        """
+        content_type = getattr(transport, 'content_type', APPLICATION_JSON)
+        return type(msg)(route.rewrite(msg.uri),
+                         content=msg.encode(content_type),
+                         content_type=content_type, params=msg.params,
+                         trace=msg.trace, deadline=msg.deadline)
+
+    @staticmethod
+    def relay(rsp, token):
+        """Relay upstream response to the original requester"""
+        if rsp.token == token:
+            return rsp
+        if isinstance(rsp, EmptyResponse):
+            return Response.empty(rsp.status, token)
+        rsp.token = token
+        return rsp
+
+    def forward(self, msg):
+        """Forward request message"""
+        route = self.route(msg.uri)
+        transport = (route.transport if route.transport is not None
+                     else Transports[route.ep.scheme])
+        upstream = self.upstream(msg, route, transport)
+        self.forwarded += 1
+        try:
+            if (self.streaming and isinstance(msg, Retrieve) and
+                    hasattr(transport, 'stream')):
+                rsp = route.ep.stream(upstream, transport=transport,
+                                      timeout=self.timeout)
+            else:
+                rsp = route.ep.dispatch(upstream, transport=transport,
+                                        timeout=self.timeout)
+        except OSError as exc:
+            # Includes all `requests` library connection failures
+            raise BadGateway(str(exc)) from exc
+        return self.relay(rsp, msg.token)
+
+    def dispatch(self, msg):
+        """Dispatch request message
+
+        Any failure is converted into a response with the
+        corresponding status code.
+        """
+        if msg.expired:
+            return Response.empty(GatewayTimeout, msg.token)
+        with trace.span('proxy', msg) as span:
+            try:
+                rsp = self.forward(msg)
+            except StatusException as exc:
+                rsp = Response.empty(type(exc), msg.token)
+            span.set_status(rsp.status)
+        return rsp
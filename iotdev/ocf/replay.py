@@ -0,0 +1,237 @@
+"""Traffic replay
+
+A replayer reissues traffic captured by a `Recorder` (typically
+against a local server running a new version of the code), either at
+the original pace, at a multiple of the original pace, or as fast as
+possible, and reports any divergence in response status or latency.
+This allows production load patterns to be reproduced as a
+performance regression test.
+
+Requests are issued on schedule by a single thread and sent from a
+pool of worker threads.  If the workers cannot keep up, then requests
+are issued late, and the maximum lag is reported.  Captured requests
+are read and issued incrementally, so that memory usage does not
+depend upon the size of the capture.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import heapq
+from threading import BoundedSemaphore
+from time import monotonic, sleep
+from .capture import failure
+from .endpoint import Endpoint
+from .loadgen import percentile, PERCENTILES
+
+
+class Divergence():
+    """A divergence between captured and replayed traffic"""
+
+    __slots__ = ('record', 'outcome', 'latency')
+
+    def __init__(self, record, outcome, latency):
+
+        self.record = record
+        """Captured request"""
+
+        self.outcome = outcome
+        """Replayed response status (or exception type)"""
+
+        self.latency = latency
+        """Replayed latency (in seconds)"""
+
+    def __repr__(self):
+        return '%s(%r, %r, latency=%.2fms)' % (
+            self.__class__.__name__, self.record, self.outcome,
+            self.latency * 1000
+        )
+
+    @property
+    def status(self):
+        """Response status differs from that captured"""
+        return self.outcome is not self.record.status
+
+
+class ReplayReport():
+    """A replay report"""
+
+    def __init__(self, elapsed, captured, latencies, divergences, lag):
+        # pylint: disable=too-many-arguments
+
+        self.elapsed = elapsed
+        """Elapsed time (in seconds)"""
+
+        self.requests = len(latencies)
+        """Number of replayed requests"""
+
+        self.captured = sorted(captured)
+        """Sorted captured latencies (in seconds)"""
+
+        self.latencies = sorted(latencies)
+        """Sorted replayed latencies (in seconds)"""
+
+        self.divergences = divergences
+        """Divergences from captured traffic"""
+
+        self.lag = lag
+        """Maximum delay in issuing a request (in seconds)"""
+
+    def __repr__(self):
+        return '%s(requests=%r, divergences=%r)' % (
+            self.__class__.__name__, self.requests, len(self.divergences)
+        )
+
+    def __str__(self):
+        lines = ['%d requests in %.2fs (%.1f/s), %d status divergences, '
+                 '%d latency divergences, max lag %.2fms' % (
+                     self.requests, self.elapsed, self.throughput,
+                     len(self.status_divergences),
+                     len(self.divergences) - len(self.status_divergences),
+                     self.lag * 1000,
+                 )]
+        for name, latencies in (('captured', self.captured),
+                                ('replayed', self.latencies)):
+            if latencies:
+                lines.append('%-8s %s' % (name, '  '.join(
+                    'p%g %.2fms' % (pct, percentile(latencies, pct) * 1000)
+                    for pct in PERCENTILES
+                )))
+        return '\n'.join(lines)
+
+    @property
+    def throughput(self):
+        """Throughput (in requests per second)"""
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def status_divergences(self):
+        """Divergences in response status"""
+        return [x for x in self.divergences if x.status]
+
+
+class Replayer():
+    """A traffic replayer
+
+    Captured requests are reissued at the original pace multiplied by
+    the specified speed (or as fast as possible, if the speed is None)
+    from a pool of worker threads.  Requests are sent to their original
+    endpoints, unless a replacement endpoint is specified.
+
+    The captured requests may be given as a `Capture`, or as any
+    iterable of `CaptureRecord` objects.  Since requests are captured
+    as their responses arrive, they may be out of order by up to the
+    longest captured latency.  They are reordered within a window of
+    the specified duration (in seconds).
+
+    A replayed request diverges if its response status differs from
+    that captured, or if its latency exceeds the captured latency by
+    more than the specified factor and margin (in seconds).
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, capture, ep=None, transport=None, speed=1.0,
+                 workers=16, timeout=None, factor=2.0, margin=0.005,
+                 window=60.0):
+        # pylint: disable=too-many-arguments
+
+        self.capture = capture
+        """Captured requests"""
+
+        self.ep = ep
+        """Replacement endpoint (if any)"""
+
+        self.transport = transport
+        """Transport (if not the endpoint's default transport)"""
+
+        self.speed = speed
+        """Replay speed relative to original pace (or None)"""
+
+        self.workers = workers
+        """Number of worker threads"""
+
+        self.timeout = timeout
+        """Request timeout (in seconds)"""
+
+        self.factor = factor
+        """Permitted latency increase factor"""
+
+        self.margin = margin
+        """Permitted latency increase margin (in seconds)"""
+
+        self.window = window
+        """Reordering window (in seconds)"""
+
+        self.endpoints = {}
+
+    def __repr__(self):
+        return '%s(%r, speed=%r)' % (self.__class__.__name__, self.capture,
+                                     self.speed)
+
+    def endpoint(self, uri):
+        """Get endpoint for a captured endpoint URI"""
+        if self.ep is not None:
+            return self.ep
+        ep = self.endpoints.get(uri)
+        if ep is None:
+            ep = self.endpoints.setdefault(uri, Endpoint(uri))
+        return ep
+
+    def replay(self, record):
+        """Replay a captured request (in a worker thread)"""
+        ep = self.endpoint(record.ep)
+        start = monotonic()
+        try:
+            outcome = ep.dispatch(record.request(), transport=self.transport,
+                                  timeout=self.timeout).status
+        except Exception as exc:  # pylint: disable=broad-except
+            outcome = failure(exc)
+            if outcome is None:
+                outcome = type(exc)
+        latency = monotonic() - start
+        if (outcome is not record.status or
+                latency > record.duration * self.factor + self.margin):
+            return (latency, Divergence(record, outcome, latency))
+        return (latency, None)
+
+    def ordered(self):
+        """Iterate over captured requests in the order in which sent"""
+        heap = []
+        for index, record in enumerate(self.capture):
+            heapq.heappush(heap, (record.offset, index, record))
+            # Any later record was sent no earlier than this
+            horizon = record.offset + record.duration - self.window
+            while heap[0][0] <= horizon:
+                yield heapq.heappop(heap)[2]
+        while heap:
+            yield heapq.heappop(heap)[2]
+
+    def run(self):
+        """Replay captured traffic, returning a replay report"""
+        lag = 0.0
+        captured = []
+        latencies = []
+        divergences = []
+        pending = BoundedSemaphore(self.workers * 4)
+
+        def done(future):
+            (latency, divergence) = future.result()
+            latencies.append(latency)
+            if divergence is not None:
+                divergences.append(divergence)
+            pending.release()
+
+        start = monotonic()
+        with ThreadPoolExecutor(self.workers) as executor:
+            for record in self.ordered():
+                if self.speed is not None:
+                    due = start + record.offset / self.speed
+                    delay = due - monotonic()
+                    if delay > 0:
+                        sleep(delay)
+                    else:
+                        lag = max(lag, -delay)
+                pending.acquire()  # pylint: disable=consider-using-with
+                captured.append(record.duration)
+                executor.submit(self.replay, record).add_done_callback(done)
+        elapsed = monotonic() - start
+        return ReplayReport(elapsed, captured, latencies, divergences, lag)
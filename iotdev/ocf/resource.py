@@ -1,10 +1,13 @@
 """Resources"""
 
 from collections.abc import Mapping
+from contextlib import nullcontext
 from types import MappingProxyType
 from .interface import Interfaces, BaselineInterface
+from .profile import phase
 from .rt import ResourceType, ResourceTypeMeta
 from .state import TrackedResourceState
+from .status import BadRequest
 
 
 class ResourceInterfaces(Mapping):
@@ -40,6 +43,8 @@ class Resource():
     temperature sensor).
     """
 
+    __slots__ = ['state', 'cached_rt', '__weakref__']
+
     default_intf = BaselineInterface
 
     def __init__(self, state=None):
@@ -102,15 +107,48 @@ class Resource():
         """
         return ResourceInterfaces(self)
 
-    def retrieve(self, params=MappingProxyType({})):
-        """Retrieve resource representation"""
-        intf = self.intf[params.get('if', self.default_intf)]
-        return intf.retrieve(params)
+    def interface(self, params=MappingProxyType({})):
+        """Select interface for request parameters
+
+        The selection must depend only upon the request parameters and
+        the resource's list of interfaces, so that it may be cached.
+        """
+        name = str(params.get('if', self.default_intf))
+        intf = Interfaces.get(name)
+        if intf is None:
+            raise BadRequest('Unknown interface: %s' % name)
+        return intf
+
+    def retrieve(self, params=MappingProxyType({}), intf=None):
+        """Retrieve resource representation
 
-    def update(self, data, params=MappingProxyType({})):
+        The interface is selected from the request parameters, unless
+        already specified (e.g. from a cached selection).
+        """
+        with phase('intf'):
+            intf = (intf if intf is not None else self.interface(params))(self)
+        with phase('retrieve'):
+            return intf.retrieve(params)
+
+    def update(self, data, params=MappingProxyType({}), intf=None):
         """Update resource representation"""
-        intf = self.intf[params.get('if', self.default_intf)]
-        intf.update(data, params)
+        with phase('intf'):
+            intf = (intf if intf is not None else self.interface(params))(self)
+        with phase('update'):
+            return intf.update(data, params)
+
+    def snapshot(self):
+        """Consistent (read-only) snapshot of resource
+
+        Resources that may be updated concurrently with retrieval
+        should return a snapshot that is unaffected by any subsequent
+        updates.
+        """
+        return self
+
+    def batch(self):
+        """Context manager for applying several changes as one"""
+        return nullcontext()
 
     def load(self, names, params):
         """Load resource properties"""
@@ -119,3 +157,13 @@ class Resource():
     def save(self, names, params):
         """Save resource properties"""
         pass
+
+    @classmethod
+    def save_all(cls, resources, names, params):
+        """Save resource properties for several resources of this class
+
+        Resources backed by a common store may override this to save
+        all of the resources as a single batch.
+        """
+        for resource in resources:
+            resource.save(names, params)
@@ -0,0 +1,325 @@
+"""Request routing
+
+A router maps request URI paths onto targets (such as the resources
+hosted by a server).  A route pattern may contain path parameters
+(e.g. ``/devices/{id}/temperature``), each of which matches any
+single path segment.
+
+Routes without parameters are held in a dictionary keyed by the
+normalised path, and parameterised routes in a trie of path segments,
+so that the cost of a lookup depends only upon the length of the path
+and not upon the number of routes.
+
+Query strings are parsed only when first accessed (see `Query`).  The
+interface selected by each distinct query is cached per route, so
+that the interface lookup for a repeated query (or for no query at
+all) costs only a dictionary lookup.
+"""
+
+from collections.abc import Mapping
+from types import MappingProxyType
+from urllib.parse import parse_qsl
+from multidict import MultiDict, MultiDictProxy
+
+NO_PARAMS = MappingProxyType({})
+"""Shared empty path parameters"""
+
+
+def normalise(path):
+    """Normalise URI path (by removing any trailing slash)"""
+    return path.rstrip('/') or '/'
+
+
+def segments(path):
+    """Split normalised URI path into segments"""
+    return path.strip('/').split('/') if path != '/' else []
+
+
+def parameter(segment):
+    """Get name of path parameter segment (or None for a literal)"""
+    if len(segment) > 2 and segment[0] == '{' and segment[-1] == '}':
+        return segment[1:-1]
+    return None
+
+
+class Query(Mapping):
+    """Lazily parsed query string parameters
+
+    This provides the same (read-only) interface as the `MultiDict`
+    used for request parameters, but parses the query string only if
+    and when a parameter is first accessed.
+    """
+
+    __slots__ = ('string', '_params')
+
+    def __init__(self, string):
+
+        self.string = string
+        """Raw query string"""
+
+        self._params = None
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.string)
+
+    @property
+    def params(self):
+        """Parsed parameters"""
+        if self._params is None:
+            self._params = MultiDictProxy(MultiDict(
+                parse_qsl(self.string, keep_blank_values=True)
+            ))
+        return self._params
+
+    def __bool__(self):
+        return bool(self.string)
+
+    def __getitem__(self, key):
+        return self.params[key]
+
+    def __iter__(self):
+        return iter(self.params)
+
+    def __len__(self):
+        return len(self.params)
+
+    def __contains__(self, key):
+        return key in self.params
+
+    def get(self, key, default=None):
+        return self.params.get(key, default)
+
+    def getall(self, key, *default):
+        """Get all values of a parameter"""
+        return self.params.getall(key, *default)
+
+    def keys(self):
+        return self.params.keys()
+
+    def items(self):
+        return self.params.items()
+
+    def values(self):
+        return self.params.values()
+
+
+class Route():
+    """A route
+
+    A route's target may be a factory, which is called with the path
+    parameter values as keyword arguments to construct the actual
+    target for each request.
+    """
+
+    __slots__ = ('pattern', 'target', 'factory', 'names', 'cached',
+                 'queries', 'default')
+
+    max_queries = 64
+    """Maximum number of distinct queries with a cached interface"""
+
+    def __init__(self, pattern, target, factory=False):
+
+        self.pattern = normalise(pattern)
+        """Route pattern"""
+
+        self.target = target
+        """Target (or target factory)"""
+
+        self.factory = factory
+        """Target is a factory"""
+
+        self.names = tuple(x for x in map(parameter, segments(self.pattern))
+                           if x is not None)
+        """Path parameter names"""
+
+        self.cached = not factory and hasattr(target, 'interface')
+        """Interface selections are cached"""
+
+        self.queries = {}
+        """Cached interface selected by each distinct query"""
+
+        self.default = None
+        """Precomputed interface selected by an empty query"""
+
+        if self.cached:
+            if hasattr(getattr(target, 'state', None), 'track'):
+                target.state.track('if', self.clear)
+            self.clear()
+
+    def __repr__(self):
+        return '%s(%r, %r)' % (self.__class__.__name__, self.pattern,
+                               self.target)
+
+    def clear(self):
+        """Clear cached interface lookups"""
+        self.queries = {}
+        self.default = self.target.interface(NO_PARAMS)
+
+    def interface(self, params, target=None):
+        """Select interface for request parameters
+
+        Returns None if the target does not support interface
+        selection.
+        """
+        if target is None:
+            target = self.target
+        if not self.cached or target is not self.target:
+            select = getattr(target, 'interface', None)
+            return select(params) if select is not None else None
+        if not params:
+            return self.default
+        key = (params.string if isinstance(params, Query) else
+               tuple(params.items()))
+        intf = self.queries.get(key)
+        if intf is None:
+            intf = self.target.interface(params)
+            if len(self.queries) >= self.max_queries:
+                self.queries = {}
+            self.queries[key] = intf
+        return intf
+
+
+class RouteMatch():
+    """A matched route"""
+
+    __slots__ = ('route', 'params')
+
+    def __init__(self, route, params=NO_PARAMS):
+
+        self.route = route
+        """Matched route"""
+
+        self.params = params
+        """Path parameter values"""
+
+    def __repr__(self):
+        return '%s(%r, %r)' % (self.__class__.__name__, self.route,
+                               dict(self.params))
+
+    def target(self):
+        """Get (or construct) target"""
+        route = self.route
+        if route.factory:
+            return route.target(**self.params)
+        return route.target
+
+    def interface(self, params, target=None):
+        """Select interface for request parameters"""
+        return self.route.interface(params, target)
+
+
+class RouteNode():
+    """A node within the routing trie"""
+
+    __slots__ = ('children', 'param', 'route')
+
+    def __init__(self):
+
+        self.children = {}
+        """Child nodes for literal segments"""
+
+        self.param = None
+        """Child node for a path parameter segment (if any)"""
+
+        self.route = None
+        """Route ending at this node (if any)"""
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.route)
+
+    def match(self, parts, index, values):
+        """Match remaining path segments (returning the route, if any)
+
+        Literal segments take precedence over path parameters.
+        Captured parameter values are appended to ``values``.
+        """
+        if index == len(parts):
+            return self.route
+        child = self.children.get(parts[index])
+        if child is not None:
+            route = child.match(parts, index + 1, values)
+            if route is not None:
+                return route
+        if self.param is not None and parts[index]:
+            values.append(parts[index])
+            route = self.param.match(parts, index + 1, values)
+            if route is not None:
+                return route
+            values.pop()
+        return None
+
+
+class Router():
+    """A request router"""
+
+    def __init__(self):
+
+        self.static = {}
+        """Routes without path parameters, keyed by path"""
+
+        self.root = RouteNode()
+        """Root of trie of parameterised routes"""
+
+        self.count = 0
+
+    def __repr__(self):
+        return '%s(%d routes)' % (self.__class__.__name__, len(self))
+
+    def __len__(self):
+        return len(self.static) + self.count
+
+    def node(self, pattern, create=False):
+        """Find trie node for a parameterised route pattern"""
+        node = self.root
+        for segment in segments(pattern):
+            if parameter(segment) is not None:
+                if node.param is None and create:
+                    node.param = RouteNode()
+                node = node.param
+            elif create:
+                node = node.children.setdefault(segment, RouteNode())
+            else:
+                node = node.children.get(segment)
+            if node is None:
+                return None
+        return node
+
+    def add(self, pattern, target, factory=False):
+        """Add (or replace) route"""
+        route = Route(pattern, target, factory=factory)
+        if not route.names:
+            self.static[route.pattern] = route
+            return route
+        node = self.node(route.pattern, create=True)
+        if node.route is None:
+            self.count += 1
+        node.route = route
+        return route
+
+    def remove(self, pattern):
+        """Remove route"""
+        pattern = normalise(pattern)
+        if pattern in self.static:
+            del self.static[pattern]
+            return
+        node = self.node(pattern)
+        if node is None or node.route is None:
+            raise KeyError(pattern)
+        node.route = None
+        self.count -= 1
+
+    def match(self, path):
+        """Match URI path (returning None if there is no matching route)"""
+        route = self.static.get(path)
+        if route is None:
+            path = normalise(path)
+            route = self.static.get(path)
+        if route is not None:
+            return RouteMatch(route)
+        if not self.count:
+            return None
+        values = []
+        route = self.root.match(segments(path), 0, values)
+        if route is None:
+            return None
+        return RouteMatch(route, dict(zip(route.names, values)))
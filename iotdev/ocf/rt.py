@@ -2,8 +2,11 @@
 
 from itertools import chain
 from orderedset import OrderedSet
+from .json import CompiledJSONEncoder
+from .profile import phase
 from .property import (BooleanProperty, IntegerProperty, StringProperty,
-                       NumericProperty, UUIDProperty, OrderedSetProperty)
+                       NumericProperty, UUIDProperty, ArrayProperty,
+                       OrderedSetProperty)
 
 ResourceTypes = {}
 """Registry of named resource types"""
@@ -48,6 +51,16 @@ class ResourceTypeMeta(type):
     def __len__(cls):
         return len(cls._properties)
 
+    @property
+    def json_encoder(cls):
+        """JSON encoder compiled for this resource type"""
+        # pylint: disable=protected-access
+        encoder = cls.__dict__.get('_json_encoder')
+        if encoder is None:
+            encoder = CompiledJSONEncoder.cached(cls._properties)
+            cls._json_encoder = encoder
+        return encoder
+
     #
     # Allow construction from resource type names
     #
@@ -91,11 +104,13 @@ class ResourceTypeMeta(type):
         resource type names (e.g. ``['oic.r.switch.binary',
         'oic.r.light.brightness']``).
         """
-        bases = sorted(set(ResourceTypes[x] for x in args)) or [ResourceType]
-        if len(bases) == 1:
-            return bases.pop()
-        name = '(%s)' % '+'.join(x.__name__ for x in bases)
-        return type(name, tuple(bases), {})
+        with phase('from_rt'):
+            bases = (sorted(set(ResourceTypes[x] for x in args)) or
+                     [ResourceType])
+            if len(bases) == 1:
+                return bases.pop()
+            name = '(%s)' % '+'.join(x.__name__ for x in bases)
+            return type(name, tuple(bases), {})
 
     #
     # Allow construction via arithmetic operators
@@ -177,6 +192,12 @@ class ResourceType(metaclass=ResourceTypeMeta):
         return sum(x in self.resource.state for x in self._properties)
 
 
+class Discovery(ResourceType, name='oic.wk.res'):
+    """Discoverable resources"""
+
+    links = ArrayProperty(writable=False)
+
+
 class Device(ResourceType, name='oic.wk.d'):
     """A device"""
 
@@ -0,0 +1,151 @@
+"""Servers
+
+A server hosts a collection of resources, each identified by a URI
+path, and handles request messages addressed to those resources.
+Request URIs are resolved via a `Router`, which also caches the
+interface selected by each distinct query on each resource.
+"""
+
+from collections import UserDict
+from . import trace
+from .message import Retrieve, Update, Response
+from .router import Router
+from .singleflight import SingleFlight
+from .status import (StatusException, BadRequest, NotFound,
+                     MethodNotAllowed, GatewayTimeout)
+
+
+class Server(UserDict):
+    """A server
+
+    The server may be used as a dictionary in which the keys are URI
+    paths (e.g. ``/fridge``) and the values are the hosted resources.
+
+    Resources may also be constructed on demand for URI paths
+    matching a pattern with path parameters (see `route`).
+
+    Concurrent identical retrievals are coalesced (unless disabled),
+    so that they share a single resource load.  Encoded retrieval
+    responses may optionally be cached, and request handling may
+    optionally be profiled.
+    """
+
+    def __init__(self, endpoints=(), coalesce=True, cache=None,
+                 profiler=None):
+        self.router = Router()
+        """Request router"""
+
+        super().__init__()
+
+        self.endpoints = list(endpoints)
+        """Endpoints through which this server may be reached"""
+
+        self.flights = SingleFlight() if coalesce else None
+        """Coalescing group for concurrent identical retrievals"""
+
+        self.cache = cache
+        """Serialised representation cache (if any)"""
+
+        self.profiler = profiler
+        """Request profiler (if any)"""
+
+        self.expired = 0
+        """Number of requests dropped due to an expired deadline"""
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.endpoints)
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.router.add(key, value)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.router.remove(key)
+
+    def add(self, uri, resource):
+        """Host resource"""
+        self[uri] = resource
+        return resource
+
+    def route(self, pattern, factory):
+        """Host resources constructed on demand
+
+        The pattern may contain path parameters (e.g.
+        ``/sensor/{id}``).  For each request matching the pattern, the
+        factory is called with the path parameter values as keyword
+        arguments, and should return the resource (or None if there
+        is no such resource).  Such resources are not discoverable.
+        """
+        return self.router.add(pattern, factory, factory=True)
+
+    def handle(self, resource, msg, intf=None, cacheable=True):
+        """Handle request message addressed to a resource
+
+        Retrievals are served from the representation cache (if any)
+        unless the resource is marked as not cacheable (e.g. because
+        it was constructed on demand).
+        """
+        if isinstance(msg, Retrieve):
+            if self.cache is not None and cacheable:
+                content = self.cache.get(
+                    resource, msg.params,
+                    lambda: self.retrieve(resource, msg, intf)
+                )
+                if content is not None:
+                    return Response(msg.success, content=content,
+                                    content_type=self.cache.content_type,
+                                    token=msg.token)
+            return Response(msg.success,
+                            state=self.retrieve(resource, msg, intf),
+                            token=msg.token)
+        if isinstance(msg, Update):
+            state = resource.update(msg.state or {}, msg.params, intf)
+            if state is not None:
+                return Response(msg.success, state=state, token=msg.token)
+            return Response.empty(msg.success, msg.token)
+        raise MethodNotAllowed("%s not supported" % msg.method)
+
+    def retrieve(self, resource, msg, intf=None):
+        """Retrieve resource representation"""
+        if self.flights is None:
+            return resource.retrieve(msg.params, intf)
+        key = (msg.uri, msg.method, tuple(msg.params.items()))
+        (state, shared) = self.flights.do(key, resource.retrieve, msg.params,
+                                          intf)
+        return state.copy() if shared else state
+
+    def dispatch(self, msg):
+        """Dispatch request message
+
+        Any failure is converted into a response with the
+        corresponding status code.  A malformed request body (which is
+        decoded only when first accessed) is treated as a bad request.
+        A request whose deadline has already passed is dropped without
+        being processed.
+        """
+        if msg.expired:
+            self.expired += 1
+            return Response.empty(GatewayTimeout, msg.token)
+        with trace.span('handle', msg) as span:
+            if self.profiler is not None:
+                rsp = self.profiler.dispatch(msg, self.process)
+            else:
+                rsp = self.process(msg)
+            span.set_status(rsp.status)
+        return rsp
+
+    def process(self, msg):
+        """Process request message"""
+        try:
+            match = self.router.match(msg.uri)
+            resource = match.target() if match is not None else None
+            if resource is None:
+                raise NotFound(msg.uri)
+            return self.handle(resource, msg,
+                               match.interface(msg.params, resource),
+                               cacheable=not match.route.factory)
+        except StatusException as exc:
+            return Response.empty(type(exc), msg.token)
+        except ValueError:
+            return Response.empty(BadRequest, msg.token)
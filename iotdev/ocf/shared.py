@@ -0,0 +1,425 @@
+"""Shared-memory resource state
+
+A shared state segment holds the current property values of a set of
+registered resources in a block of shared memory, using a fixed binary
+layout for each resource.  One process (the writer) registers and
+updates resources; any number of other processes may attach to the
+same segment and read the current state without any serialisation or
+inter-process messaging.
+
+Consistency is provided by a sequence lock: the writer increments a
+per-resource sequence number before and after each update (so that
+the sequence number is odd while an update is in progress), and a
+reader retries any read during which the sequence number was odd or
+changed.  The new slot contents are fully encoded before the sequence
+number is incremented, so that an unencodable value can never leave a
+slot locked, and a reader gives up (rather than spinning forever) if
+a slot remains locked for too long.
+
+An update that cannot be encoded is rejected: the offending property
+is restored to its last published value in the writer's own state,
+so that the writer's state never diverges from the shared state and
+subsequent updates to other properties are unaffected.
+"""
+
+import struct
+from collections.abc import Mapping
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from time import sleep
+from uuid import UUID
+from .property import (BooleanProperty, IntegerProperty, NumericProperty,
+                       StringProperty, UUIDProperty)
+from .resource import Resource
+from .rt import ResourceType
+from .state import ResourceState
+
+MAGIC = b'IOTS'
+VERSION = 1
+
+STRING_SIZE = 64
+"""Maximum encoded length of a string-valued property"""
+
+URI_SIZE = 128
+"""Maximum encoded length of a resource URI"""
+
+NAMES_SIZE = 256
+"""Maximum encoded length of a list of resource type or interface names"""
+
+HEADER = struct.Struct('<4sIIIQ')
+"""Segment header (magic, version, capacity, count, heap offset)"""
+
+ENTRY = struct.Struct('<%ds%ds%dsQ' % (URI_SIZE, NAMES_SIZE, NAMES_SIZE))
+"""Directory entry (URI, resource types, interfaces, slot offset)"""
+
+SEQ = struct.Struct('<Q')
+"""Slot sequence number"""
+
+MASKS = struct.Struct('<QQ')
+"""Slot presence and floating-point masks"""
+
+READ_RETRIES = 10000
+"""Maximum number of attempts to read a slot under the sequence lock"""
+
+Created = set()
+"""Names of segments created by this process"""
+
+
+class SharedField():
+    """A fixed-layout property value within a shared state slot"""
+
+    __slots__ = ['name', 'index', 'offset', 'struct', 'numeric', 'uuid',
+                 'string']
+
+    FORMATS = {
+        BooleanProperty: '?',
+        IntegerProperty: 'q',
+        NumericProperty: 'd',
+        UUIDProperty: '16s',
+        StringProperty: '%ds' % STRING_SIZE,
+    }
+    """Map from property class to fixed-layout value format"""
+
+    def __init__(self, name, index, offset, fmt):
+        self.name = name
+        self.index = index
+        self.offset = offset
+        self.struct = struct.Struct('<' + fmt)
+        self.numeric = fmt == 'd'
+        self.uuid = fmt == '16s'
+        self.string = fmt == '%ds' % STRING_SIZE
+
+    @classmethod
+    def format(cls, prop):
+        """Determine fixed-layout value format for a property (if any)"""
+        for base in type(prop).__mro__:
+            if base in cls.FORMATS:
+                return cls.FORMATS[base]
+        return None
+
+    def pack(self, value):
+        """Convert property value to packable form"""
+        if self.uuid:
+            return (value if isinstance(value, UUID) else UUID(value)).bytes
+        if self.string:
+            data = str(value).encode()
+            if len(data) > STRING_SIZE:
+                raise ValueError("Value too long for %s" % self.name)
+            return data
+        return value
+
+    def unpack(self, value, floating):
+        """Convert unpacked value to property value"""
+        if self.uuid:
+            return UUID(bytes=value)
+        if self.string:
+            return value.rstrip(b'\0').decode()
+        if self.numeric and not floating:
+            return int(value)
+        return value
+
+
+class SharedLayout():
+    """Fixed binary layout of a shared state slot
+
+    The layout is determined entirely by the resource type, so that
+    independent processes sharing the same resource type registry will
+    always calculate the same layout.
+    """
+
+    def __init__(self, rt):
+
+        self.rt = rt
+        """Resource type class"""
+
+        self.fields = {}
+        """Fixed-layout fields, indexed by property name"""
+
+        offset = SEQ.size + MASKS.size
+        fmts = []
+        for name in rt:
+            fmt = SharedField.format(rt[name])
+            if fmt is None:
+                continue
+            field = SharedField(name, len(self.fields), offset, fmt)
+            if field.index >= 64:
+                raise ValueError("Too many properties in %s" % rt.__name__)
+            self.fields[name] = field
+            offset += field.struct.size
+            fmts.append(fmt)
+
+        self.struct = struct.Struct('<QQ' + ''.join(fmts))
+        """Slot contents (excluding sequence number)"""
+
+        self.size = SEQ.size + self.struct.size
+        """Total slot size"""
+
+
+class SharedResourceState(Mapping):
+    """Read-only view of resource state within a shared state segment
+
+    This may be used in place of a `ResourceState` by any code that
+    only reads the state.  Each individual property lookup reads the
+    value directly from shared memory; use `snapshot()` to obtain a
+    consistent copy of all property values at a single point in time.
+    """
+
+    __slots__ = ['segment', 'layout', 'offset', 'rt', 'intf']
+
+    def __init__(self, segment, layout, offset, rt, intf):
+        self.segment = segment
+        self.layout = layout
+        self.offset = offset
+        self.rt = rt
+        self.intf = intf
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.data)
+
+    def read(self, reader):
+        """Read from slot under sequence lock"""
+        buf = self.segment.buf
+        offset = self.offset
+        for _ in range(READ_RETRIES):
+            (before,) = SEQ.unpack_from(buf, offset)
+            if before & 1:
+                # Allow the writer to make progress
+                sleep(0)
+                continue
+            value = reader(buf, offset + SEQ.size)
+            (after,) = SEQ.unpack_from(buf, offset)
+            if before == after:
+                return value
+        raise TimeoutError("Shared state slot remains locked")
+
+    def __getitem__(self, key):
+        if key == 'rt':
+            return self.rt
+        if key == 'if':
+            return self.intf
+        field = self.layout.fields[key]
+
+        def reader(buf, offset):
+            (present, floating) = MASKS.unpack_from(buf, offset)
+            (value,) = field.struct.unpack_from(buf,
+                                                self.offset + field.offset)
+            return (present, floating, value)
+
+        (present, floating, value) = self.read(reader)
+        if not present & (1 << field.index):
+            raise KeyError(key)
+        return field.unpack(value, floating & (1 << field.index))
+
+    def __iter__(self):
+        yield 'rt'
+        yield 'if'
+        (present, _) = self.read(MASKS.unpack_from)
+        for name, field in self.layout.fields.items():
+            if present & (1 << field.index):
+                yield name
+
+    def __len__(self):
+        (present, _) = self.read(MASKS.unpack_from)
+        return 2 + bin(present).count('1')
+
+    def snapshot(self):
+        """Consistent copy of all property values"""
+        unpack = self.layout.struct.unpack_from
+        (present, floating, *values) = self.read(unpack)
+        data = {'rt': self.rt, 'if': self.intf}
+        for field, value in zip(self.layout.fields.values(), values):
+            bit = 1 << field.index
+            if present & bit:
+                data[field.name] = field.unpack(value, floating & bit)
+        return ResourceState(data)
+
+    @property
+    def data(self):
+        """Resource state dictionary"""
+        return self.snapshot().data
+
+    @property
+    def json(self):
+        """JSON serialisation of resource state"""
+        return self.snapshot().json
+
+
+class SharedResource(Resource):
+    """A read-only resource backed by a shared state segment"""
+
+    def __init__(self, state):
+        # pylint: disable=super-init-not-called
+        self.cached_rt = None
+        self.state = state
+
+
+class SharedStateSegment(Mapping):
+    """A shared-memory resource state segment
+
+    The segment may be used as a read-only dictionary of
+    `SharedResourceState` views, indexed by resource URI.
+    """
+
+    def __init__(self, name=None, create=False, capacity=1024,
+                 size=(1 << 20)):
+        # pylint: disable=too-many-arguments
+        if create:
+            self.shm = SharedMemory(name=name, create=True, size=size)
+            Created.add(self.shm.name)
+            HEADER.pack_into(self.shm.buf, 0, MAGIC, VERSION, capacity, 0,
+                             HEADER.size + capacity * ENTRY.size)
+        else:
+            self.shm = SharedMemory(name=name)
+            # Attaching to a segment created by another process must
+            # not cause it to be destroyed when this process exits
+            if self.shm.name not in Created:
+                # pylint: disable=protected-access
+                resource_tracker.unregister(self.shm._name, 'shared_memory')
+        (magic, version, _, _, _) = HEADER.unpack_from(self.shm.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a shared state segment")
+        self.buf = self.shm.buf
+        self.views = {}
+        self.layouts = {}
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.name)
+
+    @property
+    def name(self):
+        """Shared memory segment name"""
+        return self.shm.name
+
+    def close(self):
+        """Detach from segment"""
+        self.views.clear()
+        self.buf = None
+        self.shm.close()
+
+    def unlink(self):
+        """Destroy segment"""
+        Created.discard(self.shm.name)
+        self.shm.unlink()
+
+    def layout(self, rt):
+        """Get (cached) layout for resource type"""
+        layout = self.layouts.get(rt)
+        if layout is None:
+            layout = self.layouts[rt] = SharedLayout(rt)
+        return layout
+
+    def refresh(self):
+        """Refresh directory of registered resources"""
+        (_, _, _, count, _) = HEADER.unpack_from(self.buf, 0)
+        for index in range(len(self.views), count):
+            (uri, rt, intf, offset) = ENTRY.unpack_from(
+                self.buf, HEADER.size + index * ENTRY.size
+            )
+            uri = uri.rstrip(b'\0').decode()
+            rt = tuple(rt.rstrip(b'\0').decode().split())
+            intf = tuple(intf.rstrip(b'\0').decode().split())
+            layout = self.layout(ResourceType.from_rt(*rt))
+            self.views[uri] = SharedResourceState(self, layout, offset, rt,
+                                                  intf)
+
+    def __getitem__(self, key):
+        if key not in self.views:
+            self.refresh()
+        return self.views[key]
+
+    def __iter__(self):
+        self.refresh()
+        return iter(self.views)
+
+    def __len__(self):
+        self.refresh()
+        return len(self.views)
+
+    def resource(self, uri):
+        """Construct read-only resource backed by shared state"""
+        return SharedResource(self[uri])
+
+    def register(self, uri, resource):
+        """Register a resource
+
+        The current state of the resource is written to the segment,
+        and the segment will be updated automatically whenever a
+        property value changes.
+        """
+        self.refresh()
+        if uri in self.views:
+            raise KeyError("Already registered: %s" % uri)
+        (magic, version, capacity, count, heap) = HEADER.unpack_from(self.buf,
+                                                                     0)
+        rt = tuple(resource.state.get('rt', ()))
+        intf = tuple(resource.state.get('if', ()))
+        layout = self.layout(ResourceType.from_rt(*rt))
+        if count >= capacity or heap + layout.size > len(self.buf):
+            raise MemoryError("Shared state segment is full")
+        entry = (uri.encode(), ' '.join(rt).encode(), ' '.join(intf).encode())
+        if any(len(x) > y for x, y in zip(entry, (URI_SIZE, NAMES_SIZE,
+                                                  NAMES_SIZE))):
+            raise ValueError("Directory entry too long for %s" % uri)
+        self.buf[heap:heap + layout.size] = bytes(layout.size)
+        ENTRY.pack_into(self.buf, HEADER.size + count * ENTRY.size, *entry,
+                        heap)
+        # Publish directory entry only once it is complete
+        HEADER.pack_into(self.buf, 0, magic, version, capacity, count + 1,
+                         heap + layout.size)
+        self.refresh()
+        view = self.views[uri]
+
+        def publish():
+            self.publish(view, resource.state)
+
+        for name in layout.fields:
+            resource.state.track(name, publish)
+        publish()
+
+    def publish(self, view, state):
+        """Write resource state to slot"""
+        try:
+            data = self.encode(view.layout, state)
+        except Exception:
+            self.rollback(view, state)
+            raise
+        start = view.offset + SEQ.size
+        (seq,) = SEQ.unpack_from(self.buf, view.offset)
+        SEQ.pack_into(self.buf, view.offset, seq + 1)
+        self.buf[start:start + len(data)] = data
+        SEQ.pack_into(self.buf, view.offset, seq + 2)
+
+    @staticmethod
+    def encode(layout, state):
+        """Encode resource state as slot contents"""
+        present = floating = 0
+        values = []
+        for name, field in layout.fields.items():
+            value = state.get(name)
+            if value is None:
+                values.append(field.struct.unpack(
+                    bytes(field.struct.size)
+                )[0])
+                continue
+            present |= 1 << field.index
+            if field.numeric and isinstance(value, float):
+                floating |= 1 << field.index
+            values.append(field.pack(value))
+        return layout.struct.pack(present, floating, *values)
+
+    @staticmethod
+    def rollback(view, state):
+        """Restore unencodable properties to their published values"""
+        published = view.snapshot().data
+        for name, field in view.layout.fields.items():
+            value = state.get(name)
+            if value is None:
+                continue
+            try:
+                field.struct.pack(field.pack(value))
+            except Exception:  # pylint: disable=broad-except
+                # Bypass change tracking, since nothing has changed
+                if name in published:
+                    state.data[name] = published[name]
+                else:
+                    del state.data[name]
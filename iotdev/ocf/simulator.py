@@ -0,0 +1,339 @@
+"""Virtual device fleet simulator
+
+A simulated fleet comprises many synthetic devices, each hosting
+resources constructed from registered resource types.  The state of
+each resource evolves over time according to configurable state change
+models, and each device may inject artificial latency and errors into
+the requests that it handles.
+
+Simulated devices may be reached in-process via the ``sim`` URI
+scheme (e.g. ``sim://fleet/3`` for the fourth device of the fleet
+named ``fleet``), or served over HTTP on the local host.
+"""
+
+import random
+from threading import Event, Thread
+from time import sleep
+from urllib.parse import urlsplit
+from .endpoint import Endpoint
+from .message import Notify, Response
+from .property import BooleanProperty, IntegerProperty, NumericProperty
+from .resource import Resource
+from .rt import ResourceTypeMeta
+from .server import Server
+from .status import GatewayTimeout, NotFound, ServiceUnavailable
+from .transport import Transport
+
+Fleets = {}
+"""Registry of named simulated fleets"""
+
+
+class ChangeModel():
+    """A state change model for a single resource property"""
+
+    def __init__(self, key):
+
+        self.key = key
+        """Property name"""
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.key)
+
+    def initial(self, rng):
+        """Construct initial value"""
+        raise NotImplementedError
+
+    def step(self, value, rng):
+        """Construct next value"""
+        raise NotImplementedError
+
+
+class Toggle(ChangeModel):
+    """A boolean value that changes with a fixed probability"""
+
+    def __init__(self, key, probability=0.1):
+        super().__init__(key)
+
+        self.probability = probability
+        """Probability of changing at each step"""
+
+    def __repr__(self):
+        return '%s(%r, probability=%r)' % (self.__class__.__name__,
+                                           self.key, self.probability)
+
+    def initial(self, rng):
+        return False
+
+    def step(self, value, rng):
+        return (not value) if rng.random() < self.probability else value
+
+
+class RandomWalk(ChangeModel):
+    """A numeric value that follows a bounded random walk"""
+
+    def __init__(self, key, step=1.0, minimum=0.0, maximum=100.0,
+                 integer=False):
+        # pylint: disable=too-many-arguments
+        super().__init__(key)
+
+        self.size = step
+        """Maximum change at each step"""
+
+        self.minimum = minimum
+        """Minimum value"""
+
+        self.maximum = maximum
+        """Maximum value"""
+
+        self.integer = integer
+        """Value is an integer"""
+
+    def __repr__(self):
+        return '%s(%r, step=%r, minimum=%r, maximum=%r)' % (
+            self.__class__.__name__, self.key, self.size, self.minimum,
+            self.maximum
+        )
+
+    def clamp(self, value):
+        """Round and clamp value to permitted range"""
+        if self.integer:
+            value = round(value)
+        else:
+            value = round(value, 2)
+        return min(max(value, self.minimum), self.maximum)
+
+    def initial(self, rng):
+        return self.clamp(rng.uniform(self.minimum, self.maximum))
+
+    def step(self, value, rng):
+        return self.clamp(value + rng.uniform(-self.size, self.size))
+
+
+DefaultModels = {
+    'oic.r.switch.binary': (Toggle('value', 0.05),),
+    'oic.r.light.brightness': (RandomWalk('brightness', 10, 0, 100,
+                                          integer=True),),
+    'oic.r.temperature': (RandomWalk('temperature', 0.5, -20.0, 40.0),),
+    'oic.r.refrigeration': (RandomWalk('filter', 1, 0, 100, integer=True),
+                            Toggle('rapidFreeze', 0.01),
+                            Toggle('rapidCool', 0.01),
+                            Toggle('defrost', 0.01)),
+}
+"""Default state change models for each resource type"""
+
+
+def random_value(prop, rng):
+    """Construct random value for a property (or None if unsupported)"""
+    if isinstance(prop, BooleanProperty):
+        return rng.random() < 0.5
+    if isinstance(prop, IntegerProperty):
+        return rng.randint(0, 100)
+    if isinstance(prop, NumericProperty):
+        return round(rng.uniform(0, 100), 2)
+    return None
+
+
+def rt_names(rt):
+    """Construct list of resource type names"""
+    if isinstance(rt, ResourceTypeMeta):
+        return list(rt.to_rt())
+    if isinstance(rt, str):
+        return [rt]
+    return [name for x in rt for name in rt_names(x)]
+
+
+class SimulatedDevice(Server):
+    """A simulated device
+
+    The hosted resources are specified as a dictionary mapping URI
+    paths to resource types (either as resource type classes or as
+    lists of resource type names).  Each request is delayed by the
+    specified latency plus a uniformly distributed random jitter, and
+    fails with the specified error status with the specified
+    probability.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, resources, models=None, latency=0.0, jitter=0.0,
+                 error_rate=0.0, error=ServiceUnavailable, seed=None,
+                 resource_class=Resource, **kwargs):
+        # pylint: disable=too-many-arguments
+        super().__init__(**kwargs)
+
+        self.models = dict(DefaultModels, **(models or {}))
+        """State change models for each resource type"""
+
+        self.latency = latency
+        """Fixed request latency (in seconds)"""
+
+        self.jitter = jitter
+        """Maximum random additional request latency (in seconds)"""
+
+        self.error_rate = error_rate
+        """Probability of a request failing"""
+
+        self.error = error
+        """Status of a failed request"""
+
+        self.notifications = 0
+        """Number of notifications received"""
+
+        self.rng = random.Random(seed)
+        self.changes = []
+        for uri, rt in resources.items():
+            names = rt_names(rt)
+            resource = self.add(uri, resource_class({
+                'rt': names,
+                'if': ['oic.if.baseline', 'oic.if.a', 'oic.if.s'],
+                'n': uri.strip('/'),
+            }))
+            meta = resource.rt
+            models = [x for name in names for x in self.models.get(name, ())]
+            modelled = {x.key for x in models}
+            with resource.batch():
+                for model in models:
+                    resource.state[model.key] = model.initial(self.rng)
+                for name in meta:
+                    if not meta[name].meta and name not in modelled:
+                        value = random_value(meta[name], self.rng)
+                        if value is not None:
+                            resource.state[name] = value
+            if models:
+                self.changes.append((resource, models))
+
+    def step(self):
+        """Advance state change models, returning number of changes"""
+        changed = 0
+        for resource, models in self.changes:
+            with resource.batch():
+                for model in models:
+                    value = resource.state.get(model.key)
+                    new = model.step(value, self.rng)
+                    if new != value:
+                        resource.state[model.key] = new
+                        changed += 1
+        return changed
+
+    def handle(self, resource, msg, intf=None, cacheable=True):
+        if isinstance(msg, Notify):
+            self.notifications += 1
+            return Response.empty(msg.success, msg.token)
+        return super().handle(resource, msg, intf, cacheable)
+
+    def dispatch(self, msg, timeout=None):
+        """Dispatch request message, with injected latency and errors
+
+        If a timeout (in seconds) is specified, then `GatewayTimeout`
+        is raised if the injected latency exceeds that time.
+        """
+        # pylint: disable=arguments-differ
+        delay = self.latency + self.rng.uniform(0, self.jitter)
+        if timeout is not None and delay > timeout:
+            sleep(timeout)
+            raise GatewayTimeout("Simulated timeout")
+        if delay:
+            sleep(delay)
+        if self.error_rate and self.rng.random() < self.error_rate:
+            return Response.empty(self.error, msg.token)
+        return super().dispatch(msg)
+
+
+class Fleet():
+    """A simulated device fleet
+
+    All devices host the same resources, with independently seeded
+    state change models.  Any additional keyword arguments are passed
+    to each `SimulatedDevice`.
+    """
+
+    def __init__(self, count, resources, name='fleet', seed=None, **kwargs):
+
+        self.name = name
+        """Fleet name (as used in ``sim`` endpoint URIs)"""
+
+        rng = random.Random(seed)
+        self.devices = [SimulatedDevice(resources, seed=rng.getrandbits(64),
+                                        **kwargs) for _ in range(count)]
+        """Simulated devices"""
+
+        self.servers = []
+        self.stopped = Event()
+        self.thread = None
+        for index, device in enumerate(self.devices):
+            device.endpoints.append(Endpoint('sim://%s/%d' % (name, index)))
+        Fleets[name] = self
+
+    def __repr__(self):
+        return '%s(%d, name=%r)' % (self.__class__.__name__,
+                                    len(self.devices), self.name)
+
+    def __len__(self):
+        return len(self.devices)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def endpoints(self, scheme='sim'):
+        """Get first endpoint of each device using a URI scheme"""
+        return [next(x for x in device.endpoints if x.scheme == scheme)
+                for device in self.devices]
+
+    def targets(self, scheme='sim'):
+        """Get (endpoint, URI, resource type) of every hosted resource"""
+        return [(ep, uri, resource.rt)
+                for ep, device in zip(self.endpoints(scheme), self.devices)
+                for uri, resource in device.items()]
+
+    def step(self):
+        """Advance all state change models, returning number of changes"""
+        return sum(x.step() for x in self.devices)
+
+    def run(self, period):
+        """Advance state change models periodically until closed"""
+        while not self.stopped.wait(period):
+            self.step()
+
+    def start(self, period=1.0):
+        """Start advancing state change models in a background thread"""
+        self.thread = Thread(target=self.run, args=(period,), daemon=True)
+        self.thread.start()
+        return self
+
+    def serve(self, address='127.0.0.1'):
+        """Serve all devices over HTTP, returning the HTTP endpoints"""
+        # pylint: disable=import-outside-toplevel
+        from ..transport.httpserver import HttpServer
+        for device in self.devices:
+            server = HttpServer(device, address=address).start()
+            self.servers.append(server)
+            device.endpoints.append(Endpoint(server.uri))
+        return self.endpoints('http')
+
+    def close(self):
+        """Stop simulation"""
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+        for server in self.servers:
+            server.close()
+        self.servers.clear()
+        if Fleets.get(self.name) is self:
+            del Fleets[self.name]
+
+
+class SimulatorTransport(Transport):
+    """An in-process transport to simulated devices"""
+
+    schemes = ('sim',)
+
+    def dispatch(self, ep, msg, timeout=None):
+        url = urlsplit(ep.uri)
+        try:
+            device = Fleets[url.netloc].devices[int(url.path.strip('/'))]
+        except (KeyError, IndexError, ValueError) as exc:
+            raise NotFound(ep.uri) from exc
+        return device.dispatch(msg, timeout=timeout)
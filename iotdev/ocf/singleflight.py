@@ -0,0 +1,62 @@
+"""Single-flight request coalescing
+
+A single-flight group ensures that concurrent calls sharing the same
+key result in only a single underlying call, with every caller
+receiving the result (or exception) of that single call.
+"""
+
+from threading import Event, Lock
+
+
+class SingleFlightCall():
+    """An in-flight call"""
+
+    __slots__ = ['done', 'result', 'error']
+
+    def __init__(self):
+        self.done = Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight():
+    """A single-flight group"""
+
+    def __init__(self):
+        self.calls = {}
+        self.lock = Lock()
+
+    def __repr__(self):
+        return '%s(%d in flight)' % (self.__class__.__name__,
+                                     len(self.calls))
+
+    def do(self, key, func, *args, wait=None, **kwargs):
+        """Call function (unless an identical call is already in flight)
+
+        Returns a tuple of the result and a flag indicating whether or
+        not the result is shared with another caller.  A caller that
+        joins an in-flight call waits for at most the specified time
+        (in seconds), and raises `TimeoutError` if the call has not
+        completed within that time.
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = SingleFlightCall()
+        if leader:
+            try:
+                call.result = func(*args, **kwargs)
+            except BaseException as exc:
+                call.error = exc
+                raise
+            finally:
+                with self.lock:
+                    del self.calls[key]
+                call.done.set()
+            return (call.result, False)
+        if not call.done.wait(wait):
+            raise TimeoutError("Timed out waiting for in-flight call")
+        if call.error is not None:
+            raise call.error
+        return (call.result, True)
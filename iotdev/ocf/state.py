@@ -36,24 +36,41 @@ class ResourceState(UserDict):
 
 
 class TrackedResourceState(ResourceState):
-    """Resource state representation with change tracking support"""
+    """Resource state representation with change tracking support
+
+    Changes may be tracked either via zero-argument callbacks for
+    specific keys, or via watchers that are called with the changed
+    key and its old and new values (with a deleted or previously
+    absent value being represented as None).
+    """
 
     def __init__(self, data=None, json=None):
         self.tracked = defaultdict(list)
+        self.watchers = ()
         super().__init__(data=data, json=json)
 
     def __setitem__(self, key, value):
+        old = self.data.get(key) if self.watchers else None
         super().__setitem__(key, value)
-        if key in self.tracked:
-            for callback in self.tracked[key]:
-                callback()
+        self.notify(key, old, value)
 
     def __delitem__(self, key):
+        old = self.data.get(key) if self.watchers else None
         super().__delitem__(key)
+        self.notify(key, old, None)
+
+    def notify(self, key, old, new):
+        """Notify callbacks and watchers of change"""
         if key in self.tracked:
             for callback in self.tracked[key]:
                 callback()
+        for watcher in self.watchers:
+            watcher(key, old, new)
 
     def track(self, key, callback):
         """Track changes"""
         self.tracked[key].append(callback)
+
+    def watch(self, watcher):
+        """Watch all changes"""
+        self.watchers = (*self.watchers, watcher)
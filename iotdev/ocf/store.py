@@ -0,0 +1,410 @@
+"""Persistent resource store
+
+Resource state is persisted as an append-only log of state changes
+(deltas) in the compact binary encoding, together with a periodic
+snapshot of the complete state of all resources.
+
+The snapshot is memory-mapped on recovery.  Only the index of
+resource keys is decoded eagerly; the state of each individual
+resource is decoded from the mapped snapshot on first access.  This
+allows a store containing a very large number of resources to be
+recovered almost instantly.
+
+Each log record carries a length and a CRC32 checksum, so that a
+record left partially written by a crash will be detected (and
+discarded) on recovery.
+"""
+
+from array import array
+from collections import defaultdict
+from itertools import chain
+import mmap
+import os
+import struct
+from threading import Event, RLock, Thread
+from zlib import crc32
+from .binary import BinaryEncoder, BinaryDecoder
+from .resource import Resource
+from .state import ResourceState
+
+SNAPSHOT_HEADER = struct.Struct('<4sIQQQ')
+"""Snapshot header (magic, version, epoch, count, key index length)"""
+
+SNAPSHOT_MAGIC = b'IOTP'
+
+LOG_HEADER = struct.Struct('<4sIQ')
+"""Log header (magic, version, epoch)"""
+
+LOG_MAGIC = b'IOTL'
+
+RECORD_HEADER = struct.Struct('<II')
+"""Log record header (length, CRC32)"""
+
+VERSION = 1
+
+FSYNC_WRITE = 'write'
+"""Synchronise log to disk after every write"""
+
+FSYNC_BATCH = 'batch'
+"""Synchronise log to disk after every batch of writes"""
+
+FSYNC_INTERVAL = 'interval'
+"""Synchronise log to disk periodically"""
+
+
+class PersistentResource(Resource):
+    """A resource backed by a persistent resource store"""
+
+    def __init__(self, state=None, store=None, key=None):
+        super().__init__(state)
+
+        self.store = store
+        """Persistent resource store"""
+
+        self.key = key
+        """Resource key within store"""
+
+    def load(self, names, params):
+        if self.key not in self.store:
+            return
+        stored = self.store.load(self.key)
+        for name in names:
+            if name not in self.state and name in stored:
+                self.state[name] = stored[name]
+
+    def save(self, names, params):
+        self.store.save(self.key, self.state, names)
+
+    @classmethod
+    def save_all(cls, resources, names, params):
+        stores = defaultdict(list)
+        for resource in resources:
+            stores[resource.store].append((resource.key, resource.state))
+        for store, items in stores.items():
+            store.save_all(items, names)
+
+
+class ResourceStore():
+    """A persistent resource store"""
+
+    # pylint: disable=too-many-instance-attributes
+
+    encoder = BinaryEncoder()
+    decoder = BinaryDecoder()
+
+    def __init__(self, path, fsync=FSYNC_BATCH, batch=64, interval=1.0,
+                 snapshot=100000):
+        # pylint: disable=too-many-arguments
+
+        self.path = path
+        """Store directory"""
+
+        self.fsync = fsync
+        """Log synchronisation policy"""
+
+        self.batch = batch
+        """Number of writes per synchronisation (for batched policy)"""
+
+        self.interval = interval
+        """Time between synchronisations (for interval policy)"""
+
+        self.snapshot_records = snapshot
+        """Number of log records between automatic snapshots"""
+
+        self.epoch = 0
+        self.keys = {}
+        self.offsets = array('Q')
+        self.data = None
+        self.states = {}
+        self.log = None
+        self.records = 0
+        self.unsynced = 0
+        self.lock = RLock()
+        self.stopped = Event()
+        self.syncer = None
+        if fsync not in (FSYNC_WRITE, FSYNC_BATCH, FSYNC_INTERVAL):
+            raise ValueError("Unknown fsync policy %r" % fsync)
+        os.makedirs(path, exist_ok=True)
+        self.recover()
+        if fsync == FSYNC_INTERVAL:
+            self.syncer = Thread(target=self.sync_periodically, daemon=True)
+            self.syncer.start()
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __contains__(self, key):
+        if key in self.states:
+            return self.states[key] is not None
+        return key in self.keys
+
+    def __iter__(self):
+        return (key for key in chain(self.keys, (
+            x for x in self.states if x not in self.keys
+        )) if key in self)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    @property
+    def snapshot_path(self):
+        """Snapshot file path"""
+        return os.path.join(self.path, 'snapshot')
+
+    @property
+    def log_path(self):
+        """Log file path"""
+        return os.path.join(self.path, 'log')
+
+    #
+    # Recovery
+    #
+
+    def recover(self):
+        """Recover state from snapshot and log"""
+        self.load_snapshot()
+        self.replay_log()
+
+    def load_snapshot(self):
+        """Map snapshot and decode key index"""
+        try:
+            with open(self.snapshot_path, 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            return
+        (magic, version, epoch, count, keylen) = (
+            SNAPSHOT_HEADER.unpack_from(data, 0)
+        )
+        if magic != SNAPSHOT_MAGIC or version != VERSION:
+            raise ValueError("Invalid snapshot %s" % self.snapshot_path)
+        pos = SNAPSHOT_HEADER.size
+        keys = data[pos:pos + keylen].decode().split('\0') if count else []
+        pos += keylen
+        offsets = array('Q')
+        offsets.frombytes(data[pos:pos + (count + 1) * offsets.itemsize])
+        self.epoch = epoch
+        self.keys = dict(zip(keys, range(count)))
+        self.offsets = offsets
+        self.data = data
+
+    def replay_log(self):
+        """Replay log records written since the latest snapshot"""
+        try:
+            with open(self.log_path, 'rb') as f:
+                log = f.read()
+        except FileNotFoundError:
+            log = b''
+        valid = 0
+        if len(log) >= LOG_HEADER.size:
+            (magic, version, epoch) = LOG_HEADER.unpack_from(log, 0)
+            if magic != LOG_MAGIC or version != VERSION:
+                raise ValueError("Invalid log %s" % self.log_path)
+            # A log from an earlier epoch has already been fully
+            # incorporated into the snapshot
+            if epoch == self.epoch:
+                valid = LOG_HEADER.size
+                while valid + RECORD_HEADER.size <= len(log):
+                    (length, crc) = RECORD_HEADER.unpack_from(log, valid)
+                    start = valid + RECORD_HEADER.size
+                    record = log[start:start + length]
+                    if len(record) != length or crc32(record) != crc:
+                        break
+                    self.apply(*self.decoder.decode(record))
+                    self.records += 1
+                    valid = start + length
+        if not valid:
+            self.reset_log()
+        else:
+            self.log = open(self.log_path, 'r+b')
+            # Discard any partially written record
+            self.log.truncate(valid)
+            self.log.seek(valid)
+
+    def reset_log(self):
+        """Start a new (empty) log for the current epoch"""
+        if self.log is not None:
+            self.log.close()
+        self.log = open(self.log_path, 'w+b')
+        self.log.write(LOG_HEADER.pack(LOG_MAGIC, VERSION, self.epoch))
+        self.log.flush()
+        os.fsync(self.log.fileno())
+        self.records = 0
+        self.unsynced = 0
+
+    #
+    # State access
+    #
+
+    def load(self, key):
+        """Load stored resource state"""
+        with self.lock:
+            if key not in self:
+                raise KeyError(key)
+            state = self.states.get(key)
+            if state is None:
+                index = self.keys[key]
+                (start, end) = self.offsets[index:index + 2]
+                (state, pos) = self.decoder.decode_from(self.data, start)
+                if pos != end:
+                    raise ValueError("Corrupt snapshot entry for %s" % key)
+                self.states[key] = state
+            return ResourceState(state)
+
+    def resource(self, key):
+        """Construct resource backed by this store"""
+        return PersistentResource(self.load(key), store=self, key=key)
+
+    def resources(self):
+        """Construct all resources backed by this store"""
+        return {key: self.resource(key) for key in self}
+
+    def apply(self, key, changed, deleted):
+        """Apply state delta"""
+        if changed is None:
+            self.states[key] = None
+            return
+        state = self.load(key).data if key in self else {}
+        state.update(changed)
+        for name in deleted:
+            state.pop(name, None)
+        self.states[key] = state
+
+    def save(self, key, state, names=None):
+        """Save resource state
+
+        If property names are specified, only those properties are
+        saved (and any named property not present in the state is
+        deleted).  Otherwise, the complete state is saved.
+        """
+        if names is None:
+            stored = self.load(key) if key in self else {}
+            names = list(chain(state, (x for x in stored if x not in state)))
+        deleted = [x for x in names if x not in state]
+        changed = {x: state[x] for x in names if x in state}
+        self.write(key, changed, deleted)
+
+    def save_all(self, items, names):
+        """Save named properties of several resource states as one batch
+
+        The records for all of the ``(key, state)`` pairs are appended
+        to the log with a single flush (and at most one
+        synchronisation).
+        """
+        self.write_all([
+            (key, {x: state[x] for x in names if x in state},
+             [x for x in names if x not in state])
+            for key, state in items
+        ])
+
+    def delete(self, key):
+        """Delete stored resource"""
+        if key not in self:
+            raise KeyError(key)
+        self.write(key, None, ())
+
+    def write(self, key, changed, deleted):
+        """Append log record"""
+        self.write_all([(key, changed, deleted)])
+
+    def write_all(self, deltas):
+        """Append log records for several state deltas"""
+        records = [self.encoder.encode(x) for x in deltas]
+        with self.lock:
+            for delta, record in zip(deltas, records):
+                self.apply(*delta)
+                self.log.write(RECORD_HEADER.pack(len(record),
+                                                  crc32(record)))
+                self.log.write(record)
+            self.log.flush()
+            self.records += len(records)
+            self.unsynced += len(records)
+            if (self.fsync == FSYNC_WRITE or
+                    (self.fsync == FSYNC_BATCH and
+                     self.unsynced >= self.batch)):
+                self.sync_locked()
+            if self.records >= self.snapshot_records:
+                self.snapshot_locked()
+
+    #
+    # Durability
+    #
+
+    def sync(self):
+        """Synchronise log to disk"""
+        with self.lock:
+            self.sync_locked()
+
+    def sync_locked(self):
+        """Synchronise log to disk (with lock held)"""
+        if self.unsynced:
+            os.fsync(self.log.fileno())
+            self.unsynced = 0
+
+    def sync_periodically(self):
+        """Synchronise log to disk at regular intervals"""
+        while not self.stopped.wait(self.interval):
+            self.sync()
+
+    def snapshot(self):
+        """Write snapshot and start a new log"""
+        with self.lock:
+            self.snapshot_locked()
+
+    def snapshot_locked(self):
+        """Write snapshot and start a new log (with lock held)"""
+        keys = list(self)
+        blob = '\0'.join(keys).encode()
+        start = SNAPSHOT_HEADER.size + len(blob)
+        offsets = array('Q', [start + (len(keys) + 1) * 8])
+        tmp = self.snapshot_path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, VERSION,
+                                         self.epoch + 1, len(keys),
+                                         len(blob)))
+            f.write(blob)
+            f.seek(offsets[0])
+            for key in keys:
+                state = self.states.get(key)
+                if state is None:
+                    # Copy unmodified entries without decoding
+                    index = self.keys[key]
+                    (begin, end) = self.offsets[index:index + 2]
+                    f.write(self.data[begin:end])
+                else:
+                    f.write(self.encoder.encode(state))
+                offsets.append(f.tell())
+            f.seek(start)
+            f.write(offsets.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.snapshot_path)
+        dirfd = os.open(self.path, os.O_RDONLY)
+        try:
+            os.fsync(dirfd)
+        finally:
+            os.close(dirfd)
+        if self.data is not None:
+            self.data.close()
+        self.states = {k: v for k, v in self.states.items() if v is not None}
+        self.load_snapshot()
+        self.reset_log()
+
+    def close(self):
+        """Close store"""
+        self.stopped.set()
+        if self.syncer is not None:
+            self.syncer.join()
+        with self.lock:
+            if self.log is not None:
+                self.sync_locked()
+                self.log.close()
+                self.log = None
+            if self.data is not None:
+                self.data.close()
+                self.data = None
@@ -0,0 +1,326 @@
+"""Client-side rate limiting, concurrency control, and retries
+
+A throttled transport wraps another transport, and limits the load
+that it may place upon each endpoint:
+
+* a token bucket limits the rate of requests sent to each endpoint,
+
+* an additive-increase/multiplicative-decrease (AIMD) limiter adapts
+  the number of concurrent requests outstanding to each endpoint,
+  backing off whenever the endpoint signals overload,
+
+* a retry policy retries idempotent requests with jittered
+  exponential backoff, honouring any retry delay requested by the
+  endpoint, and
+
+* a retry budget shared between all endpoints limits the proportion
+  of retries, so that retries cannot amplify the load upon an already
+  overloaded system.
+"""
+
+import random
+from threading import Condition, Lock
+from time import monotonic, sleep
+from .message import Retrieve, Delete
+from .status import (StatusException, TooManyRequests, ServiceUnavailable,
+                     GatewayTimeout)
+from .transport import Transport
+
+OVERLOAD = {TooManyRequests, ServiceUnavailable, GatewayTimeout}
+"""Statuses indicating that an endpoint is overloaded"""
+
+
+class TokenBucket():
+    """A token bucket rate limiter"""
+
+    def __init__(self, rate, burst=None):
+
+        self.rate = rate
+        """Sustained rate (in requests per second)"""
+
+        self.burst = burst if burst is not None else max(rate, 1)
+        """Maximum burst size"""
+
+        self.tokens = self.burst
+        self.updated = monotonic()
+        self.lock = Lock()
+
+    def __repr__(self):
+        return '%s(%r, burst=%r)' % (self.__class__.__name__, self.rate,
+                                     self.burst)
+
+    def reserve(self):
+        """Reserve a token, returning the time to wait before use"""
+        with self.lock:
+            now = monotonic()
+            self.tokens = min(self.tokens + (now - self.updated) * self.rate,
+                              self.burst)
+            self.updated = now
+            self.tokens -= 1
+            return -self.tokens / self.rate if self.tokens < 0 else 0
+
+    def cancel(self):
+        """Return an unused reserved token"""
+        with self.lock:
+            self.tokens = min(self.tokens + 1, self.burst)
+
+
+class ConcurrencyLimiter():
+    """An AIMD concurrency limiter
+
+    The limit is increased by one for each window of successful
+    requests (i.e. additively, once per "round trip"), and is
+    multiplied by the decrease factor whenever overload is signalled.
+    """
+
+    def __init__(self, limit=8, minimum=1, maximum=256, decrease=0.5):
+        self.limit = limit
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        self.active = 0
+        self.cond = Condition()
+
+    def __repr__(self):
+        return '%s(limit=%r, active=%r)' % (self.__class__.__name__,
+                                            self.limit, self.active)
+
+    def acquire(self, timeout=None):
+        """Acquire permission to send a request"""
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.active < int(self.limit),
+                                      timeout):
+                return False
+            self.active += 1
+            return True
+
+    def release(self, overloaded=False):
+        """Release permission, adjusting the limit"""
+        with self.cond:
+            self.active -= 1
+            if overloaded:
+                self.limit = max(self.limit * self.decrease, self.minimum)
+            else:
+                self.limit = min(self.limit + 1 / self.limit, self.maximum)
+            self.cond.notify_all()
+
+
+class RetryBudget():
+    """A retry budget
+
+    Each request deposits a fraction of a retry into the budget, and
+    each retry withdraws one whole retry.  The budget therefore limits
+    retries to a fixed proportion of requests (plus a small reserve).
+    """
+
+    def __init__(self, ratio=0.1, reserve=10):
+        self.ratio = ratio
+        self.reserve = reserve
+        self.balance = reserve
+        self.lock = Lock()
+
+    def __repr__(self):
+        return '%s(ratio=%r, reserve=%r)' % (self.__class__.__name__,
+                                             self.ratio, self.reserve)
+
+    def deposit(self):
+        """Record a request"""
+        with self.lock:
+            self.balance = min(self.balance + self.ratio,
+                               self.reserve + 1)
+
+    def withdraw(self):
+        """Attempt to record a retry"""
+        with self.lock:
+            if self.balance < 1:
+                return False
+            self.balance -= 1
+            return True
+
+
+class RetryPolicy():
+    """A retry policy using jittered exponential backoff"""
+
+    def __init__(self, attempts=3, base=0.1, cap=10.0, max_retry_after=60.0,
+                 methods=(Retrieve.method, Delete.method)):
+        # pylint: disable=too-many-arguments
+
+        self.attempts = attempts
+        """Maximum number of attempts (including the first)"""
+
+        self.base = base
+        """Base backoff delay (in seconds)"""
+
+        self.cap = cap
+        """Maximum backoff delay (in seconds)"""
+
+        self.max_retry_after = max_retry_after
+        """Maximum honoured endpoint retry delay (in seconds)"""
+
+        self.methods = frozenset(methods)
+        """Retryable (idempotent) request methods"""
+
+    def __repr__(self):
+        return '%s(attempts=%r, base=%r, cap=%r)' % (
+            self.__class__.__name__, self.attempts, self.base, self.cap
+        )
+
+    def retryable(self, msg, attempt):
+        """Check if request may be retried"""
+        return msg.method in self.methods and attempt < self.attempts
+
+    def backoff(self, attempt, retry_after=None):
+        """Calculate delay before retrying (or None to give up)
+
+        An endpoint requesting a retry delay longer than the maximum
+        honoured retry delay is not retried.
+        """
+        delay = random.uniform(0, min(self.cap, self.base * 2 ** attempt))
+        if retry_after is not None:
+            if retry_after > self.max_retry_after:
+                return None
+            delay = max(delay, retry_after)
+        return delay
+
+    def pause(self, retry_after):
+        """Calculate time for which to pause an endpoint"""
+        return min(retry_after, self.max_retry_after)
+
+
+class EndpointThrottle():
+    """Throttling state for a single endpoint"""
+
+    def __init__(self, rate, burst, concurrency):
+        self.bucket = (TokenBucket(rate, burst) if rate is not None
+                       else None)
+        self.limiter = ConcurrencyLimiter(concurrency)
+        self.paused = 0
+
+    def pause(self, delay):
+        """Pause until at least the specified time has elapsed"""
+        self.paused = max(self.paused, monotonic() + delay)
+
+
+class ThrottledTransport(Transport):
+    """A throttled transport"""
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, transport, rate=None, burst=None, concurrency=8,
+                 retry=None, budget=None):
+        # pylint: disable=too-many-arguments
+
+        self.transport = transport
+        """Underlying transport"""
+
+        self.rate = rate
+        """Maximum request rate per endpoint (or None for no limit)"""
+
+        self.burst = burst
+        """Maximum request burst size per endpoint"""
+
+        self.concurrency = concurrency
+        """Initial concurrency limit per endpoint"""
+
+        self.retry = retry if retry is not None else RetryPolicy()
+        """Retry policy"""
+
+        self.budget = budget if budget is not None else RetryBudget()
+        """Retry budget (shared between all endpoints)"""
+
+        self.endpoints = {}
+        self.lock = Lock()
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.transport)
+
+    @property
+    def schemes(self):
+        """Supported URI schemes"""
+        return self.transport.schemes
+
+    def throttle(self, ep):
+        """Get throttling state for endpoint"""
+        with self.lock:
+            throttle = self.endpoints.get(ep.uri)
+            if throttle is None:
+                throttle = self.endpoints[ep.uri] = EndpointThrottle(
+                    self.rate, self.burst, self.concurrency
+                )
+            return throttle
+
+    @staticmethod
+    def remaining(end):
+        """Calculate time remaining until deadline"""
+        if end is None:
+            return None
+        remaining = end - monotonic()
+        if remaining <= 0:
+            raise GatewayTimeout("Request timed out while throttled")
+        return remaining
+
+    def attempt(self, throttle, ep, msg, end):
+        """Make a single attempt to dispatch message"""
+        delay = throttle.paused - monotonic()
+        if throttle.bucket is not None:
+            delay = max(delay, throttle.bucket.reserve())
+        if delay > 0:
+            if end is not None and monotonic() + delay > end:
+                if throttle.bucket is not None:
+                    throttle.bucket.cancel()
+                raise GatewayTimeout("Request timed out while rate limited")
+            sleep(delay)
+        if not throttle.limiter.acquire(self.remaining(end)):
+            raise GatewayTimeout("Request timed out while queued")
+        overloaded = True
+        try:
+            if end is None:
+                rsp = self.transport.dispatch(ep, msg)
+            else:
+                rsp = self.transport.dispatch(ep, msg,
+                                              timeout=self.remaining(end))
+            overloaded = rsp.status in OVERLOAD
+            return rsp
+        except StatusException as exc:
+            overloaded = type(exc) in OVERLOAD
+            raise
+        finally:
+            throttle.limiter.release(overloaded)
+
+    def retry_delay(self, msg, attempt, retry_after, end):
+        """Determine delay before retrying (or None to give up)"""
+        if not self.retry.retryable(msg, attempt):
+            return None
+        delay = self.retry.backoff(attempt, retry_after)
+        if delay is None:
+            return None
+        if end is not None and monotonic() + delay >= end:
+            return None
+        if not self.budget.withdraw():
+            return None
+        return delay
+
+    def dispatch(self, ep, msg, timeout=None):
+        throttle = self.throttle(ep)
+        end = monotonic() + timeout if timeout is not None else None
+        self.budget.deposit()
+        attempt = 1
+        while True:
+            try:
+                rsp = self.attempt(throttle, ep, msg, end)
+            except StatusException as exc:
+                if type(exc) not in OVERLOAD:
+                    raise
+                delay = self.retry_delay(msg, attempt, None, end)
+                if delay is None:
+                    raise
+            else:
+                if rsp.retry_after is not None:
+                    throttle.pause(self.retry.pause(rsp.retry_after))
+                if rsp.status not in OVERLOAD:
+                    return rsp
+                delay = self.retry_delay(msg, attempt, rsp.retry_after, end)
+                if delay is None:
+                    return rsp
+            sleep(delay)
+            attempt += 1
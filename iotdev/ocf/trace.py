@@ -0,0 +1,314 @@
+"""Tracing and deadline propagation
+
+A message may carry a trace context (identifying the trace to which
+the request belongs, and the span within that trace from which it was
+sent) and an absolute deadline (after which the sender will no longer
+be waiting for a response).  Both are propagated between hops: via
+the W3C ``traceparent`` and a ``Request-Timeout`` header over HTTP,
+and via experimental (elective) options over CoAP.  Since clocks are
+not synchronised between hosts, a deadline is always transmitted as
+the time remaining.
+
+While a server is handling a request, the request's trace context and
+deadline become current for the handling thread, so that any onward
+requests (e.g. from a gateway to a device) are automatically placed
+within the same trace and are given no more time than remains for the
+original request.
+
+Spans are emitted only while an exporter is installed.  Otherwise,
+`span` returns a shared no-op span whenever there is no trace context
+or deadline to propagate, so that tracing costs almost nothing when
+disabled.
+"""
+
+from contextlib import contextmanager
+import json
+import random
+from threading import Lock, local
+from time import monotonic, time
+
+TRACEPARENT_HEADER = 'traceparent'
+"""HTTP header carrying trace context"""
+
+TIMEOUT_HEADER = 'Request-Timeout'
+"""HTTP header carrying remaining time (in seconds)"""
+
+OPTION_TRACEPARENT = 65000
+"""CoAP option carrying trace context (experimental, elective)"""
+
+OPTION_TIMEOUT = 65004
+"""CoAP option carrying remaining time (in milliseconds)"""
+
+SAMPLED = 0x01
+"""Trace flag indicating that the trace is sampled"""
+
+_exporter = None
+
+
+class TraceLocal(local):
+    """Per-thread trace context and deadline"""
+
+    context = None
+    deadline = None
+
+
+_current = TraceLocal()
+
+
+class TraceContext():
+    """A trace context"""
+
+    __slots__ = ('trace_id', 'span_id', 'flags')
+
+    def __init__(self, trace_id, span_id, flags=SAMPLED):
+
+        self.trace_id = trace_id
+        """Trace ID (as a 128-bit integer)"""
+
+        self.span_id = span_id
+        """Span ID (as a 64-bit integer)"""
+
+        self.flags = flags
+        """Trace flags"""
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, str(self))
+
+    def __str__(self):
+        return '00-%032x-%016x-%02x' % (self.trace_id, self.span_id,
+                                        self.flags)
+
+    def __eq__(self, other):
+        if not isinstance(other, TraceContext):
+            return NotImplemented
+        return ((self.trace_id, self.span_id, self.flags) ==
+                (other.trace_id, other.span_id, other.flags))
+
+    def __hash__(self):
+        return hash((self.trace_id, self.span_id))
+
+    @property
+    def sampled(self):
+        """Trace is sampled"""
+        return bool(self.flags & SAMPLED)
+
+    @classmethod
+    def new(cls, sampled=True):
+        """Start a new trace"""
+        return cls(random.getrandbits(128) or 1, random.getrandbits(64) or 1,
+                   SAMPLED if sampled else 0)
+
+    def child(self):
+        """Construct context for a new span within the same trace"""
+        return TraceContext(self.trace_id, random.getrandbits(64) or 1,
+                            self.flags)
+
+    @classmethod
+    def parse(cls, value):
+        """Parse ``traceparent`` value (returning None if invalid)"""
+        if not value:
+            return None
+        fields = value.strip().split('-')
+        if (len(fields) < 4 or len(fields[0]) != 2 or fields[0] == 'ff' or
+                len(fields[1]) != 32 or len(fields[2]) != 16 or
+                len(fields[3]) != 2):
+            return None
+        try:
+            (trace_id, span_id, flags) = (int(x, 16) for x in fields[1:4])
+        except ValueError:
+            return None
+        if not trace_id or not span_id:
+            return None
+        return cls(trace_id, span_id, flags)
+
+    def encode(self):
+        """Encode as binary (CoAP option) value"""
+        return (self.trace_id.to_bytes(16, 'big') +
+                self.span_id.to_bytes(8, 'big') + bytes((self.flags,)))
+
+    @classmethod
+    def decode(cls, value):
+        """Decode binary (CoAP option) value (returning None if invalid)"""
+        if value is None or len(value) != 25:
+            return None
+        trace_id = int.from_bytes(value[:16], 'big')
+        span_id = int.from_bytes(value[16:24], 'big')
+        if not trace_id or not span_id:
+            return None
+        return cls(trace_id, span_id, value[24])
+
+
+class Span():
+    """A span (a single timed operation within a trace)"""
+
+    __slots__ = ('name', 'context', 'parent', 'attributes', 'start', 'end',
+                 'timestamp', 'status')
+
+    def __init__(self, name, context, parent=None, attributes=None):
+
+        self.name = name
+        """Span name"""
+
+        self.context = context
+        """Trace context"""
+
+        self.parent = parent
+        """Parent span ID (if any)"""
+
+        self.attributes = attributes or {}
+        """Span attributes"""
+
+        self.timestamp = time()
+        """Start time (wall clock)"""
+
+        self.start = monotonic()
+        self.end = None
+        self.status = None
+
+    def __repr__(self):
+        return '%s(%r, %r)' % (self.__class__.__name__, self.name,
+                               self.context)
+
+    @property
+    def duration(self):
+        """Duration (in seconds)"""
+        return None if self.end is None else self.end - self.start
+
+    def set_status(self, status):
+        """Record outcome"""
+        self.status = status
+
+    def record(self):
+        """Construct structured record"""
+        return {
+            'name': self.name,
+            'trace': '%032x' % self.context.trace_id,
+            'span': '%016x' % self.context.span_id,
+            'parent': ('%016x' % self.parent if self.parent is not None
+                       else None),
+            'time': self.timestamp,
+            'duration': self.duration,
+            'status': str(self.status) if self.status is not None else None,
+            'attributes': self.attributes,
+        }
+
+
+class NullSpan():
+    """A no-op span"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+    def set_status(self, status):
+        """Record outcome (ignored)"""
+
+
+NULL_SPAN = NullSpan()
+"""Shared no-op span"""
+
+
+class SpanExporter():
+    """A span exporter"""
+
+    def export(self, span):
+        """Export completed span"""
+        raise NotImplementedError
+
+
+class MemorySpanExporter(SpanExporter):
+    """A span exporter that retains spans in memory"""
+
+    def __init__(self):
+        self.spans = []
+        """Exported spans"""
+
+    def __repr__(self):
+        return '%s(%d spans)' % (self.__class__.__name__, len(self.spans))
+
+    def export(self, span):
+        self.spans.append(span)
+
+
+class JSONSpanExporter(SpanExporter):
+    """A span exporter that writes spans to a stream as JSON lines"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        """Output stream"""
+
+        self.lock = Lock()
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.stream)
+
+    def export(self, span):
+        line = json.dumps(span.record(), default=str)
+        with self.lock:
+            self.stream.write(line + '\n')
+
+
+def set_exporter(exporter):
+    """Install span exporter (or None to disable), returning the old one"""
+    global _exporter  # pylint: disable=global-statement
+    (old, _exporter) = (_exporter, exporter)
+    return old
+
+
+def current():
+    """Get current trace context for the calling thread (if any)"""
+    return _current.context
+
+
+def deadline():
+    """Get current deadline for the calling thread (if any)"""
+    return _current.deadline
+
+
+def span(name, msg):
+    """Trace handling or sending of a request message
+
+    The message's trace context is replaced with that of the new span
+    (if spans are being exported), and both its trace context and
+    deadline become current for the calling thread for the duration
+    of the span.
+    """
+    if (_exporter is None and msg.trace is None and msg.deadline is None
+            and _current.context is None):
+        return NULL_SPAN
+    return _span(name, msg)
+
+
+@contextmanager
+def _span(name, msg):
+    exporter = _exporter
+    parent = msg.trace if msg.trace is not None else current()
+    if exporter is None:
+        (context, obj) = (parent, NULL_SPAN)
+    else:
+        context = (parent.child() if parent is not None else
+                   TraceContext.new())
+        obj = Span(name, context, parent.span_id if parent else None, {
+            'method': msg.method,
+            'uri': msg.uri,
+        })
+    msg.trace = context
+    saved = (current(), deadline())
+    _current.context = context
+    if msg.deadline is not None:
+        _current.deadline = msg.deadline
+    try:
+        yield obj
+    except Exception as exc:
+        obj.set_status(type(exc).__name__)
+        raise
+    finally:
+        (_current.context, _current.deadline) = saved
+        if obj is not NULL_SPAN:
+            obj.end = monotonic()
+            if context.sampled:
+                exporter.export(obj)
@@ -2,10 +2,94 @@
 
 from abc import ABC, abstractmethod
 from collections import UserDict
+from threading import RLock
+
+ENTRY_POINTS = 'iotdev.transports'
+"""Entry point group for transport providers"""
+
+BUILTIN_PROVIDERS = {
+    'http': 'iotdev.transport.requests:RequestsTransport',
+    'https': 'iotdev.transport.requests:RequestsTransport',
+    'sim': 'iotdev.ocf.simulator:SimulatorTransport',
+}
+"""Built-in transport providers"""
 
 
 class TransportRegistry(UserDict):
-    """Registry of default transports"""
+    """Registry of default transports
+
+    Transports are resolved lazily: the module providing the default
+    transport for a URI scheme is imported (and the transport
+    instantiated) only when that scheme is first looked up.  Providers
+    are found via the ``iotdev.transports`` entry point group, falling
+    back to the built-in providers.  An installed entry point therefore
+    overrides the built-in provider for the same scheme, and a provider
+    registered explicitly via `provide` overrides both.
+    """
+
+    def __init__(self, providers=BUILTIN_PROVIDERS):
+        super().__init__()
+        self.providers = dict(providers)
+        self.provided = set()
+        self.discovered = False
+        self.lock = RLock()
+
+    def __missing__(self, scheme):
+        with self.lock:
+            if scheme in self.data:
+                return self.data[scheme]
+            if not self.discovered:
+                self.discover()
+            provider = self.providers.get(scheme)
+            if provider is None:
+                raise KeyError(scheme)
+            transport = self.resolve(provider)
+            self.register(transport)
+            return self.data.setdefault(scheme, transport)
+
+    def __contains__(self, scheme):
+        with self.lock:
+            if scheme in self.data:
+                return True
+            if not self.discovered:
+                self.discover()
+            return scheme in self.providers
+
+    def get(self, scheme, default=None):
+        try:
+            return self[scheme]
+        except KeyError:
+            return default
+
+    def discover(self):
+        """Discover transport providers via entry points"""
+        # pylint: disable=import-outside-toplevel
+        from importlib.metadata import entry_points
+        with self.lock:
+            for entry in entry_points(group=ENTRY_POINTS):
+                if entry.name not in self.provided:
+                    self.providers[entry.name] = entry.value
+            self.discovered = True
+
+    @staticmethod
+    def resolve(provider):
+        """Import and instantiate transport provider
+
+        The provider is specified as a ``module:name`` string, and
+        may name either a transport class or a transport instance.
+        """
+        # pylint: disable=import-outside-toplevel
+        from pkgutil import resolve_name
+        transport = resolve_name(provider)
+        if isinstance(transport, type):
+            transport = transport()
+        return transport
+
+    def provide(self, scheme, provider):
+        """Register lazily resolved default transport provider"""
+        with self.lock:
+            self.providers[scheme] = provider
+            self.provided.add(scheme)
 
     def register(self, transport):
         """Register default transport"""
@@ -26,6 +110,13 @@ class Transport(ABC):
     """Supported URI schemes"""
 
     @abstractmethod
-    def dispatch(self, ep, msg):
-        """Dispatch message via an endpoint"""
+    def dispatch(self, ep, msg, timeout=None):
+        """Dispatch message via an endpoint
+
+        If a timeout (in seconds) is specified, then the transport
+        should raise `GatewayTimeout` if no response is received
+        within that time.  The timeout is passed only if specified,
+        so that transports predating timeouts continue to work for
+        requests without a timeout.
+        """
         pass
@@ -0,0 +1,177 @@
+"""Versioned (copy-on-write) resource state
+
+A versioned resource state may be safely shared between threads.
+Each version of the state is an immutable dictionary: writers
+construct a modified copy and publish it as the new version with a
+single atomic reference assignment, while readers simply take a
+reference to the current version as a consistent snapshot, without
+any locking.
+
+Writers are serialised by a lock.  Several writes may be batched so
+that they are published (and become visible to readers) as a single
+version, and a batch that fails with an exception is discarded in its
+entirety.  Change tracking callbacks are invoked only after the new
+version has been published and the lock released.
+"""
+
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from threading import RLock, get_ident
+from types import MappingProxyType
+from .compact import resource_type
+from .json import JSONEncoder
+from .resource import Resource
+
+Missing = object()
+
+
+class VersionedResourceState(MutableMapping):
+    """Versioned resource state representation with change tracking"""
+
+    # pylint: disable=too-many-instance-attributes
+
+    json_encoder = JSONEncoder()
+
+    def __init__(self, data=None):
+
+        self.current = MappingProxyType(dict(data or ()))
+        """Current (immutable) version"""
+
+        self.version = 0
+        """Version number"""
+
+        self.tracked = {}
+        self.watchers = ()
+        self.lock = RLock()
+        self.pending = None
+        self.owner = None
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, dict(self.current))
+
+    def view(self):
+        """Get state as visible to the calling thread
+
+        A thread with a batch in progress sees its own pending
+        changes; all other threads see the current version.
+        """
+        if self.owner == get_ident():
+            return self.pending
+        return self.current
+
+    def __getitem__(self, key):
+        return self.view()[key]
+
+    def __setitem__(self, key, value):
+        with self.batch() as data:
+            data[key] = value
+
+    def __delitem__(self, key):
+        with self.batch() as data:
+            del data[key]
+
+    def __contains__(self, key):
+        return key in self.view()
+
+    def __iter__(self):
+        return iter(self.view())
+
+    def __len__(self):
+        return len(self.view())
+
+    @property
+    def data(self):
+        """Raw resource state dictionary"""
+        return dict(self.view())
+
+    @property
+    def json(self):
+        """JSON serialisation of resource state"""
+        return self.json_encoder.encode(self.data)
+
+    def snapshot(self):
+        """Get consistent (immutable) snapshot of current version"""
+        return self.current
+
+    @contextmanager
+    def batch(self):
+        """Batch writes, publishing them as a single new version
+
+        Nested batches within the same thread are merged into the
+        outermost batch.
+        """
+        if self.owner == get_ident():
+            yield self.pending
+            return
+        with self.lock:
+            old = self.current
+            self.pending = dict(old)
+            self.owner = get_ident()
+            try:
+                yield self.pending
+                new = self.current = MappingProxyType(self.pending)
+                self.version += 1
+            finally:
+                self.pending = self.owner = None
+        self.notify(old, new)
+
+    def notify(self, old, new):
+        """Invoke tracking callbacks and watchers for changed values"""
+        for key, callbacks in list(self.tracked.items()):
+            if old.get(key, Missing) is not new.get(key, Missing):
+                for callback in callbacks:
+                    callback()
+        watchers = self.watchers
+        if watchers:
+            for key in [*new, *(x for x in old if x not in new)]:
+                if old.get(key, Missing) is not new.get(key, Missing):
+                    for watcher in watchers:
+                        watcher(key, old.get(key), new.get(key))
+
+    def track(self, key, callback):
+        """Track changes"""
+        with self.lock:
+            self.tracked.setdefault(key, []).append(callback)
+
+    def watch(self, watcher):
+        """Watch all changes"""
+        with self.lock:
+            self.watchers = (*self.watchers, watcher)
+
+
+class ResourceSnapshot(Resource):
+    """A read-only snapshot of a resource"""
+
+    __slots__ = []
+
+    def __init__(self, state):
+        # pylint: disable=super-init-not-called
+        self.state = state
+
+    @property
+    def rt(self):
+        """Resource type"""
+        return resource_type(tuple(self.state.get('rt', ())))
+
+
+class VersionedResource(Resource):
+    """A resource with versioned (copy-on-write) state"""
+
+    __slots__ = []
+
+    def __init__(self, state=None):
+        # pylint: disable=super-init-not-called
+        self.state = VersionedResourceState(state)
+
+    @property
+    def rt(self):
+        """Resource type (cached per distinct ``rt`` value)"""
+        return resource_type(tuple(self.state.get('rt', ())))
+
+    rt = rt.setter(Resource.rt.fset).deleter(Resource.rt.fdel)
+
+    def snapshot(self):
+        return ResourceSnapshot(self.state.snapshot())
+
+    def batch(self):
+        return self.state.batch()
@@ -0,0 +1,283 @@
+"""HTTP server using the standard library `http.server` module"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from math import ceil
+from threading import Thread
+from urllib.parse import urlsplit
+from ..ocf.compression import (ACCEPT_ENCODING_HEADER,
+                                AVAILABLE_DICTIONARY_HEADER,
+                                CONTENT_ENCODING_HEADER)
+from ..ocf.content import APPLICATION_JSON, ContentFormats, parse_content_type
+from ..ocf.http import HttpServerTransport
+from ..ocf.message import Response, StreamingResponse
+from ..ocf.profile import current, phase
+from ..ocf.router import Query
+from ..ocf.status import (StatusException, BadRequest, InternalServerError,
+                          UnsupportedContentFormat)
+
+
+class HttpRequestHandler(BaseHTTPRequestHandler):
+    """HTTP request handler"""
+
+    protocol_version = 'HTTP/1.1'
+
+    server_version = 'iotdev'
+
+    disable_nagle_algorithm = True
+
+    timeout = 60
+    """Idle connection timeout (in seconds)"""
+
+    def log_message(self, format, *args):
+        # pylint: disable=redefined-builtin
+        pass
+
+    def message(self):
+        """Construct OCF request"""
+        reqtype = HttpServerTransport.request(self.command)
+        url = urlsplit(self.path)
+        length = self.length()
+        with phase('receive'):
+            content = self.rfile.read(length) if length else None
+        encoding = self.headers.get(CONTENT_ENCODING_HEADER)
+        if content is not None and encoding:
+            content = self.decompress(encoding, content)
+        content_type = self.headers.get('Content-Type')
+        mimetype = (parse_content_type(content_type)[0] if content_type
+                    else APPLICATION_JSON)
+        if content is not None and mimetype not in ContentFormats:
+            raise UnsupportedContentFormat(content_type)
+        msg = reqtype(url.path, content=content, content_type=mimetype,
+                      params=Query(url.query) if url.query else ())
+        return HttpServerTransport.propagate(msg, self.headers)
+
+    def length(self):
+        """Determine request body length
+
+        The connection is closed after responding to a request with a
+        malformed length, since the end of the body cannot be found.
+        """
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True
+            raise BadRequest("Invalid Content-Length")
+        return length
+
+    def decompress(self, encoding, content):
+        """Decompress request body"""
+        compression = self.server.ocf.compression
+        if compression is None:
+            if encoding.strip().lower() == 'identity':
+                return content
+            raise UnsupportedContentFormat("Unsupported encoding %s" %
+                                           encoding)
+        try:
+            return compression.decompress(encoding, content,
+                                          limit=compression.max_size)
+        except ValueError as exc:
+            raise BadRequest(str(exc)) from exc
+
+    def coding(self):
+        """Negotiate response content coding (if any)"""
+        compression = self.server.ocf.compression
+        if compression is None:
+            return None
+        return compression.negotiate(
+            self.headers.get(ACCEPT_ENCODING_HEADER),
+            self.headers.get(AVAILABLE_DICTIONARY_HEADER),
+        )
+
+    def respond(self, rsp):
+        """Send OCF response"""
+        if isinstance(rsp, StreamingResponse):
+            with rsp:
+                self.respond_stream(rsp)
+            return
+        content_type = self.server.ocf.content_type
+        content = rsp.encode(content_type)
+        code = HttpServerTransport.status(rsp.status, content)
+        compression = self.server.ocf.compression
+        coding = None
+        if (content and compression is not None and
+                len(content) >= compression.min_size and
+                code not in HttpServerTransport.STATUS_NO_CONTENT):
+            coding = self.coding()
+        if coding is not None and len(content) >= compression.stream_size:
+            self.respond_stream(StreamingResponse(
+                rsp.status, (content,), content_type=content_type,
+                retry_after=rsp.retry_after,
+            ), coding)
+            return
+        if coding is not None:
+            content = compression.compress(coding, content)
+        self.send_response(code)
+        if rsp.retry_after is not None:
+            self.send_header('Retry-After', str(ceil(rsp.retry_after)))
+        if compression is not None:
+            self.send_header('Vary', ACCEPT_ENCODING_HEADER)
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        if code not in HttpServerTransport.STATUS_NO_CONTENT:
+            if content:
+                self.send_header('Content-Type', content_type)
+            if coding is not None:
+                self.send_header(CONTENT_ENCODING_HEADER, coding)
+            self.send_header('Content-Length', str(len(content or b'')))
+        with phase('send'):
+            self.end_headers()
+            if content and code not in HttpServerTransport.STATUS_NO_CONTENT:
+                self.wfile.write(content)
+
+    def respond_stream(self, rsp, coding=None):
+        """Send streamed OCF response using chunked transfer encoding
+
+        The response body is compressed incrementally if a content
+        coding is specified or negotiated.
+        """
+        code = HttpServerTransport.status(rsp.status, rsp.content_type)
+        self.send_response(code)
+        if rsp.retry_after is not None:
+            self.send_header('Retry-After', str(ceil(rsp.retry_after)))
+        if code in HttpServerTransport.STATUS_NO_CONTENT:
+            self.end_headers()
+            return
+        compression = self.server.ocf.compression
+        if compression is not None:
+            if coding is None:
+                coding = self.coding()
+            self.send_header('Vary', ACCEPT_ENCODING_HEADER)
+        chunks = iter(rsp)
+        if coding is not None:
+            chunks = compression.stream(coding, chunks,
+                                        HttpServer.CHUNK_SIZE)
+            self.send_header(CONTENT_ENCODING_HEADER, coding)
+        if rsp.content_type is not None:
+            self.send_header('Content-Type', rsp.content_type)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        with phase('send'):
+            try:
+                for chunk in chunks:
+                    if chunk:
+                        self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk),
+                                                              chunk))
+            except Exception:  # pylint: disable=broad-except
+                # Abandon the (now truncated) response
+                self.close_connection = True
+                return
+            self.wfile.write(b'0\r\n\r\n')
+
+    def handle_request(self):
+        """Handle HTTP request"""
+        profiler = self.server.ocf.profiler
+        if profiler is None:
+            self.respond(self.dispatch())
+            return
+        with profiler.request(None) as profile:
+            rsp = self.dispatch()
+            profile.status = rsp.status
+            self.respond(rsp)
+
+    def dispatch(self):
+        """Dispatch HTTP request"""
+        try:
+            msg = self.message()
+        except StatusException as exc:
+            return Response.empty(type(exc))
+        profile = current()
+        if profile is not None:
+            profile.msg = msg
+        try:
+            return self.server.ocf.server.dispatch(msg)
+        except StatusException as exc:
+            return Response.empty(type(exc))
+        except Exception:  # pylint: disable=broad-except
+            return Response.empty(InternalServerError)
+
+    do_GET = do_PUT = do_POST = do_DELETE = handle_request
+
+
+class HttpServer():
+    """An HTTP server
+
+    This serves the resources hosted by a server over HTTP, using a
+    thread per connection.  Persistent (HTTP/1.1) connections are
+    supported, so that a load generator need not pay for connection
+    setup on every request.
+    """
+
+    request_queue_size = 128
+    """Listen backlog"""
+
+    CHUNK_SIZE = 16384
+    """Chunk size for incrementally compressed response bodies"""
+
+    def __init__(self, server, address='127.0.0.1', port=0,
+                 content_type=APPLICATION_JSON, profiler=None,
+                 compression=None):
+        # pylint: disable=too-many-arguments
+
+        self.server = server
+        """Server hosting the resources"""
+
+        self.content_type = content_type
+        """Content type for response bodies"""
+
+        self.profiler = (profiler if profiler is not None else
+                         getattr(server, 'profiler', None))
+        """Request profiler (if any)
+
+        This defaults to the server's profiler, so that the profile
+        of each request also covers reading the request body and
+        writing the response.
+        """
+
+        self.compression = compression
+        """Response compression policy (if any)"""
+
+        self.httpd = ThreadingHTTPServer((address, port), HttpRequestHandler,
+                                         bind_and_activate=False)
+        self.httpd.request_queue_size = self.request_queue_size
+        # Do not wait for idle persistent connections when closing
+        self.httpd.block_on_close = False
+        self.httpd.ocf = self
+        try:
+            self.httpd.server_bind()
+            self.httpd.server_activate()
+        except OSError:
+            self.httpd.server_close()
+            raise
+        (self.address, self.port) = self.httpd.server_address[:2]
+        self.thread = None
+
+    def __repr__(self):
+        return '%s(%r, address=%r, port=%r)' % (
+            self.__class__.__name__, self.server, self.address, self.port
+        )
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def uri(self):
+        """Base URI"""
+        return 'http://%s:%d' % (self.address, self.port)
+
+    def start(self):
+        """Start serving requests in a background thread"""
+        self.thread = Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def close(self):
+        """Stop serving requests"""
+        if self.thread is not None:
+            self.httpd.shutdown()
+            self.thread.join()
+        self.httpd.server_close()
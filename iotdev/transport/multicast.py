@@ -0,0 +1,173 @@
+"""Multicast discovery over CoAP/UDP"""
+
+import os
+import select
+import socket
+from threading import Thread
+from time import monotonic
+from ..ocf.coap import CoapMessage, CoapTransport, NON
+from ..ocf.discovery import (DISCOVERY_URI, DiscoveryResource, Link,
+                             merge_links)
+from ..ocf.endpoint import Endpoint
+from ..ocf.message import Retrieve
+
+ALL_OCF_NODES = '224.0.1.187'
+"""OCF (All CoAP Nodes) IPv4 multicast group"""
+
+COAP_PORT = 5683
+"""CoAP UDP port"""
+
+MAX_DATAGRAM = 65535
+
+
+class MulticastDiscoveryServer():
+    """A multicast discovery server
+
+    This listens for discovery requests sent to a multicast group, and
+    answers them from the discovery resource of a server.  No response
+    is sent to a multicast request that matches no resources, to avoid
+    unnecessary traffic during discovery storms.
+    """
+
+    def __init__(self, server, group=ALL_OCF_NODES, port=COAP_PORT,
+                 interface='0.0.0.0'):
+
+        self.server = server
+        """Server hosting the discoverable resources"""
+
+        self.group = group
+        """Multicast group address"""
+
+        self.interface = interface
+        """Local interface address"""
+
+        if DISCOVERY_URI not in server:
+            server.add(DISCOVERY_URI, DiscoveryResource(server))
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, 'SO_REUSEPORT'):
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        self.sock.bind(('', port))
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP,
+                             socket.inet_aton(group) +
+                             socket.inet_aton(interface))
+        self.port = self.sock.getsockname()[1]
+        self.thread = None
+
+    def __repr__(self):
+        return '%s(%r, group=%r, port=%r, interface=%r)' % (
+            self.__class__.__name__, self.server, self.group, self.port,
+            self.interface
+        )
+
+    def handle(self, data):
+        """Handle received datagram, returning any response"""
+        try:
+            coap = CoapMessage.decode(data)
+            msg = CoapTransport.request(coap)
+        except Exception:  # pylint: disable=broad-except
+            return None
+        if not isinstance(msg, Retrieve) or msg.uri != DISCOVERY_URI:
+            return None
+        rsp = self.server.dispatch(msg)
+        if not rsp.status.success or not (rsp.state or {}).get('links'):
+            return None
+        return CoapTransport.response_message(rsp, mid=coap.mid).encode()
+
+    def serve(self):
+        """Serve requests until closed"""
+        while True:
+            try:
+                (data, addr) = self.sock.recvfrom(MAX_DATAGRAM)
+            except OSError:
+                break
+            rsp = self.handle(data)
+            if rsp is not None:
+                self.sock.sendto(rsp, addr)
+
+    def start(self):
+        """Start serving requests in a background thread"""
+        self.thread = Thread(target=self.serve, daemon=True)
+        self.thread.start()
+        return self
+
+    def close(self):
+        """Stop serving requests"""
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+        if self.thread is not None:
+            self.thread.join()
+
+
+class MulticastDiscoveryClient():
+    """A multicast discovery client"""
+
+    def __init__(self, group=ALL_OCF_NODES, port=COAP_PORT,
+                 interface='0.0.0.0', timeout=1.0, ttl=1):
+        # pylint: disable=too-many-arguments
+
+        self.group = group
+        """Multicast group address"""
+
+        self.port = port
+        """Multicast port"""
+
+        self.interface = interface
+        """Local interface address"""
+
+        self.timeout = timeout
+        """Time to wait for responses (in seconds)"""
+
+        self.ttl = ttl
+        """Multicast time to live (hop limit)"""
+
+    def __repr__(self):
+        return '%s(group=%r, port=%r, interface=%r)' % (
+            self.__class__.__name__, self.group, self.port, self.interface
+        )
+
+    def discover(self, rt=None, intf=None):
+        """Discover resources
+
+        A discovery request is sent to the multicast group, and all
+        responses received within the timeout are merged into a list
+        of links.
+        """
+        params = [('rt', rt)] if rt is not None else []
+        if intf is not None:
+            params.append(('if', intf))
+        token = os.urandom(8)
+        msg = Retrieve(DISCOVERY_URI, token=token, params=params)
+        coap = CoapTransport.request_message(
+            msg, mtype=NON, mid=int.from_bytes(os.urandom(2), 'big')
+        )
+        links = []
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF,
+                            socket.inet_aton(self.interface))
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL,
+                            self.ttl)
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+            sock.sendto(coap.encode(), (self.group, self.port))
+            end = monotonic() + self.timeout
+            while True:
+                remaining = end - monotonic()
+                if remaining <= 0:
+                    break
+                (readable, _, _) = select.select([sock], [], [], remaining)
+                if not readable:
+                    break
+                (data, addr) = sock.recvfrom(MAX_DATAGRAM)
+                try:
+                    rsp = CoapTransport.response(CoapMessage.decode(data))
+                except Exception:  # pylint: disable=broad-except
+                    continue
+                if rsp.token != token or not rsp.status.success:
+                    continue
+                source = Endpoint('coap://%s:%d' % addr)
+                links.extend(Link.from_state(x, source=source)
+                             for x in (rsp.state or {}).get('links', ()))
+        return merge_links(links)
@@ -1,40 +1,153 @@
 """Transport using `requests` library"""
 
-import cgi
 from urllib.parse import urljoin
 import requests
-from ..ocf.message import Response
-from ..ocf.transport import Transports
+from urllib3.response import HTTPResponse
+from ..ocf.compression import CONTENT_ENCODING_HEADER
+from ..ocf.content import content_format
+from ..ocf.message import Response, StreamingResponse
+from ..ocf.profile import phase
+from ..ocf.status import GatewayTimeout, UnsupportedContentFormat
 from ..ocf.http import HttpClientTransport
 
+UTF8 = {'utf-8', 'utf8'}
+"""Character set names for which no transcoding is required"""
+
+
 class RequestsTransport(HttpClientTransport):
-    """Transport using `requests` library"""
+    """Transport using `requests` library
+
+    Request and response bodies are handled as raw bytes, and are
+    never decoded to text other than as required by the JSON parser.
+    A response body is decoded only when its state is first accessed,
+    so that a body may be relayed onwards without ever being decoded.
+
+    Connections are pooled per host, with up to ``pool_size``
+    connections kept open to each host.
+
+    If a compression policy is specified, then it determines the
+    accepted response content codings (and any shared dictionary).
+    Standard codings are decoded by the underlying `urllib3` library;
+    any other coding (such as ``dcz``) is decoded using the policy.
+    """
 
     schemes = ('http', 'https')
 
-    def __init__(self):
+    CHUNK_SIZE = 65536
+    """Chunk size for streamed response bodies"""
+
+    def __init__(self, content_type='application/json',
+                 accept='application/json', pool_size=10, compression=None):
+        # pylint: disable=too-many-arguments
+
+        self.content_type = content_type
+        """Content type for request bodies"""
+
+        self.accept = accept
+        """Accepted response content types"""
+
+        self.pool_size = pool_size
+        """Maximum number of pooled connections per host"""
+
+        self.compression = compression
+        """Response compression policy (if any)"""
+
         self.session = requests.Session()
+        if compression is not None:
+            self.session.headers.update(compression.request_headers())
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size,
+                                                pool_maxsize=pool_size)
+        for scheme in self.schemes:
+            self.session.mount('%s://' % scheme, adapter)
 
     def request(self, ep, msg):
         """Construct HTTP request"""
         method = self.method(msg)
         uri = urljoin(ep.uri, msg.uri)
-        headers = {'Accept': 'application/json'}
-        if msg.state:
-            headers['Content-Type'] = 'application/json'
-        req = requests.Request(method, uri, headers=headers, data=msg.json,
+        headers = {'Accept': self.accept, **self.headers(msg)}
+        data = msg.encode(self.content_type)
+        if data:
+            headers['Content-Type'] = self.content_type
+        req = requests.Request(method, uri, headers=headers, data=data,
                                params=msg.params.items())
         return self.session.prepare_request(req)
 
+    def encoding(self, rsp):
+        """Get content coding not already decoded by `urllib3` (if any)"""
+        encoding = rsp.headers.get(CONTENT_ENCODING_HEADER)
+        if (not encoding or self.compression is None or
+                encoding.strip().lower() in HTTPResponse.CONTENT_DECODERS):
+            return None
+        return encoding
+
     def response(self, rsp, req):
         """Construct OCF response"""
         status = self.status(rsp.status_code, req)
-        mimetype, _ = cgi.parse_header(rsp.headers.get('Content-Type', ''))
-        json = rsp.text if mimetype == 'application/json' else None
-        return Response(status, json=json)
+        retry_after = self.retry_after(rsp.headers.get('Retry-After'))
+        content = rsp.content
+        encoding = self.encoding(rsp)
+        if content and encoding is not None:
+            content = self.compression.decompress(encoding, content)
+        if not content:
+            return Response(status, retry_after=retry_after)
+        (fmt, charset) = content_format(rsp.headers.get('Content-Type', ''))
+        if fmt is None:
+            return Response(status, retry_after=retry_after)
+        if charset is not None and charset.lower() not in UTF8:
+            return Response(status, state=fmt.decode(content, charset),
+                            retry_after=retry_after)
+        return Response(status, content=content, content_type=fmt.mimetype,
+                        retry_after=retry_after)
+
+    def send(self, ep, msg, timeout=None, stream=False):
+        """Send HTTP request"""
+        try:
+            return self.session.send(self.request(ep, msg), timeout=timeout,
+                                     stream=stream)
+        except requests.Timeout as exc:
+            raise GatewayTimeout(str(exc)) from exc
+
+    def dispatch(self, ep, msg, timeout=None):
+        with phase('send'):
+            rsp = self.send(ep, msg, timeout=timeout)
+        with phase('receive'):
+            return self.response(rsp, msg)
+
+    def stream(self, ep, msg, timeout=None):
+        """Dispatch message, streaming the response body
+
+        This is intended for large collection payloads (such as
+        discovery responses), which may then be processed without ever
+        materialising the full response body.
+        """
+        rsp = self.send(ep, msg, timeout=timeout, stream=True)
+        status = self.status(rsp.status_code, msg)
+        content_type = rsp.headers.get('Content-Type')
+        if (status.success and content_type is not None and
+                content_format(content_type)[0] is None):
+            rsp.close()
+            raise UnsupportedContentFormat(content_type)
+        chunks = rsp.iter_content(self.CHUNK_SIZE)
+        encoding = self.encoding(rsp)
+        if encoding is not None:
+            chunks = self.compression.decompress_stream(encoding, chunks)
+        return StreamingResponse(
+            status, chunks,
+            content_type=content_type,
+            retry_after=self.retry_after(rsp.headers.get('Retry-After')),
+            close=rsp.close,
+        )
 
-    def dispatch(self, ep, msg):
-        return self.response(self.session.send(self.request(ep, msg)), msg)
+    def members(self, ep, msg, key='links', timeout=None):
+        """Dispatch message, yielding collection members incrementally
 
+        Each member of the collection in the response body (such as
+        each link within a discovery response) is yielded as a
+        resource state as soon as it has been received.  A failure
+        status is raised as an exception.
+        """
+        with self.stream(ep, msg, timeout=timeout) as rsp:
+            if not rsp.status.success:
+                raise rsp.status(msg.uri)
+            yield from rsp.members(key)
 
-Transports.register(RequestsTransport())
@@ -29,4 +29,11 @@ setup(
         'orderedset',
         'requests',
     ],
+    entry_points={
+        'iotdev.transports': [
+            'http = iotdev.transport.requests:RequestsTransport',
+            'https = iotdev.transport.requests:RequestsTransport',
+            'sim = iotdev.ocf.simulator:SimulatorTransport',
+        ],
+    },
 )
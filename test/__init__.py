@@ -0,0 +1,11 @@
+from iotdev.ocf.resource import Resource
+
+
+def light(cls=Resource, value=False, **state):
+    """Construct a binary switch resource"""
+    return cls({
+        'rt': ['oic.r.switch.binary'],
+        'if': ['oic.if.baseline', 'oic.if.a'],
+        'value': value,
+        **state,
+    })
@@ -0,0 +1,83 @@
+from threading import Event
+from time import sleep
+from unittest import TestCase
+from iotdev.ocf.admission import (AdmissionController, RequestClass,
+                                  ACTUATOR, WRITE, READ)
+from iotdev.ocf.message import Retrieve, Update
+from iotdev.ocf.resource import Resource
+from iotdev.ocf.server import Server
+from iotdev.ocf.status import Content, Changed, TooManyRequests
+
+
+class RecordingServer(Server):
+
+    def __init__(self):
+        super().__init__()
+        self.order = []
+        self.gate = Event()
+        self.add('/light', Resource({
+            'rt': ['oic.r.switch.binary'],
+            'if': ['oic.if.baseline', 'oic.if.a'],
+            'value': False,
+        }))
+
+    def dispatch(self, msg):
+        self.gate.wait()
+        self.order.append(msg.method)
+        return super().dispatch(msg)
+
+
+class TestAdmission(TestCase):
+
+    def setUp(self):
+        self.server = RecordingServer()
+        self.controller = AdmissionController(self.server, workers=1, classes=[
+            RequestClass(ACTUATOR, 0, capacity=4, max_wait=10),
+            RequestClass(WRITE, 1, capacity=4, max_wait=10),
+            RequestClass(READ, 2, capacity=2, max_wait=0.2),
+        ]).start()
+
+    def tearDown(self):
+        self.server.gate.set()
+        self.controller.close()
+
+    def occupy(self):
+        """Occupy the single worker thread"""
+        future = self.controller.submit(Retrieve('/light'))
+        while self.controller.classes[READ].queue:
+            sleep(0.001)
+        return future
+
+    def test_priority(self):
+        """Test prioritisation of actuator updates over retrievals"""
+        first = self.occupy()
+        reads = [self.controller.submit(Retrieve('/light'))
+                 for _ in range(2)]
+        update = self.controller.submit(Update('/light', {'value': True},
+                                               params={'if': 'oic.if.a'}))
+        self.server.gate.set()
+        self.assertIs(first.result().status, Content)
+        self.assertIs(update.result().status, Changed)
+        self.assertTrue(all(x.result().status is Content for x in reads))
+        self.assertEqual(self.server.order, ['RETRIEVE', 'UPDATE',
+                                             'RETRIEVE', 'RETRIEVE'])
+
+    def test_capacity(self):
+        """Test rejection when class queue is full"""
+        self.occupy()
+        reads = [self.controller.submit(Retrieve('/light'))
+                 for _ in range(3)]
+        rsp = reads[2].result(timeout=1)
+        self.assertIs(rsp.status, TooManyRequests)
+        self.assertGreaterEqual(rsp.retry_after, 1)
+        self.assertFalse(reads[0].done())
+
+    def test_shedding(self):
+        """Test shedding of requests that have queued for too long"""
+        self.occupy()
+        late = self.controller.submit(Retrieve('/light'))
+        update = self.controller.submit(Update('/light', {'value': True}))
+        self.server.gate.wait(0.3)
+        self.server.gate.set()
+        self.assertIs(late.result().status, TooManyRequests)
+        self.assertIs(update.result().status, Changed)
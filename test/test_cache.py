@@ -0,0 +1,113 @@
+import gc
+from json import loads
+from unittest import TestCase
+from iotdev.ocf.cache import RepresentationCache
+from iotdev.ocf.message import Retrieve, Update
+from iotdev.ocf.resource import Resource
+from iotdev.ocf.server import Server
+from iotdev.ocf.versioned import VersionedResource
+from . import light
+
+
+class LoadingResource(Resource):
+
+    def load(self, names, params):
+        self.state['value'] = not self.state['value']
+
+
+class TestRepresentationCache(TestCase):
+
+    def setUp(self):
+        self.cache = RepresentationCache()
+        self.server = Server(cache=self.cache)
+        self.light = self.server.add('/light', light())
+
+    def retrieve(self, uri='/light', intf=None):
+        params = {'if': intf} if intf is not None else {}
+        return self.server.dispatch(Retrieve(uri, params=params))
+
+    def test_hit(self):
+        """Test retrieval from cached bytes"""
+        first = self.retrieve()
+        second = self.retrieve()
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        self.assertIs(first.encode(), second.encode())
+        self.assertEqual(second.state['value'], False)
+        self.assertEqual(self.cache.size, len(first.encode()))
+
+    def test_invalidate(self):
+        """Test precise invalidation by interface"""
+        self.retrieve()
+        self.retrieve(intf='oic.if.a')
+        self.light.state['n'] = 'lamp'
+        self.assertEqual(self.retrieve().state['n'], 'lamp')
+        self.retrieve(intf='oic.if.a')
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 3))
+        self.server.dispatch(Update('/light', {'value': True}))
+        self.assertEqual(loads(self.retrieve(intf='oic.if.a').json),
+                         {'value': True})
+        self.assertEqual(self.cache.misses, 4)
+
+    def test_versioned(self):
+        """Test invalidation of versioned resources"""
+        self.server.add('/versioned', light(cls=VersionedResource))
+        self.retrieve('/versioned')
+        self.server.dispatch(Update('/versioned', {'value': True}))
+        self.assertIs(self.retrieve('/versioned').state['value'], True)
+
+    def test_uncacheable(self):
+        """Test bypass of resources with custom loading"""
+        self.server.add('/loading', light(cls=LoadingResource))
+        self.assertIs(self.retrieve('/loading').state['value'], True)
+        self.assertIs(self.retrieve('/loading').state['value'], False)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_budget(self):
+        """Test LRU eviction within byte budget"""
+        for i in range(3):
+            self.server.add('/light%d' % i, light(n='light%d' % i))
+        size = len(self.retrieve('/light0').encode())
+        self.cache.budget = 2 * size
+        self.retrieve('/light2')
+        self.retrieve('/light1')
+        self.assertLessEqual(self.cache.size, 2 * size)
+        self.assertEqual(len(self.cache), 2)
+        self.retrieve('/light1')
+        self.retrieve('/light0')
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_retype(self):
+        """Test that callbacks are registered once per property"""
+        tracked = self.light.state.tracked
+        self.retrieve()
+        counts = {k: len(v) for k, v in tracked.items()}
+        for i in range(50):
+            self.light.state['rt'] = (['oic.r.switch.binary'] if i % 2 else
+                                      ['oic.r.light.brightness'])
+            self.retrieve()
+            self.retrieve(intf='oic.if.a')
+        self.assertEqual(len(tracked['rt']), counts['rt'])
+        self.assertEqual(len(tracked['value']), counts['value'])
+        self.assertLessEqual(sum(len(x) for x in tracked.values()),
+                             sum(counts.values()) + 1)
+        self.assertEqual(self.retrieve(intf='oic.if.a').state,
+                         {'value': False})
+
+    def test_factory(self):
+        """Test bypass of resources constructed on demand"""
+        self.server.route('/sensor/{id}', lambda id: light(n=id))
+        for i in range(100):
+            self.assertEqual(self.retrieve('/sensor/%d' % i).state['n'],
+                             str(i))
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(len(self.cache.watches), 0)
+
+    def test_weak(self):
+        """Test that removed resources are not retained"""
+        self.server.add('/other', light())
+        self.retrieve('/other')
+        self.assertEqual(len(self.cache.watches), 1)
+        del self.server['/other']
+        self.cache.clear()
+        gc.collect()
+        self.assertEqual(len(self.cache.watches), 0)
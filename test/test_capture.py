@@ -0,0 +1,165 @@
+import os
+from tempfile import TemporaryDirectory
+from time import monotonic
+from unittest import TestCase
+from iotdev.ocf import capture
+from iotdev.ocf.capture import Capture, CaptureRecord, Recorder
+from iotdev.ocf.endpoint import Endpoint
+from iotdev.ocf.loadgen import LoadGenerator
+from iotdev.ocf.message import Retrieve, Update
+from iotdev.ocf.replay import Replayer
+from iotdev.ocf.simulator import Fleet
+from iotdev.ocf.status import (BadGateway, Changed, Content, GatewayTimeout,
+                               NotFound, ServiceUnavailable)
+from iotdev.ocf.transport import Transport
+
+
+class FailingTransport(Transport):
+
+    schemes = ('fail',)
+
+    def dispatch(self, ep, msg, timeout=None):
+        if msg.uri == '/slow':
+            raise TimeoutError
+        raise ConnectionRefusedError
+
+
+class TestCapture(TestCase):
+
+    def setUp(self):
+        self.tmpdir = TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = os.path.join(self.tmpdir.name, 'capture')
+        self.fleet = Fleet(2, {'/light': ['oic.r.switch.binary']},
+                           name='capture', seed=1)
+        self.addCleanup(self.fleet.close)
+
+    def test_roundtrip(self):
+        """Test capturing requests"""
+        ep = self.fleet.endpoints()[0]
+        with Recorder(self.path) as recorder:
+            self.assertIs(capture.recorder(), recorder)
+            ep.dispatch(Retrieve('/light', params={'if': 'oic.if.a'}))
+            ep.dispatch(Update('/light', {'value': True}))
+            ep.dispatch(Retrieve('/missing'))
+        self.assertIsNone(capture.recorder())
+        self.assertEqual(recorder.count, 3)
+        ep.dispatch(Retrieve('/light'))
+        with Capture(self.path) as cap:
+            records = cap.records()
+        self.assertEqual([(x.method, x.ep, x.uri, x.status) for x in records],
+                         [('RETRIEVE', 'sim://capture/0', '/light', Content),
+                          ('UPDATE', 'sim://capture/0', '/light', Changed),
+                          ('RETRIEVE', 'sim://capture/0', '/missing',
+                           NotFound)])
+        self.assertEqual(records[0].params, [('if', 'oic.if.a')])
+        self.assertIsNone(records[0].state)
+        self.assertEqual(records[1].state, {'value': True})
+        self.assertLessEqual(records[0].offset, records[2].offset)
+        msg = records[1].request()
+        self.assertIsInstance(msg, Update)
+        self.assertEqual(msg.state, {'value': True})
+
+    def test_failure(self):
+        """Test capturing requests that fail in the transport"""
+        transport = FailingTransport()
+        ep = Endpoint('fail://device')
+        with Recorder(self.path):
+            with self.assertRaises(ConnectionError):
+                ep.dispatch(Retrieve('/light'), transport=transport)
+            with self.assertRaises(TimeoutError):
+                ep.dispatch(Update('/slow'), transport=transport)
+        with Capture(self.path) as cap:
+            self.assertEqual([(x.uri, x.status) for x in cap],
+                             [('/light', BadGateway),
+                              ('/slow', GatewayTimeout)])
+        with Capture(self.path) as cap:
+            report = Replayer(cap, transport=transport, speed=None).run()
+        self.assertEqual(report.status_divergences, [])
+
+    def test_stream(self):
+        """Test capturing streamed requests"""
+        (ep, _) = self.fleet.serve()
+        with Recorder(self.path):
+            with ep.stream(Retrieve('/light')) as rsp:
+                self.assertIn(b'value', b''.join(rsp))
+        with Capture(self.path) as cap:
+            (record,) = cap.records()
+        self.assertEqual((record.uri, record.status), ('/light', Content))
+        self.assertEqual(record.ep, ep.uri)
+
+    def test_truncated(self):
+        """Test discarding a partially written record"""
+        ep = self.fleet.endpoints()[1]
+        with Recorder(self.path):
+            for _ in range(5):
+                ep.dispatch(Retrieve('/light'))
+        with open(self.path, 'r+b') as f:
+            f.truncate(os.path.getsize(self.path) - 3)
+        with Capture(self.path) as cap:
+            self.assertEqual(len(cap.records()), 4)
+        for data in (b'', b'bogus'):
+            with open(self.path, 'wb') as f:
+                f.write(data)
+            with self.assertRaises(ValueError):
+                Capture(self.path)
+
+
+class TestReplay(TestCase):
+
+    def setUp(self):
+        self.tmpdir = TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = os.path.join(self.tmpdir.name, 'capture')
+        self.fleet = Fleet(4, {'/light': ['oic.r.switch.binary'],
+                               '/temperature': ['oic.r.temperature']},
+                           name='replay', seed=1)
+        self.addCleanup(self.fleet.close)
+
+    def test_replay(self):
+        """Test replaying captured traffic"""
+        with Recorder(self.path):
+            LoadGenerator(self.fleet.targets(), workers=4,
+                          seed=2).run(requests=300)
+        with Capture(self.path) as cap:
+            report = Replayer(cap, speed=None).run()
+        self.assertEqual(report.requests, 300)
+        self.assertEqual(report.status_divergences, [])
+        self.assertEqual(len(report.latencies), 300)
+        self.assertIn('300 requests', str(report))
+        for device in self.fleet.devices:
+            device.error_rate = 1.0
+        with Capture(self.path) as cap:
+            report = Replayer(cap, speed=None).run()
+        self.assertEqual(len(report.status_divergences), 300)
+        self.assertIs(report.divergences[0].outcome, ServiceUnavailable)
+
+    def test_pace(self):
+        """Test replaying at the original pace"""
+        records = [CaptureRecord(i * 0.05, 0.0, Content, 'RETRIEVE',
+                                 'sim://replay/%d' % (i % 4), '/light')
+                   for i in range(5)]
+        start = monotonic()
+        report = Replayer(reversed(records)).run()
+        self.assertGreaterEqual(monotonic() - start, 0.2)
+        self.assertEqual(report.divergences, [])
+        report = Replayer(records, speed=4).run()
+        self.assertLess(report.elapsed, 0.15)
+        self.fleet.devices[2].latency = 0.05
+        report = Replayer(records, speed=None).run()
+        self.assertEqual([x.record for x in report.divergences],
+                         [records[2]])
+        self.assertFalse(report.divergences[0].status)
+
+    def test_reorder(self):
+        """Test reordering of requests captured out of order"""
+        records = [CaptureRecord(offset, duration, Content, 'RETRIEVE',
+                                 'sim://replay/0', '/light')
+                   for offset, duration in ((0.0, 0.5), (0.3, 0.1),
+                                            (0.2, 0.3), (2.0, 0.1),
+                                            (0.6, 1.6), (3.0, 0.0))]
+        ordered = Replayer(records, window=1.0).ordered()
+        self.assertEqual([x.offset for x in ordered],
+                         [0.0, 0.2, 0.3, 0.6, 2.0, 3.0])
+        ordered = Replayer(records, window=0.0).ordered()
+        self.assertEqual(next(ordered).offset, 0.0)
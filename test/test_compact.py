@@ -0,0 +1,79 @@
+import tracemalloc
+from unittest import TestCase
+from iotdev.ocf.compact import CompactResource, CompactResourceState
+from iotdev.ocf.rt import BinarySwitch, Brightness
+
+RESOURCE_BUDGET = 350
+"""Maximum memory per compact binary switch resource (in bytes)"""
+
+
+def switch(i):
+    return CompactResource({
+        'rt': ['oic.r.switch.binary'],
+        'if': ['oic.if.baseline', 'oic.if.a'],
+        'n': 'light %d' % i,
+        'value': False,
+    })
+
+
+class TestCompact(TestCase):
+
+    def test_state(self):
+        """Test use of compact state as a dictionary"""
+        state = CompactResourceState({'n': 'fridge', 'filter': 99})
+        self.assertEqual(dict(state), {'n': 'fridge', 'filter': 99})
+        state['defrost'] = True
+        del state['n']
+        self.assertNotIn('n', state)
+        self.assertIn('defrost', state)
+        self.assertEqual(len(state), 2)
+        self.assertEqual(state.data, {'filter': 99, 'defrost': True})
+        with self.assertRaises(KeyError):
+            del state['n']
+        self.assertIsNone(state.get('n'))
+        state['n'] = 'freezer'
+        self.assertEqual(state['n'], 'freezer')
+
+    def test_tracking(self):
+        """Test lazily allocated change tracking"""
+        state = CompactResourceState({'value': False})
+        self.assertIsNone(state.tracked)
+        changes = []
+        state.track('value', lambda: changes.append(state['value']))
+        state['value'] = True
+        state['other'] = 1
+        self.assertEqual(changes, [True])
+
+    def test_sharing(self):
+        """Test sharing of layouts and interned values"""
+        (first, second) = (switch(1), switch(2))
+        self.assertIs(first.state.layout, second.state.layout)
+        self.assertIs(first.state['rt'], second.state['rt'])
+        self.assertIs(first.state['if'], second.state['if'])
+        self.assertIs(first.rt, BinarySwitch)
+        self.assertIs(first.prop.value, False)
+        first.prop.value = True
+        self.assertEqual(first.retrieve(),
+                         {'rt': ['oic.r.switch.binary'],
+                          'if': ['oic.if.baseline', 'oic.if.a'],
+                          'n': 'light 1', 'value': True})
+        first.rt = BinarySwitch + Brightness
+        second.rt = BinarySwitch + Brightness
+        self.assertIs(first.rt, second.rt)
+        self.assertTrue(issubclass(first.rt, Brightness))
+        self.assertIsNone(first.prop.brightness)
+
+    def test_memory(self):
+        """Test memory usage per resource"""
+        count = 10000
+        switch(0).rt
+        tracemalloc.start()
+        try:
+            start = tracemalloc.get_traced_memory()[0]
+            resources = [switch(i) for i in range(count)]
+            for resource in resources:
+                resource.rt
+            used = tracemalloc.get_traced_memory()[0] - start
+        finally:
+            tracemalloc.stop()
+        self.assertLess(used / count, RESOURCE_BUDGET)
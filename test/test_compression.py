@@ -0,0 +1,163 @@
+import gzip
+import json
+from unittest import TestCase, skipUnless
+import zlib
+import requests
+from iotdev.ocf.compression import (Compression, Dictionary,
+                                    parse_accept_encoding, zstandard)
+from iotdev.ocf.discovery import DiscoveryResource
+from iotdev.ocf.endpoint import Endpoint
+from iotdev.ocf.message import Retrieve, Update
+from iotdev.ocf.server import Server
+from iotdev.ocf.status import (Changed, Content, RequestEntityTooLarge,
+                               UnsupportedContentFormat)
+from iotdev.transport.httpserver import HttpServer
+from iotdev.transport.requests import RequestsTransport
+from . import light
+
+
+class TestCompression(TestCase):
+
+    def test_negotiate(self):
+        """Test content coding negotiation"""
+        self.assertEqual(parse_accept_encoding('gzip;q=0.5, br, *;q=0'),
+                         {'gzip': 0.5, 'br': 1.0, '*': 0.0})
+        compression = Compression(codings=('gzip', 'deflate'))
+        self.assertEqual(compression.negotiate('deflate, gzip'), 'gzip')
+        self.assertEqual(compression.negotiate('gzip;q=0.5, deflate'),
+                         'deflate')
+        self.assertEqual(compression.negotiate('*'), 'gzip')
+        self.assertIsNone(compression.negotiate('identity'))
+        self.assertIsNone(compression.negotiate('gzip;q=0'))
+        self.assertIsNone(compression.negotiate(None))
+        self.assertEqual(compression.accept_encoding(), 'gzip, deflate')
+
+    def test_roundtrip(self):
+        """Test compression round trip"""
+        compression = Compression()
+        data = b'{"href": "/light/1", "rt": ["oic.r.switch.binary"]}' * 500
+        for coding in ('gzip', 'deflate'):
+            compressed = compression.compress(coding, data)
+            self.assertLess(len(compressed), len(data) // 20)
+            self.assertEqual(compression.decompress(coding, compressed),
+                             data)
+            chunks = list(compression.stream(coding, [data, data], 1000))
+            self.assertEqual(b''.join(compression.decompress_stream(
+                coding, chunks
+            )), data + data)
+        self.assertEqual(gzip.decompress(compression.compress('gzip', data)),
+                         data)
+        with self.assertRaises(RequestEntityTooLarge):
+            compression.decompress('deflate', compressed, limit=1000)
+        with self.assertRaises(ValueError):
+            compression.decompress('gzip', b'garbage')
+        with self.assertRaises(UnsupportedContentFormat):
+            compression.decompress('compress', data)
+
+    def test_dictionary(self):
+        """Test dictionary training"""
+        samples = [json.dumps({'href': '/light/%d' % i,
+                               'rt': ['oic.r.switch.binary']}).encode()
+                   for i in range(200)]
+        dictionary = Dictionary.train(samples, size=4096)
+        self.assertLessEqual(len(dictionary.data), 4096)
+        self.assertTrue(dictionary.header.startswith(':'))
+        self.assertEqual(Dictionary(dictionary.data).hash, dictionary.hash)
+        compression = Compression(dictionary=dictionary)
+        self.assertEqual(compression.negotiate('gzip', dictionary.header),
+                         'gzip')
+
+    @skipUnless(zstandard, "zstandard not installed")
+    def test_dcz(self):
+        """Test dictionary-compressed Zstandard"""
+        samples = [json.dumps({'href': '/light/%d' % i,
+                               'rt': ['oic.r.switch.binary']}).encode()
+                   for i in range(1000)]
+        dictionary = Dictionary.train(samples)
+        compression = Compression(dictionary=dictionary)
+        accept = compression.accept_encoding()
+        self.assertEqual(compression.negotiate(accept, dictionary.header),
+                         'dcz')
+        self.assertEqual(compression.negotiate(accept, ':bogus:'), 'zstd')
+        data = samples[42]
+        compressed = compression.compress('dcz', data)
+        self.assertEqual(compression.decompress('dcz', compressed), data)
+        self.assertEqual(compression.decompress('dcz', compressed,
+                                                limit=len(data)), data)
+        chunks = list(compression.stream('dcz', [data, data], 16))
+        self.assertEqual(b''.join(compression.decompress_stream(
+            'dcz', chunks
+        )), data + data)
+        with self.assertRaises(ValueError):
+            Compression(dictionary=Dictionary(b'other')).decompress(
+                'dcz', compressed
+            )
+
+
+class TestHttpCompression(TestCase):
+
+    def setUp(self):
+        self.server = Server()
+        self.server.add('/oic/res', DiscoveryResource(self.server))
+        self.server.add('/light', light())
+        self.server.add('/named', light(n='light ' * 200))
+        for i in range(300):
+            self.server.add('/lights/%d' % i, light())
+        self.http = HttpServer(self.server, compression=Compression(
+            codings=('gzip', 'deflate'), min_size=200, stream_size=16384,
+        ))
+        self.http.start()
+        self.addCleanup(self.http.close)
+
+    def get(self, uri, encoding):
+        return requests.get(self.http.uri + uri, headers={
+            'Accept-Encoding': encoding,
+        })
+
+    def test_server(self):
+        """Test server response compression"""
+        rsp = self.get('/light', 'gzip')
+        self.assertNotIn('Content-Encoding', rsp.headers)
+        self.assertEqual(rsp.headers['Vary'], 'Accept-Encoding')
+        rsp = self.get('/named', 'deflate')
+        self.assertEqual(rsp.headers['Content-Encoding'], 'deflate')
+        self.assertLess(int(rsp.headers['Content-Length']), 200)
+        self.assertEqual(rsp.json()['n'], 'light ' * 200)
+        rsp = self.get('/oic/res', 'gzip')
+        self.assertEqual(rsp.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(rsp.headers['Transfer-Encoding'], 'chunked')
+        self.assertEqual(len(rsp.json()['links']), 302)
+        rsp = self.get('/oic/res', 'identity')
+        self.assertNotIn('Content-Encoding', rsp.headers)
+
+    def test_client(self):
+        """Test client response decompression"""
+        transport = RequestsTransport(compression=Compression(
+            codings=('deflate',)
+        ))
+        self.assertEqual(transport.session.headers['Accept-Encoding'],
+                         'deflate')
+        ep = Endpoint(self.http.uri)
+        rsp = ep.dispatch(Retrieve('/oic/res'), transport=transport)
+        self.assertIs(rsp.status, Content)
+        self.assertEqual(len(rsp.state['links']), 302)
+        with transport.stream(ep, Retrieve('/oic/res')) as rsp:
+            self.assertEqual(len(json.loads(b''.join(rsp))['links']), 302)
+
+    def test_request(self):
+        """Test request body decompression"""
+        body = zlib.compress(json.dumps({'value': True}).encode())
+        rsp = requests.put(self.http.uri + '/light', data=body, headers={
+            'Content-Type': 'application/json',
+            'Content-Encoding': 'deflate',
+        })
+        self.assertEqual(rsp.status_code, 204)
+        self.assertIs(self.server['/light'].state['value'], True)
+        rsp = requests.put(self.http.uri + '/light', data=body, headers={
+            'Content-Type': 'application/json',
+            'Content-Encoding': 'compress',
+        })
+        self.assertEqual(rsp.status_code, 415)
+        rsp = Endpoint(self.http.uri).dispatch(Update('/light',
+                                                      {'value': False}))
+        self.assertIs(rsp.status, Changed)
@@ -0,0 +1,88 @@
+from io import BytesIO
+from unittest import TestCase
+import requests
+from iotdev.ocf.content import (ContentFormats, parse_content_type,
+                                content_format)
+from iotdev.ocf.endpoint import Endpoint
+from iotdev.ocf.message import Retrieve, Update, StreamingResponse
+from iotdev.ocf.state import ResourceState
+from iotdev.ocf.status import Content, NotFound, UnsupportedContentFormat
+from iotdev.transport.requests import RequestsTransport
+
+
+def http_response(status, content, content_type='application/json'):
+    rsp = requests.Response()
+    rsp.status_code = status
+    rsp.raw = BytesIO(content)
+    if content_type is not None:
+        rsp.headers['Content-Type'] = content_type
+    return rsp
+
+
+class TestContent(TestCase):
+
+    def test_parse(self):
+        """Test Content-Type parsing"""
+        (mimetype, params) = parse_content_type(
+            'Application/JSON; charset="UTF-8"; q=1'
+        )
+        self.assertEqual(mimetype, 'application/json')
+        self.assertEqual(dict(params), {'charset': 'UTF-8', 'q': '1'})
+        self.assertEqual(parse_content_type('text/plain')[0], 'text/plain')
+        self.assertEqual(content_format('application/json; charset=latin-1'),
+                         (ContentFormats['application/json'], 'latin-1'))
+        self.assertEqual(content_format('text/html'), (None, None))
+
+    def test_json(self):
+        """Test JSON encoding to and decoding from bytes"""
+        fmt = ContentFormats['application/json']
+        content = fmt.encode(ResourceState({'value': 'café'}))
+        self.assertIsInstance(content, bytes)
+        self.assertEqual(fmt.decode(content)['value'], 'café')
+        self.assertEqual(fmt.decode('{"x": "é"}'.encode('latin-1'),
+                                    'latin-1')['x'], 'é')
+
+
+class TestRequestsTransport(TestCase):
+
+    def setUp(self):
+        self.transport = RequestsTransport()
+        self.ep = Endpoint('http://device.local')
+
+    def test_request(self):
+        """Test construction of bytes request body"""
+        req = self.transport.request(self.ep, Update('/light',
+                                                     {'value': True}))
+        self.assertEqual(req.body, b'{"value": true}')
+        self.assertEqual(req.headers['Content-Type'], 'application/json')
+        req = self.transport.request(self.ep, Retrieve('/light'))
+        self.assertIsNone(req.body)
+
+    def test_response(self):
+        """Test decoding of response body directly from bytes"""
+        rsp = self.transport.response(http_response(
+            200, b'{"value": false}', 'application/json; charset=utf-8'
+        ), Retrieve('/light'))
+        self.assertIs(rsp.status, Content)
+        self.assertIs(rsp.state['value'], False)
+        rsp = self.transport.response(http_response(404, b'gone', None),
+                                      Retrieve('/light'))
+        self.assertIs(rsp.status, NotFound)
+        self.assertIsNone(rsp.state)
+
+    def test_stream(self):
+        """Test streaming of response body"""
+        body = b'[' + b','.join(b'{"href": "/%d"}' % i
+                                for i in range(10000)) + b']'
+        self.transport.send = lambda *args, **kwargs: http_response(200, body)
+        with self.transport.stream(self.ep, Retrieve('/oic/res')) as rsp:
+            self.assertIsInstance(rsp, StreamingResponse)
+            self.assertIs(rsp.status, Content)
+            chunks = list(rsp)
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(b''.join(chunks), body)
+        self.transport.send = lambda *args, **kwargs: http_response(
+            200, b'<html/>', 'text/html'
+        )
+        with self.assertRaises(UnsupportedContentFormat):
+            self.transport.stream(self.ep, Retrieve('/oic/res'))
@@ -0,0 +1,167 @@
+from threading import Thread
+from time import sleep
+from unittest import TestCase
+from iotdev.ocf.coap import CoapMessage, CoapTransport, CON
+from iotdev.ocf.discovery import DiscoveryCache, DiscoveryResource, Link
+from iotdev.ocf.endpoint import Endpoint
+from iotdev.ocf.message import Retrieve
+from iotdev.ocf.resource import Resource
+from iotdev.ocf.server import Server
+from iotdev.ocf.status import NotFound
+from iotdev.transport.httpserver import HttpServer
+from iotdev.transport.requests import RequestsTransport
+from iotdev.transport.multicast import (MulticastDiscoveryServer,
+                                        MulticastDiscoveryClient)
+
+
+def make_server(*endpoints):
+    server = Server(endpoints=[Endpoint(x) for x in endpoints])
+    server.add('/switch', Resource({
+        'rt': ['oic.r.switch.binary'],
+        'if': ['oic.if.baseline', 'oic.if.a'],
+        'value': False,
+    }))
+    server.add('/temperature', Resource({
+        'rt': ['oic.r.temperature'],
+        'if': ['oic.if.baseline', 'oic.if.s'],
+        'temperature': 21,
+    }))
+    server.add('/oic/res', DiscoveryResource(server))
+    return server
+
+
+class TestCoap(TestCase):
+
+    def test_roundtrip(self):
+        """Test CoAP message encoding round trip"""
+        msg = Retrieve('/oic/res', token=b'\x01\x02',
+                       params=[('rt', 'oic.r.switch.binary'),
+                               ('if', 'oic.if.a')])
+        coap = CoapTransport.request_message(msg, mtype=CON, mid=1234)
+        coap.add_option(2049, b'x' * 300)
+        decoded = CoapMessage.decode(coap.encode())
+        self.assertEqual(decoded.mtype, CON)
+        self.assertEqual(decoded.mid, 1234)
+        self.assertEqual(decoded.option(2049), b'x' * 300)
+        req = CoapTransport.request(decoded)
+        self.assertIsInstance(req, Retrieve)
+        self.assertEqual(req.uri, '/oic/res')
+        self.assertEqual(req.token, b'\x01\x02')
+        self.assertEqual(req.params.getall('rt'), ['oic.r.switch.binary'])
+
+
+class TestDiscoveryResource(TestCase):
+
+    def test_links(self):
+        """Test links list construction and filtering"""
+        server = make_server('http://192.0.2.1:8000')
+        links = server.dispatch(Retrieve('/oic/res')).state['links']
+        self.assertEqual([x['href'] for x in links],
+                         ['/switch', '/temperature'])
+        self.assertEqual(links[0]['eps'],
+                         [{'ep': 'http://192.0.2.1:8000', 'pri': 1}])
+        rsp = server.dispatch(Retrieve('/oic/res', params=[
+            ('rt', 'oic.r.temperature'),
+        ]))
+        self.assertEqual([x['href'] for x in rsp.state['links']],
+                         ['/temperature'])
+        rsp = server.dispatch(Retrieve('/oic/res', params=[
+            ('if', 'oic.if.a'),
+        ]))
+        self.assertEqual([x['href'] for x in rsp.state['links']],
+                         ['/switch'])
+        rsp = server.dispatch(Retrieve('/oic/res', params=[
+            ('if', 'oic.if.baseline'),
+        ]))
+        self.assertEqual(list(rsp.state['rt']), ['oic.wk.res'])
+        self.assertEqual(len(rsp.state['links']), 2)
+
+
+class TestStreamingDiscovery(TestCase):
+
+    def test_members(self):
+        """Test incremental decoding of a large links list"""
+        server = make_server()
+        for i in range(2000):
+            server.add('/lights/%d' % i, Resource({
+                'rt': ['oic.r.switch.binary'],
+                'if': ['oic.if.baseline', 'oic.if.a'],
+                'value': False,
+            }))
+        transport = RequestsTransport()
+        with HttpServer(server) as http:
+            ep = Endpoint(http.uri)
+            links = list(transport.members(ep, Retrieve('/oic/res')))
+            self.assertEqual(len(links), 2002)
+            self.assertEqual(links[-1]['href'], '/lights/1999')
+            self.assertEqual(list(links[0]['rt']), ['oic.r.switch.binary'])
+            with self.assertRaises(NotFound):
+                list(transport.members(ep, Retrieve('/nonexistent')))
+
+
+class TestDiscoveryCache(TestCase):
+
+    def setUp(self):
+        self.calls = 0
+
+    def discover(self, rt=None, intf=None):
+        self.calls += 1
+        sleep(0.05)
+        return [Link('/switch', rt=[rt], endpoints=[
+            Endpoint('coap://192.0.2.%d' % self.calls)
+        ])]
+
+    def test_single_flight(self):
+        """Test sharing of concurrent discovery operations"""
+        cache = DiscoveryCache(self.discover)
+        results = []
+        threads = [Thread(target=lambda: results.append(cache.get('x')))
+                   for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(len(results), 10)
+
+    def test_refresh(self):
+        """Test background refresh and expiry"""
+        cache = DiscoveryCache(self.discover, ttl=0.3, refresh=0.5)
+        self.assertEqual(cache.get()[0].endpoints[0].uri, 'coap://192.0.2.1')
+        sleep(0.2)
+        self.assertEqual(cache.get()[0].endpoints[0].uri, 'coap://192.0.2.1')
+        sleep(0.1)
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(cache.get()[0].endpoints[0].uri, 'coap://192.0.2.2')
+        sleep(0.4)
+        self.assertEqual(cache.get()[0].endpoints[0].uri, 'coap://192.0.2.3')
+
+
+class TestMulticastDiscovery(TestCase):
+
+    def test_loopback(self):
+        """Test multicast discovery over loopback interface"""
+        server1 = MulticastDiscoveryServer(
+            make_server('http://192.0.2.1', 'coap://192.0.2.1'),
+            port=0, interface='127.0.0.1'
+        ).start()
+        server2 = MulticastDiscoveryServer(
+            make_server('http://192.0.2.2'),
+            port=server1.port, interface='127.0.0.1'
+        ).start()
+        try:
+            client = MulticastDiscoveryClient(port=server1.port,
+                                              interface='127.0.0.1',
+                                              timeout=0.3)
+            links = client.discover()
+            self.assertEqual(len(links), 2)
+            switch = next(x for x in links if x.href == '/switch')
+            self.assertEqual([x.uri for x in switch.endpoints], [
+                'coap://192.0.2.1', 'http://192.0.2.1', 'http://192.0.2.2',
+            ])
+            links = client.discover(rt='oic.r.temperature')
+            self.assertEqual([x.href for x in links], ['/temperature'])
+            self.assertEqual(client.discover(rt='oic.r.nonexistent'), [])
+        finally:
+            server1.close()
+            server2.close()
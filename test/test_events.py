@@ -0,0 +1,118 @@
+import asyncio
+from threading import Event
+from time import monotonic, sleep
+from unittest import TestCase
+from iotdev.ocf.compact import CompactResource
+from iotdev.ocf.events import EventBus, DROP_NEWEST, MERGE
+from iotdev.ocf.resource import Resource
+from iotdev.ocf.rt import Temperature
+from iotdev.ocf.versioned import VersionedResource
+from . import light
+
+
+def thermometer():
+    return Resource({
+        'rt': ['oic.r.temperature'],
+        'if': ['oic.if.baseline', 'oic.if.s'],
+        'temperature': 20.0,
+    })
+
+
+class TestEventBus(TestCase):
+
+    def setUp(self):
+        self.bus = EventBus()
+
+    def tearDown(self):
+        self.bus.close()
+
+    def test_change(self):
+        """Test change events with old and new values"""
+        events = []
+        self.bus.subscribe(events.append)
+        for cls in (Resource, CompactResource, VersionedResource):
+            resource = self.bus.attach(light(cls))
+            resource.prop.value = True
+            del resource.state['value']
+        self.bus.close()
+        self.assertEqual([(x.key, x.old, x.new) for x in events],
+                         [('value', False, True), ('value', True, None)] * 3)
+
+    def test_filters(self):
+        """Test key and resource type filtered subscriptions"""
+        (values, temperatures) = ([], [])
+        self.bus.subscribe(values.append, key='value')
+        self.bus.subscribe(temperatures.append, rt=Temperature)
+        switch = self.bus.attach(light())
+        sensor = self.bus.attach(thermometer())
+        switch.state['value'] = True
+        switch.state['n'] = 'switch'
+        sensor.state['temperature'] = 21.5
+        self.bus.close()
+        self.assertEqual([x.resource for x in values], [switch])
+        self.assertEqual([x.new for x in temperatures], [21.5])
+
+    def test_slow(self):
+        """Test that a slow subscriber does not block the writer"""
+        gate = Event()
+        events = []
+        subscription = self.bus.subscribe(
+            lambda event: (gate.wait(), events.append(event)),
+            maxsize=3, policy=DROP_NEWEST
+        )
+        resource = self.bus.attach(light())
+        start = monotonic()
+        resource.state['value'] = 0
+        while subscription.queue:
+            sleep(0.001)
+        for i in range(1, 10):
+            resource.state['value'] = i
+        self.assertLess(monotonic() - start, 0.5)
+        gate.set()
+        self.bus.close()
+        self.assertEqual([x.new for x in events], [0, 1, 2, 3])
+        self.assertEqual(subscription.dropped, 6)
+        self.assertEqual(self.bus.subscriptions, ())
+
+    def test_merge(self):
+        """Test merging and batching of queued events"""
+        gate = Event()
+        batches = []
+        subscription = self.bus.subscribe(
+            lambda events: (gate.wait(), batches.append(events)),
+            policy=MERGE, batch=10
+        )
+        resource = self.bus.attach(light())
+        resource.state['value'] = 'first'
+        while subscription.queue:
+            sleep(0.001)
+        for i in range(100):
+            resource.state['value'] = i
+            resource.state['n'] = str(i)
+        gate.set()
+        self.bus.close()
+        self.assertEqual(len(batches), 2)
+        self.assertEqual([(x.key, x.old, x.new) for x in batches[1]],
+                         [('value', 'first', 99), ('n', None, '99')])
+        self.assertEqual(subscription.dropped, 0)
+
+    def test_asyncio(self):
+        """Test delivery to a coroutine function"""
+        events = []
+
+        async def received(event):
+            events.append(event)
+
+        async def main():
+            subscription = self.bus.subscribe(received)
+            resource = self.bus.attach(light())
+            await asyncio.get_running_loop().run_in_executor(
+                None, resource.state.__setitem__, 'value', True
+            )
+            while not events:
+                await asyncio.sleep(0.001)
+            self.bus.unsubscribe(subscription)
+            await asyncio.wrap_future(subscription.future)
+
+        asyncio.run(main())
+        self.assertEqual([(x.key, x.new) for x in events], [('value', True)])
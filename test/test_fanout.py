@@ -0,0 +1,93 @@
+import asyncio
+from time import monotonic, sleep
+from unittest import TestCase
+from iotdev.ocf.endpoint import Endpoint
+from iotdev.ocf.fanout import FanOut
+from iotdev.ocf.message import Retrieve, Response, Update
+from iotdev.ocf.status import Content, GatewayTimeout, NotFound
+from iotdev.ocf.transport import Transport, Transports
+
+
+class DelayTransport(Transport):
+
+    schemes = ('delay',)
+
+    def dispatch(self, ep, msg, timeout=None):
+        delay = float(msg.uri.strip('/'))
+        if timeout is not None and delay > timeout:
+            sleep(timeout)
+            raise GatewayTimeout
+        sleep(delay)
+        if delay == 0:
+            raise NotFound
+        return Response(Content, {'delay': delay})
+
+
+class LegacyTransport(Transport):
+
+    schemes = ('legacy',)
+
+    def dispatch(self, ep, msg):
+        # pylint: disable=arguments-differ
+        return Response(Content, {'uri': msg.uri})
+
+
+Transports.register(DelayTransport())
+Transports.register(LegacyTransport())
+
+
+class TestFanOut(TestCase):
+
+    def requests(self, *delays):
+        return [(Endpoint('delay://device%d' % i), Retrieve('/%s' % delay))
+                for i, delay in enumerate(delays)]
+
+    def test_concurrent(self):
+        """Test concurrent dispatch with results in completion order"""
+        start = monotonic()
+        results = list(FanOut(workers=4).dispatch(
+            self.requests(0.3, 0.1, 0.2, 0)
+        ))
+        self.assertLess(monotonic() - start, 0.6)
+        self.assertIsInstance(results[0][2], NotFound)
+        self.assertEqual([x[2].state['delay'] for x in results[1:]],
+                         [0.1, 0.2, 0.3])
+        self.assertEqual(results[1][0], Endpoint('delay://device1'))
+
+    def test_timeout(self):
+        """Test per-request timeout"""
+        results = list(FanOut(timeout=0.2).dispatch(
+            self.requests(5, 0.1)
+        ))
+        self.assertEqual(results[0][2].state['delay'], 0.1)
+        self.assertIsInstance(results[1][2], GatewayTimeout)
+
+    def test_legacy(self):
+        """Test transport not accepting a timeout"""
+        ep = Endpoint('legacy://device')
+        self.assertIs(ep.dispatch(Retrieve('/x')).status, Content)
+        self.assertIs(ep.dispatch(Update('/x', {'value': True})).status,
+                      Content)
+        (result,) = FanOut().dispatch([(ep, Retrieve('/y'))])
+        self.assertEqual(result[2].state['uri'], '/y')
+
+    def test_deadline(self):
+        """Test deadline for whole batch"""
+        start = monotonic()
+        results = list(FanOut(workers=1, deadline=0.3).dispatch(
+            self.requests(0.1, 0.1, 0.1, 0.1, 0.1, 0.1)
+        ))
+        self.assertLess(monotonic() - start, 0.5)
+        self.assertEqual(len(results), 6)
+        self.assertIsInstance(results[-1][2], GatewayTimeout)
+
+    def test_async(self):
+        """Test asynchronous iteration"""
+
+        async def collect():
+            return [x async for x in FanOut().adispatch(
+                self.requests(0.2, 0.1)
+            )]
+
+        results = asyncio.run(collect())
+        self.assertEqual([x[2].state['delay'] for x in results], [0.1, 0.2])
@@ -0,0 +1,121 @@
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase, mock
+from iotdev.ocf.group import GroupResource
+from iotdev.ocf.message import Retrieve, Update
+from iotdev.ocf.resource import Resource
+from iotdev.ocf.server import Server
+from iotdev.ocf.status import BadRequest, InternalServerError
+from iotdev.ocf.store import ResourceStore, FSYNC_WRITE
+from . import light
+
+LIGHT_RT = ['oic.r.switch.binary', 'oic.r.light.brightness']
+
+
+class TestGroup(TestCase):
+
+    def setUp(self):
+        self.server = Server()
+        for i in range(10):
+            self.server.add('/light/%d' % i,
+                            light(value=True, rt=LIGHT_RT, brightness=50))
+        self.server.add('/temp', Resource({
+            'rt': ['oic.r.temperature'],
+            'if': ['oic.if.baseline', 'oic.if.s'],
+            'temperature': 20.0,
+        }))
+
+    def test_members(self):
+        """Test group membership"""
+        group = self.server.add('/lights', GroupResource(
+            self.server, uris=['/temp', '/missing'], rt='oic.r.switch.binary'
+        ))
+        self.server.add('/all', GroupResource(self.server, rt=LIGHT_RT))
+        uris = [uri for uri, _ in group.members()]
+        self.assertEqual(len(uris), 11)
+        self.assertEqual(uris[0], '/temp')
+        self.assertNotIn('/all', uris)
+        rsp = self.server.dispatch(Retrieve('/lights',
+                                            params={'if': 'oic.if.ll'}))
+        self.assertEqual(len(rsp.state['links']), 11)
+        self.assertEqual(rsp.state['links'][0]['rt'], ['oic.r.temperature'])
+
+    def test_update(self):
+        """Test applying one update to all members"""
+        self.server.add('/lights', GroupResource(
+            self.server, uris=['/temp'], rt='oic.r.switch.binary'
+        ))
+        with mock.patch.object(GroupResource, 'validate',
+                               side_effect=GroupResource.validate) as check:
+            rsp = self.server.dispatch(Update('/lights', {
+                'value': False, 'brightness': '10',
+            }))
+        self.assertEqual(check.call_count, 2)
+        self.assertTrue(rsp.status.success)
+        statuses = {x['href']: x['status'] for x in rsp.state['links']}
+        self.assertEqual(statuses['/temp'], '4.00')
+        self.assertEqual(statuses['/light/3'], '2.04')
+        for i in range(10):
+            state = self.server['/light/%d' % i].state
+            self.assertIs(state['value'], False)
+            self.assertEqual(state['brightness'], 10)
+        rsp = self.server.dispatch(Retrieve('/lights'))
+        reps = {x['href']: x['rep'] for x in rsp.state['links']}
+        self.assertEqual(reps['/temp']['temperature'], 20.0)
+        self.assertIs(reps['/light/9']['value'], False)
+
+    def test_readonly(self):
+        """Test rejection of read-only properties"""
+        self.server.add('/lights', GroupResource(self.server, rt=LIGHT_RT))
+        rsp = self.server.dispatch(Update('/lights', {'rt': ['x']}))
+        self.assertIs(rsp.status, BadRequest)
+        self.assertEqual(self.server['/light/0'].state['rt'], LIGHT_RT)
+
+
+class TestGroupStore(TestCase):
+
+    def setUp(self):
+        self.tmpdir = TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def test_batch(self):
+        """Test saving members to a store as one batch"""
+        server = Server()
+        with ResourceStore(self.tmpdir.name, fsync=FSYNC_WRITE) as store:
+            for i in range(20):
+                key = 'light%d' % i
+                store.save(key, light(value=True, rt=LIGHT_RT,
+                                      brightness=50).state)
+                server.add('/light/%d' % i, store.resource(key))
+            server.add('/all', GroupResource(server, rt=LIGHT_RT))
+            with mock.patch('os.fsync') as fsync:
+                rsp = server.dispatch(Update('/all', {'value': False}))
+            self.assertEqual(len(rsp.state['links']), 20)
+            self.assertEqual(fsync.call_count, 1)
+        with ResourceStore(self.tmpdir.name) as store:
+            self.assertIs(store.load('light7')['value'], False)
+            self.assertEqual(store.load('light7')['brightness'], 50)
+
+    def test_failure(self):
+        """Test reporting of members that could not be saved"""
+        server = Server()
+        stores = [ResourceStore(os.path.join(self.tmpdir.name, x))
+                  for x in ('a', 'b')]
+        for store in stores:
+            self.addCleanup(store.close)
+        for i in range(10):
+            key = 'light%d' % i
+            store = stores[i % 2]
+            store.save(key, light(value=True, rt=LIGHT_RT).state)
+            server.add('/light/%d' % i, store.resource(key))
+        server.add('/all', GroupResource(server, rt=LIGHT_RT))
+        stores[1].close()
+        rsp = server.dispatch(Update('/all', {'value': False}))
+        self.assertTrue(rsp.status.success)
+        statuses = {x['href']: x['status'] for x in rsp.state['links']}
+        self.assertEqual(statuses['/light/4'], '2.04')
+        self.assertEqual(statuses['/light/5'], '5.00')
+        self.assertIs(stores[0].load('light4')['value'], False)
+        stores[0].close()
+        rsp = server.dispatch(Update('/all', {'value': True}))
+        self.assertIs(rsp.status, InternalServerError)
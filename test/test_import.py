@@ -0,0 +1,97 @@
+from importlib.metadata import EntryPoint
+import subprocess
+import sys
+from unittest import TestCase, mock
+from iotdev.ocf.transport import Transport, TransportRegistry
+
+OBJECT_MODEL = ', '.join([
+    'iotdev.ocf.coap',
+    'iotdev.ocf.discovery',
+    'iotdev.ocf.endpoint',
+    'iotdev.ocf.http',
+    'iotdev.ocf.message',
+    'iotdev.ocf.resource',
+    'iotdev.ocf.rt',
+    'iotdev.ocf.server',
+])
+
+NETWORKING = ['email', 'http.client', 'requests', 'select', 'socket', 'ssl',
+              'urllib.request', 'iotdev.transport.requests']
+
+DEFERRED = ['asyncio', 'concurrent.futures', 'cProfile', 'importlib.metadata',
+            'logging', 'multiprocessing', 'pkgutil', 'pstats', 'tracemalloc',
+            'zstandard']
+"""Costly modules imported only when the features using them are used"""
+
+
+def run(code):
+    return subprocess.run([sys.executable, '-c', code], check=True,
+                          capture_output=True, text=True).stdout
+
+
+class DummyTransport(Transport):
+
+    schemes = ('dummy', 'dummys')
+
+    def dispatch(self, ep, msg, timeout=None):
+        raise NotImplementedError
+
+
+class OverridingTransport(DummyTransport):
+
+    schemes = ('dummy',)
+
+
+class TestImport(TestCase):
+
+    def test_no_networking(self):
+        """Test that the object model imports no networking code"""
+        loaded = run('import sys; import %s; print(*sys.modules)' %
+                     OBJECT_MODEL).split()
+        self.assertFalse(set(NETWORKING) & set(loaded))
+
+    def test_lazy_transport(self):
+        """Test that transports are imported only on first use"""
+        loaded = run(
+            'import sys; from iotdev.ocf.endpoint import Endpoint; '
+            'ep = Endpoint("http://device.local"); '
+            'print("requests" in sys.modules); '
+            'print(type(ep.transport).__name__); '
+            'print("requests" in sys.modules)'
+        ).split()
+        self.assertEqual(loaded, ['False', 'RequestsTransport', 'True'])
+
+    def test_deferred(self):
+        """Test that the object model defers costly imports"""
+        loaded = run('import sys; import %s; print(*sys.modules)' %
+                     OBJECT_MODEL).split()
+        self.assertFalse(set(DEFERRED) & set(loaded))
+
+    def test_registry(self):
+        """Test lazy resolution of transport providers"""
+        registry = TransportRegistry({'dummy': '%s:DummyTransport' %
+                                      __name__})
+        self.assertIn('dummy', registry)
+        self.assertEqual(registry.data, {})
+        transport = registry.get('dummy')
+        self.assertIsInstance(transport, DummyTransport)
+        self.assertIs(registry['dummys'], transport)
+        self.assertNotIn('nonexistent', registry)
+        with self.assertRaises(KeyError):
+            registry['nonexistent']
+        self.assertIsNone(registry.get('nonexistent'))
+
+    def test_entry_point(self):
+        """Test overriding of built-in providers by entry points"""
+        registry = TransportRegistry({'dummy': '%s:DummyTransport' %
+                                      __name__})
+        entry = EntryPoint('dummy', '%s:OverridingTransport' % __name__,
+                           'iotdev.transports')
+        with mock.patch('importlib.metadata.entry_points',
+                        return_value=[entry]):
+            self.assertIsInstance(registry['dummy'], OverridingTransport)
+        registry = TransportRegistry({})
+        registry.provide('dummy', '%s:DummyTransport' % __name__)
+        with mock.patch('importlib.metadata.entry_points',
+                        return_value=[entry]):
+            self.assertIs(type(registry['dummy']), DummyTransport)
@@ -0,0 +1,125 @@
+from json import dumps, loads
+from unittest import TestCase
+from uuid import UUID
+from orderedset import OrderedSet
+from iotdev.ocf.content import ContentFormats
+from iotdev.ocf.json import (JSONEncoder, CompiledJSONEncoder,
+                             JSONStreamDecoder)
+from iotdev.ocf.resource import Resource
+from iotdev.ocf.rt import BinarySwitch, Brightness, Device, Temperature
+
+
+class TestCompiledJSONEncoder(TestCase):
+
+    def assertEncoded(self, rt, data):
+        """Assert that compiled and generic encodings are identical"""
+        self.assertEqual(rt.json_encoder.encode(data),
+                         JSONEncoder().encode(data))
+
+    def test_cached(self):
+        """Test caching of compiled encoders"""
+        self.assertIsInstance(BinarySwitch.json_encoder, CompiledJSONEncoder)
+        self.assertIs(BinarySwitch.json_encoder, BinarySwitch.json_encoder)
+        self.assertIs((BinarySwitch + Brightness).json_encoder,
+                      (BinarySwitch + Brightness).json_encoder)
+
+    def test_types(self):
+        """Test encoding of each property type"""
+        self.assertEncoded(BinarySwitch + Brightness, {
+            'rt': OrderedSet(['oic.r.switch.binary',
+                              'oic.r.light.brightness']),
+            'if': OrderedSet(['oic.if.baseline', 'oic.if.a']),
+            'n': 'café "light"',
+            'value': False,
+            'brightness': 40,
+        })
+        self.assertEncoded(Device, {
+            'di': UUID('4b2e71c3-7f89-44f1-ba58-c8ed780ce780'),
+            'id': None,
+        })
+        self.assertEncoded(Temperature, {'temperature': 21.5})
+        self.assertEncoded(Temperature, {'temperature': 21})
+
+    def test_fallback(self):
+        """Test fallback to generic encoder"""
+        self.assertEncoded(BinarySwitch, {'value': True, 'other': [1, {}]})
+        self.assertEncoded(BinarySwitch, {'value': 'yes', 'n': 42})
+        self.assertEqual(loads(Temperature.json_encoder.encode(
+            {'temperature': float('nan')}
+        ), parse_constant=str), {'temperature': 'NaN'})
+
+    def test_retrieve(self):
+        """Test use of compiled encoder for retrieved representations"""
+        light = Resource({
+            'rt': ['oic.r.switch.binary'],
+            'if': ['oic.if.baseline', 'oic.if.a'],
+            'value': True,
+        })
+        state = light.retrieve()
+        self.assertIs(state.json_encoder, BinarySwitch.json_encoder)
+        self.assertEqual(loads(state.json), {
+            'rt': ['oic.r.switch.binary'],
+            'if': ['oic.if.baseline', 'oic.if.a'],
+            'value': True,
+        })
+
+
+class TestJSONStreamDecoder(TestCase):
+
+    LINKS = [{
+        'href': '/light/%d' % i,
+        'rt': ['oic.r.switch.binary'],
+        'n': 'caf\u00e9 "{[light]}" \\ %d' % i,
+        'eps': [{'ep': 'coap://[fe80::1]:5683', 'pri': 1}],
+    } for i in range(100)]
+
+    def chunked(self, payload, size):
+        """Encode payload as chunks of the specified size"""
+        data = dumps(payload, ensure_ascii=False).encode()
+        return [data[i:i + size] for i in range(0, len(data), size)]
+
+    def test_chunks(self):
+        """Test decoding across arbitrary chunk boundaries"""
+        payload = {'rt': ['oic.wk.res'], 'links': self.LINKS,
+                   'extra': [1, {'x': [2.5, None, True]}]}
+        for size in (1, 3, 64, 100000):
+            decoder = JSONStreamDecoder()
+            self.assertEqual(list(decoder.decode(self.chunked(payload,
+                                                              size))),
+                             self.LINKS)
+            self.assertEqual(decoder.properties, {
+                'rt': ['oic.wk.res'], 'extra': [1, {'x': [2.5, None, True]}],
+            })
+
+    def test_incremental(self):
+        """Test that members are returned as soon as received"""
+        decoder = JSONStreamDecoder()
+        chunks = self.chunked(self.LINKS, 1000)
+        members = decoder.feed(chunks[0])
+        self.assertTrue(members)
+        self.assertEqual(members, self.LINKS[:len(members)])
+        self.assertLess(len(decoder.buf), 1000)
+        self.assertFalse(decoder.finished)
+
+    def test_empty(self):
+        """Test empty collections"""
+        for payload in ([], {}, {'links': []}, {'rt': ['x']}):
+            decoder = JSONStreamDecoder()
+            self.assertEqual(list(decoder.decode(self.chunked(payload, 1))),
+                             [])
+            self.assertTrue(decoder.finished)
+
+    def test_invalid(self):
+        """Test rejection of invalid or truncated payloads"""
+        for data in (b'[{"a": 1}', b'{"links": [1,', b'[1] 2', b'{"a" 1}',
+                     b'[{"a": 1}}', b'[{"a": x}]', b'"links"'):
+            with self.assertRaises(ValueError):
+                list(JSONStreamDecoder().decode([data]))
+
+    def test_content_format(self):
+        """Test incremental decoding of resource states"""
+        fmt = ContentFormats['application/json']
+        states = list(fmt.iterdecode(self.chunked(self.LINKS, 50)))
+        self.assertEqual([x.data for x in states], self.LINKS)
+        with self.assertRaises(ValueError):
+            list(fmt.iterdecode([b'[1, 2]']))
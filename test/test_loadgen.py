@@ -0,0 +1,49 @@
+from unittest import TestCase
+from iotdev.ocf.loadgen import LoadGenerator, percentile
+from iotdev.ocf.message import Notify, Retrieve, Update
+from iotdev.ocf.simulator import Fleet
+from iotdev.ocf.status import ServiceUnavailable
+
+
+class TestLoadGenerator(TestCase):
+
+    def setUp(self):
+        self.fleet = Fleet(4, {'/light': ['oic.r.switch.binary'],
+                               '/temperature': ['oic.r.temperature']},
+                           name='load', seed=1)
+        self.addCleanup(self.fleet.close)
+
+    def test_percentile(self):
+        """Test nearest rank percentiles"""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99.9), 100)
+        self.assertEqual(percentile(values, 0), 1)
+        self.assertIsNone(percentile([], 50))
+
+    def test_requests(self):
+        """Test generation of a fixed number of requests"""
+        report = LoadGenerator(self.fleet.targets(), workers=4,
+                               seed=2).run(requests=500)
+        self.assertEqual(report.requests, 500)
+        self.assertEqual(report.errors, 0)
+        self.assertEqual(set(report.latencies),
+                         {Retrieve.method, Update.method, Notify.method})
+        self.assertGreater(len(report.latencies[Retrieve.method]),
+                           len(report.latencies[Update.method]))
+        self.assertLessEqual(report.percentile(50), report.percentile(99))
+        self.assertGreater(report.throughput, 0)
+        self.assertEqual(sum(x.notifications for x in self.fleet.devices),
+                         len(report.latencies[Notify.method]))
+        self.assertIn('500 requests', str(report))
+
+    def test_rate(self):
+        """Test rate-limited generation with injected errors"""
+        for device in self.fleet.devices:
+            device.error_rate = 0.5
+        report = LoadGenerator(self.fleet.targets(),
+                               mix={Retrieve.method: 1}, rate=100,
+                               seed=3).run(duration=0.5)
+        self.assertLess(report.requests, 80)
+        self.assertGreater(report.outcomes[ServiceUnavailable], 0)
+        self.assertEqual(report.errors, report.outcomes[ServiceUnavailable])
@@ -1,7 +1,25 @@
 from json import loads
+import tracemalloc
 from unittest import TestCase
 from iotdev.ocf.state import ResourceState
-from iotdev.ocf.message import Message
+from iotdev.ocf.message import Message, Retrieve, Update, Response
+from iotdev.ocf.status import Changed, NotFound
+
+MESSAGE_BUDGET = 100
+"""Maximum allocation per parameterless request (in bytes)"""
+
+
+def allocated(func, count=10000):
+    """Measure peak memory allocated per call"""
+    tracemalloc.start()
+    try:
+        results = [None] * count
+        start = tracemalloc.get_traced_memory()[0]
+        for i in range(count):
+            results[i] = func()
+        return (tracemalloc.get_traced_memory()[1] - start) / count
+    finally:
+        tracemalloc.stop()
 
 
 class TestMessage(TestCase):
@@ -28,3 +46,35 @@ class TestMessage(TestCase):
         msg = Message(state=state)
         self.assertIs(msg.state, state)
         self.assertEqual(loads(msg.json), {'temperature': 21})
+
+    def test_lazy(self):
+        """Test lazy construction of state and parameters"""
+        msg = Update('/light', json='{"value": true}')
+        self.assertEqual(msg.json, '{"value": true}')
+        self.assertIsNone(msg._state)
+        self.assertIs(msg.state['value'], True)
+        self.assertIs(msg.state, msg.state)
+        msg = Retrieve('/light')
+        self.assertIsNone(msg._params)
+        self.assertFalse(msg.params)
+        msg.params.add('if', 'oic.if.a')
+        self.assertEqual(msg.params['if'], 'oic.if.a')
+        self.assertFalse(Retrieve('/light').params)
+        with self.assertRaises(AttributeError):
+            Retrieve('/light').extra = None
+
+    def test_empty(self):
+        """Test preconstructed empty responses"""
+        rsp = Response.empty(Changed)
+        self.assertIs(rsp, Response.empty(Changed))
+        self.assertIs(Response.empty(NotFound), Response.empty(NotFound))
+        self.assertIsNone(rsp.state)
+        with self.assertRaises(AttributeError):
+            rsp.token = b'token'
+        self.assertEqual(Response.empty(Changed, b'token').token, b'token')
+
+    def test_allocation(self):
+        """Test allocation cost of common messages"""
+        self.assertLess(allocated(lambda: Retrieve('/light')),
+                        MESSAGE_BUDGET)
+        self.assertLess(allocated(lambda: Response.empty(Changed)), 1)
@@ -0,0 +1,91 @@
+from threading import Lock
+from time import sleep
+from unittest import TestCase
+from iotdev.ocf.endpoint import Endpoint
+from iotdev.ocf.message import Response
+from iotdev.ocf.poll import Poller, PollTarget
+from iotdev.ocf.resource import Resource
+from iotdev.ocf.status import Content, ServiceUnavailable
+from iotdev.ocf.transport import Transport, Transports
+
+
+class SensorTransport(Transport):
+
+    schemes = ('sensor',)
+
+    def __init__(self):
+        self.lock = Lock()
+        self.polls = {}
+        self.active = {}
+        self.peak = {}
+
+    def dispatch(self, ep, msg, timeout=None):
+        with self.lock:
+            count = self.polls[msg.uri] = self.polls.get(msg.uri, 0) + 1
+            active = self.active[ep.uri] = self.active.get(ep.uri, 0) + 1
+            self.peak[ep.uri] = max(self.peak.get(ep.uri, 0), active)
+        sleep(0.01)
+        with self.lock:
+            self.active[ep.uri] -= 1
+        if msg.uri == '/failing':
+            return Response(ServiceUnavailable, token=msg.token)
+        value = count if msg.uri == '/changing' else 0
+        return Response(Content, {'temperature': value}, token=msg.token)
+
+
+sensors = SensorTransport()
+Transports.register(sensors)
+
+
+class TestPoller(TestCase):
+
+    def setUp(self):
+        self.ep = Endpoint('sensor://device')
+        self.poller = Poller(workers=8, concurrency=2, minimum=0.02,
+                             maximum=1.0, increase=2.0)
+
+    def test_adapt(self):
+        """Test adaptation of intervals to observed changes"""
+        resource = Resource({'rt': ['oic.r.temperature']})
+        with self.poller:
+            changing = self.poller.add(self.ep, '/changing', resource)
+            steady = self.poller.add(self.ep, '/steady')
+            failing = self.poller.add(self.ep, '/failing')
+            sleep(0.5)
+        self.assertEqual(changing.interval, self.poller.minimum)
+        self.assertGreater(steady.interval, 0.1)
+        self.assertGreater(sensors.polls['/changing'],
+                           2 * sensors.polls['/steady'])
+        self.assertEqual(resource.state['temperature'],
+                         changing.state['temperature'])
+        self.assertEqual(failing.polls, 0)
+        self.assertGreater(failing.failures, 0)
+
+    def test_removed(self):
+        """Test removal of properties no longer polled"""
+        resource = Resource({'rt': ['oic.r.temperature'], 'units': 'K'})
+        target = PollTarget(self.ep, '/x', resource)
+        self.assertTrue(Poller.apply(target, {'temperature': 20,
+                                              'units': 'C'}))
+        self.assertEqual(resource.state['units'], 'C')
+        self.assertFalse(Poller.apply(target, {'temperature': 20,
+                                               'units': 'C'}))
+        self.assertTrue(Poller.apply(target, {'temperature': 21}))
+        self.assertNotIn('units', resource.state)
+        self.assertEqual(resource.state['temperature'], 21)
+        self.assertEqual(resource.state['rt'], ['oic.r.temperature'])
+
+    def test_concurrency(self):
+        """Test per-endpoint concurrency cap"""
+        other = Endpoint('sensor://other')
+        with self.poller:
+            targets = [self.poller.add(ep, '/changing%d' % i, interval=0.02)
+                       for i in range(10) for ep in (self.ep, other)]
+            sleep(0.3)
+            self.poller.remove(targets[0])
+            removed = targets[0].polls
+            sleep(0.1)
+        self.assertEqual(sensors.peak[self.ep.uri], 2)
+        self.assertEqual(sensors.peak[other.uri], 2)
+        self.assertTrue(all(x.polls for x in targets))
+        self.assertLessEqual(targets[0].polls, removed + 1)
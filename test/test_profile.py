@@ -0,0 +1,92 @@
+from concurrent.futures import ThreadPoolExecutor
+from inspect import getfile
+from io import StringIO
+import json
+from time import sleep
+from unittest import TestCase
+from iotdev.ocf.message import Retrieve, Update
+from iotdev.ocf.profile import NULL_PHASE, Profiler, current, phase
+from iotdev.ocf.resource import Resource
+from iotdev.ocf.server import Server
+from . import light
+
+
+class SlowResource(Resource):
+
+    def load(self, names, params):
+        sleep(0.05)
+
+
+class TestProfiler(TestCase):
+
+    def setUp(self):
+        self.log = StringIO()
+        self.profiler = Profiler(threshold=0.03, sample=0, log=self.log)
+        self.server = Server(profiler=self.profiler)
+        self.server.add('/light', light())
+        self.server.add('/slow', light(SlowResource))
+
+    def records(self):
+        return [json.loads(x) for x in self.log.getvalue().splitlines()]
+
+    def test_disabled(self):
+        """Test that phases are not timed outside a profiled request"""
+        self.assertIsNone(current())
+        self.assertIs(phase('load'), NULL_PHASE)
+
+    def test_phases(self):
+        """Test timing of request handling phases"""
+        with self.profiler.request(Retrieve('/light')) as profile:
+            self.server.dispatch(profile.msg)
+            self.assertIs(current(), profile)
+        self.assertIsNone(current())
+        self.assertEqual(self.profiler.requests, 1)
+        self.assertLessEqual({'intf', 'load', 'retrieve'},
+                             set(profile.phases))
+        self.assertEqual(profile.counts['retrieve'], 1)
+        self.assertLessEqual(profile.phases['retrieve'], profile.duration)
+        self.assertEqual(list(self.profiler.slow), [])
+
+    def test_slow(self):
+        """Test slow request log"""
+        self.server.dispatch(Retrieve('/light'))
+        self.server.dispatch(Update('/slow', {'value': True}))
+        self.server.dispatch(Retrieve('/slow', params={'if': 'oic.if.a'}))
+        (record,) = self.records()
+        self.assertEqual(record['uri'], '/slow')
+        self.assertEqual(record['method'], 'RETRIEVE')
+        self.assertEqual(record['params'], [['if', 'oic.if.a']])
+        self.assertEqual(record['status'], '2.05')
+        self.assertGreaterEqual(record['phases']['load']['time'], 0.05)
+        self.assertGreaterEqual(record['duration'], 0.05)
+        self.assertNotIn('profile', record)
+        self.assertEqual(self.profiler.slow[0]['duration'],
+                         record['duration'])
+
+    def test_sampled(self):
+        """Test sampled function and allocation capture"""
+        self.profiler.sample = 1
+        self.profiler.memory = True
+        self.server.dispatch(Retrieve('/slow'))
+        (record,) = self.records()
+        functions = [x['function'] for x in record['profile']]
+        self.assertTrue(any(x.endswith('(load)') for x in functions))
+        self.assertLessEqual(len(functions), self.profiler.top)
+        self.assertIsInstance(record['memory'], list)
+        self.assertFalse(any(x['location'].startswith(getfile(Profiler))
+                             for x in record['memory']))
+
+    def test_concurrent(self):
+        """Test sampling of concurrent requests"""
+        self.profiler.sample = 1
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            rsps = list(executor.map(self.server.dispatch,
+                                     [Retrieve('/slow')] * 16))
+        self.assertTrue(all(x.status.success for x in rsps))
+        self.assertEqual(self.profiler.requests, 16)
+        records = self.records()
+        self.assertEqual(len(records), 16)
+        profiled = [x for x in records if 'profile' in x]
+        self.assertGreater(len(profiled), 0)
+        self.assertLess(len(profiled), 16)
+        self.assertFalse(self.profiler.profiling.locked())
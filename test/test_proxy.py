@@ -0,0 +1,102 @@
+import json
+from unittest import TestCase, mock
+from iotdev.ocf.content import JSONContentFormat
+from iotdev.ocf.endpoint import Endpoint
+from iotdev.ocf.message import Retrieve, Update
+from iotdev.ocf.proxy import Gateway, Route
+from iotdev.ocf.simulator import Fleet
+from iotdev.ocf.status import (BadGateway, Changed, Content, NotFound,
+                               ProxyingNotSupported)
+from iotdev.transport.httpserver import HttpServer
+from iotdev.transport.requests import RequestsTransport
+
+RESOURCES = {
+    '/temp': ['oic.r.temperature'],
+    '/light': ['oic.r.switch.binary'],
+}
+
+
+class TestGateway(TestCase):
+
+    def setUp(self):
+        self.fleet = Fleet(2, RESOURCES, name='proxy', seed=7)
+        self.addCleanup(self.fleet.close)
+        self.eps = self.fleet.serve()
+
+    def gateway(self, **kwargs):
+        return Gateway((Route('/lan/0', self.eps[0]),
+                        Route('/lan/1', self.eps[1]),
+                        Route('/lan', self.eps[0], path='/missing')),
+                       **kwargs)
+
+    def test_route(self):
+        """Test longest prefix routing and URI rewriting"""
+        gateway = self.gateway()
+        self.assertIs(gateway.route('/lan/1/temp').ep, self.eps[1])
+        self.assertIs(gateway.route('/lan/0').ep, self.eps[0])
+        self.assertEqual(gateway.route('/lan/10/temp').path, '/missing')
+        self.assertEqual(gateway.route('/lan/1/temp').rewrite('/lan/1/temp'),
+                         '/temp')
+        self.assertEqual(gateway.route('/lan/0').rewrite('/lan/0'), '/')
+        with self.assertRaises(ProxyingNotSupported):
+            gateway.route('/wan/0/temp')
+
+    def test_relay(self):
+        """Test relaying without decoding the response body"""
+        gateway = self.gateway()
+        state = self.fleet.devices[1]['/temp'].state
+        decode = JSONContentFormat.decode
+        with mock.patch.object(JSONContentFormat, 'decode',
+                               side_effect=decode) as decoder:
+            rsp = gateway.dispatch(Retrieve('/lan/1/temp', token=b'x'))
+            self.assertIs(rsp.status, Content)
+            self.assertEqual(rsp.token, b'x')
+            data = rsp.encode('application/json')
+            decoder.assert_not_called()
+        self.assertEqual(json.loads(data)['temperature'],
+                         state['temperature'])
+
+    def test_update(self):
+        """Test forwarding an update"""
+        gateway = self.gateway()
+        rsp = gateway.dispatch(Update('/lan/0/light', {'value': True}))
+        self.assertIs(rsp.status, Changed)
+        self.assertIs(self.fleet.devices[0]['/light'].state['value'], True)
+        self.assertEqual(gateway.forwarded, 1)
+
+    def test_failure(self):
+        """Test unroutable and unreachable requests"""
+        gateway = self.gateway()
+        rsp = gateway.dispatch(Retrieve('/wan/temp'))
+        self.assertIs(rsp.status, ProxyingNotSupported)
+        rsp = gateway.dispatch(Retrieve('/lan/2/temp'))
+        self.assertIs(rsp.status, NotFound)
+        with HttpServer(None) as closed:
+            uri = closed.uri
+        gateway.add('/gone', Endpoint(uri))
+        rsp = gateway.dispatch(Retrieve('/gone/temp'))
+        self.assertIs(rsp.status, BadGateway)
+
+    def test_http(self):
+        """Test gateway served over HTTP"""
+        with HttpServer(self.gateway(streaming=True)) as front:
+            ep = Endpoint(front.uri)
+            rsp = ep.dispatch(Retrieve('/lan/1/light'))
+            self.assertIs(rsp.status, Content)
+            self.assertEqual(rsp.state['value'],
+                             self.fleet.devices[1]['/light'].state['value'])
+            rsp = ep.dispatch(Retrieve('/lan/0/nonexistent'))
+            self.assertIs(rsp.status, NotFound)
+            with ep.stream(Retrieve('/lan/0/temp')) as rsp:
+                self.assertIs(rsp.status, Content)
+                self.assertEqual(rsp.content_type, 'application/json')
+                data = json.loads(b''.join(rsp))
+            self.assertEqual(data['temperature'],
+                             self.fleet.devices[0]['/temp'].state[
+                                 'temperature'])
+
+    def test_pool(self):
+        """Test upstream connection pool size"""
+        transport = RequestsTransport(pool_size=4)
+        adapter = transport.session.get_adapter('http://localhost/')
+        self.assertEqual(adapter._pool_maxsize, 4)
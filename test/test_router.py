@@ -0,0 +1,130 @@
+from unittest import TestCase, mock
+from iotdev.ocf.discovery import DiscoveryResource
+from iotdev.ocf.interface import (ActuatorInterface, BaselineInterface,
+                                  LinksListInterface)
+from iotdev.ocf.message import Retrieve, Update
+from iotdev.ocf.resource import Resource
+from iotdev.ocf.router import Query, Router
+from iotdev.ocf.server import Server
+from iotdev.ocf.status import BadRequest, Changed, Content, NotFound
+from . import light
+
+
+class TestQuery(TestCase):
+
+    def test_lazy(self):
+        """Test lazy query string parsing"""
+        query = Query('if=oic.if.a&rt=x&rt=y&flag')
+        self.assertIsNone(query._params)
+        self.assertTrue(query)
+        self.assertFalse(Query(''))
+        self.assertIsNone(query._params)
+        self.assertEqual(query['if'], 'oic.if.a')
+        self.assertEqual(query.getall('rt'), ['x', 'y'])
+        self.assertEqual(query.get('flag'), '')
+        self.assertEqual(len(query), 4)
+        msg = Retrieve('/light', params=query)
+        self.assertIs(msg.params, query)
+
+
+class TestRouter(TestCase):
+
+    def test_static(self):
+        """Test routes without path parameters"""
+        router = Router()
+        resource = light()
+        router.add('/light', resource)
+        router.add('/', 'root')
+        self.assertIs(router.match('/light').target(), resource)
+        self.assertIs(router.match('/light/').target(), resource)
+        self.assertEqual(router.match('/').target(), 'root')
+        self.assertIsNone(router.match('/dark'))
+        router.remove('/light')
+        self.assertIsNone(router.match('/light'))
+        self.assertEqual(len(router), 1)
+
+    def test_parameters(self):
+        """Test path parameters"""
+        router = Router()
+        router.add('/site/{site}/dev/{id}', dict, factory=True)
+        router.add('/site/{site}/dev/hub', 'hub')
+        router.add('/site/{site}/dev/{id}/light', 'light')
+        match = router.match('/site/3/dev/7')
+        self.assertEqual(match.target(), {'site': '3', 'id': '7'})
+        self.assertEqual(router.match('/site/3/dev/hub').target(), 'hub')
+        match = router.match('/site/3/dev/hub/light')
+        self.assertEqual(match.target(), 'light')
+        self.assertEqual(match.params, {'site': '3', 'id': 'hub'})
+        self.assertIsNone(router.match('/site/3/dev'))
+        self.assertIsNone(router.match('/site//dev/7'))
+        router.remove('/site/{x}/dev/hub')
+        self.assertEqual(router.match('/site/3/dev/hub').target(),
+                         {'site': '3', 'id': 'hub'})
+        with self.assertRaises(KeyError):
+            router.remove('/site/{x}/dev/hub')
+
+    def test_scale(self):
+        """Test lookup among many routes"""
+        router = Router()
+        for i in range(20000):
+            router.add('/site/%d/light' % i, i)
+            router.add('/site/%d/dev/{id}' % i, i)
+        self.assertEqual(len(router), 40000)
+        self.assertEqual(router.match('/site/12345/light').target(), 12345)
+        match = router.match('/site/19999/dev/abc')
+        self.assertEqual((match.target(), match.params['id']),
+                         (19999, 'abc'))
+
+    def test_interface(self):
+        """Test cached interface selection"""
+        router = Router()
+        resource = light()
+        route = router.add('/light', resource)
+        self.assertIs(route.default, BaselineInterface)
+        match = router.match('/light')
+        with mock.patch.object(Resource, 'interface',
+                               side_effect=Resource.interface,
+                               autospec=True) as select:
+            for _ in range(3):
+                self.assertIs(match.interface(Query('if=oic.if.a')),
+                              ActuatorInterface)
+                self.assertIs(match.interface(Query('')), BaselineInterface)
+            self.assertEqual(select.call_count, 1)
+        with self.assertRaises(BadRequest):
+            match.interface(Query('if=oic.if.nonexistent'))
+
+    def test_invalidate(self):
+        """Test invalidation of cached interface selection"""
+        server = Server()
+        discovery = server.add('/oic/res', DiscoveryResource(server))
+        match = server.router.match('/oic/res')
+        self.assertIs(match.interface(Query('if=oic.if.baseline')),
+                      BaselineInterface)
+        discovery.state['if'] = ['oic.if.ll']
+        self.assertIs(match.interface(Query('if=oic.if.baseline')),
+                      LinksListInterface)
+
+
+class TestServerRouting(TestCase):
+
+    def test_dispatch(self):
+        """Test server dispatch via router"""
+        server = Server()
+        server.add('/light', light())
+        lights = {'1': light(value=True)}
+        server.route('/lights/{id}', lambda id: lights.get(id))
+        rsp = server.dispatch(Retrieve('/light/',
+                                       params=Query('if=oic.if.a')))
+        self.assertIs(rsp.status, Content)
+        self.assertEqual(rsp.state, {'value': False})
+        rsp = server.dispatch(Update('/lights/1', {'value': False},
+                                     params=Query('if=oic.if.a')))
+        self.assertIs(rsp.status, Changed)
+        self.assertIs(lights['1'].state['value'], False)
+        rsp = server.dispatch(Retrieve('/lights/2'))
+        self.assertIs(rsp.status, NotFound)
+        rsp = server.dispatch(Retrieve('/light', params={'if': 'bogus'}))
+        self.assertIs(rsp.status, BadRequest)
+        del server['/light']
+        rsp = server.dispatch(Retrieve('/light'))
+        self.assertIs(rsp.status, NotFound)
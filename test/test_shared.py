@@ -0,0 +1,98 @@
+from json import loads
+import struct
+from unittest import TestCase, mock
+from uuid import UUID
+from iotdev.ocf.resource import Resource
+from iotdev.ocf.rt import Refrigeration
+from iotdev.ocf.shared import SEQ, SharedStateSegment
+
+
+class TestSharedState(TestCase):
+
+    def setUp(self):
+        self.writer = SharedStateSegment(create=True, capacity=16,
+                                         size=65536)
+        self.reader = SharedStateSegment(self.writer.name)
+        self.fridge = Resource({
+            'defrost': False,
+            'filter': 99,
+            'if': ['oic.if.baseline', 'oic.if.a'],
+            'n': 'my_fridge',
+            'rt': ['oic.r.refrigeration'],
+        })
+        self.writer.register('/fridge', self.fridge)
+
+    def tearDown(self):
+        self.reader.close()
+        self.writer.close()
+        self.writer.unlink()
+
+    def test_read(self):
+        """Test reading state from an attached segment"""
+        self.assertIn('/fridge', self.reader)
+        state = self.reader['/fridge']
+        self.assertEqual(state['filter'], 99)
+        self.assertIs(state['defrost'], False)
+        self.assertEqual(state['n'], 'my_fridge')
+        self.assertNotIn('rapidCool', state)
+        self.assertEqual(set(state), {'rt', 'if', 'defrost', 'filter', 'n'})
+        self.assertEqual(loads(state.json)['filter'], 99)
+
+    def test_update(self):
+        """Test visibility of updates made by the writer"""
+        state = self.reader['/fridge']
+        self.fridge.prop.rapidCool = True
+        self.fridge.prop.filter = 42
+        del self.fridge.prop.n
+        self.assertIs(state['rapidCool'], True)
+        self.assertEqual(state['filter'], 42)
+        self.assertNotIn('n', state)
+        self.assertEqual(state.snapshot()['filter'], 42)
+
+    def test_unencodable(self):
+        """Test that a failed update does not leave a slot locked"""
+        state = self.reader['/fridge']
+        with self.assertRaises(struct.error):
+            self.fridge.state['filter'] = 1.5
+        self.assertEqual(state['filter'], 99)
+        self.assertEqual(self.fridge.state['filter'], 99)
+        self.fridge.prop.defrost = True
+        self.assertIs(state['defrost'], True)
+        with self.assertRaises(ValueError):
+            self.fridge.state['n'] = 'x' * 100
+        self.assertEqual(self.fridge.state['n'], 'my_fridge')
+        self.fridge.prop.filter = 42
+        self.assertEqual(state['filter'], 42)
+
+    def test_locked(self):
+        """Test bounded wait for a slot left locked"""
+        state = self.reader['/fridge']
+        SEQ.pack_into(self.writer.buf, state.offset, 1)
+        with mock.patch('iotdev.ocf.shared.READ_RETRIES', 10):
+            with self.assertRaises(TimeoutError):
+                state['filter']  # pylint: disable=pointless-statement
+
+    def test_resource(self):
+        """Test read-only resource backed by shared state"""
+        fridge = self.reader.resource('/fridge')
+        self.assertIsInstance(fridge.prop, Refrigeration)
+        self.assertEqual(fridge.retrieve()['filter'], 99)
+        with self.assertRaises(TypeError):
+            fridge.update({'defrost': True}, {'if': 'oic.if.a'})
+
+    def test_types(self):
+        """Test fixed-layout encoding of property types"""
+        device = Resource({
+            'rt': ['oic.wk.d', 'oic.r.temperature'],
+            'di': '4b2e71c3-7f89-44f1-ba58-c8ed780ce780',
+            'temperature': 21,
+        })
+        self.writer.register('/device', device)
+        state = self.reader['/device']
+        self.assertEqual(state['di'],
+                         UUID('4b2e71c3-7f89-44f1-ba58-c8ed780ce780'))
+        self.assertIsInstance(state['temperature'], int)
+        device.prop.temperature = 21.5
+        self.assertEqual(state['temperature'], 21.5)
+        with self.assertRaises(KeyError):
+            self.writer.register('/device', device)
@@ -0,0 +1,100 @@
+from http.client import HTTPConnection
+from unittest import TestCase
+from urllib.parse import urlsplit
+from iotdev.ocf.endpoint import Endpoint
+from iotdev.ocf.message import Notify, Retrieve, Update
+from iotdev.ocf.rt import BinarySwitch, Brightness, Temperature
+from iotdev.ocf.simulator import Fleet, RandomWalk, Toggle
+from iotdev.ocf.status import (Changed, Content, GatewayTimeout, NotFound,
+                               ServiceUnavailable)
+from iotdev.ocf.versioned import VersionedResource
+
+RESOURCES = {
+    '/light': BinarySwitch + Brightness,
+    '/temperature': Temperature,
+    '/fridge': ['oic.r.refrigeration'],
+}
+
+
+class TestFleet(TestCase):
+
+    def fleet(self, count=3, **kwargs):
+        fleet = Fleet(count, RESOURCES, seed=42, **kwargs)
+        self.addCleanup(fleet.close)
+        return fleet
+
+    def test_resources(self):
+        """Test construction of simulated resources"""
+        fleet = self.fleet()
+        light = fleet.devices[0]['/light']
+        self.assertIsInstance(light.prop, BinarySwitch)
+        self.assertIsInstance(light.prop, Brightness)
+        self.assertIn(light.state['brightness'], range(101))
+        self.assertIn('defrost', fleet.devices[2]['/fridge'].state)
+        self.assertEqual(len(fleet.targets()), 9)
+
+    def test_step(self):
+        """Test state change models"""
+        fleet = self.fleet(models={
+            'oic.r.switch.binary': (Toggle('value', probability=1),),
+            'oic.r.temperature': (RandomWalk('temperature', 0.5, 10, 11),),
+        })
+        light = fleet.devices[1]['/light']
+        temperature = fleet.devices[1]['/temperature']
+        value = light.state['value']
+        for _ in range(20):
+            self.assertGreaterEqual(fleet.step(), 3)
+            self.assertLessEqual(10, temperature.state['temperature'])
+            self.assertLessEqual(temperature.state['temperature'], 11)
+        self.assertEqual(light.state['value'], value)
+        fleet.step()
+        self.assertNotEqual(light.state['value'], value)
+
+    def test_dispatch(self):
+        """Test in-process dispatch"""
+        fleet = self.fleet(resource_class=VersionedResource)
+        ep = fleet.endpoints()[2]
+        self.assertEqual(ep, Endpoint('sim://fleet/2'))
+        rsp = ep.dispatch(Update('/light', {'value': True}))
+        self.assertIs(rsp.status, Changed)
+        rsp = ep.dispatch(Retrieve('/light', params={'if': 'oic.if.a'}))
+        self.assertIs(rsp.status, Content)
+        self.assertEqual(rsp.state['value'], True)
+        rsp = ep.dispatch(Notify('/temperature', {'temperature': 5}))
+        self.assertIs(rsp.status, Content)
+        self.assertEqual(fleet.devices[2].notifications, 1)
+        with self.assertRaises(NotFound):
+            Endpoint('sim://fleet/3').dispatch(Retrieve('/light'))
+
+    def test_faults(self):
+        """Test latency and error injection"""
+        fleet = self.fleet(latency=0.1)
+        with self.assertRaises(GatewayTimeout):
+            fleet.endpoints()[0].dispatch(Retrieve('/light'), timeout=0.05)
+        fleet = self.fleet(name='faulty', error_rate=1)
+        rsp = fleet.endpoints()[0].dispatch(Retrieve('/light'))
+        self.assertIs(rsp.status, ServiceUnavailable)
+
+    def test_http(self):
+        """Test serving over HTTP"""
+        fleet = self.fleet()
+        (ep, _, _) = fleet.serve()
+        self.assertEqual(ep.scheme, 'http')
+        rsp = ep.dispatch(Update('/light', {'brightness': 7}))
+        self.assertIs(rsp.status, Changed)
+        rsp = ep.dispatch(Retrieve('/light', params={'if': 'oic.if.a'}))
+        self.assertEqual(rsp.state['brightness'], 7)
+        self.assertEqual(fleet.devices[0]['/light'].state['brightness'], 7)
+        rsp = ep.dispatch(Update('/temperature', {'temperature': 3}))
+        self.assertFalse(rsp.status.success)
+        self.assertIs(ep.dispatch(Retrieve('/missing')).status, NotFound)
+        url = urlsplit(ep.uri)
+        for length in ('bogus', '-1'):
+            conn = HTTPConnection(url.hostname, url.port, timeout=5)
+            self.addCleanup(conn.close)
+            conn.putrequest('PUT', '/light')
+            conn.putheader('Content-Length', length)
+            conn.endheaders()
+            rsp = conn.getresponse()
+            self.assertEqual(rsp.status, 400)
+            self.assertEqual(rsp.getheader('Connection'), 'close')
@@ -0,0 +1,152 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from time import monotonic, sleep
+from unittest import TestCase
+from iotdev.ocf.endpoint import Endpoint
+from iotdev.ocf.message import Retrieve, Update, Response
+from iotdev.ocf.resource import Resource
+from iotdev.ocf.server import Server
+from iotdev.ocf.singleflight import SingleFlight
+from iotdev.ocf.status import Content, Changed, GatewayTimeout
+from iotdev.ocf.transport import Transport, Transports
+
+
+class SlowResource(Resource):
+
+    def __init__(self, state):
+        super().__init__(state)
+        self.loads = 0
+        self.saves = 0
+        self.lock = Lock()
+
+    def load(self, names, params):
+        with self.lock:
+            self.loads += 1
+        sleep(0.1)
+
+    def save(self, names, params):
+        with self.lock:
+            self.saves += 1
+        sleep(0.1)
+
+
+class CountingTransport(Transport):
+
+    schemes = ('counting',)
+
+    def __init__(self):
+        self.count = 0
+        self.lock = Lock()
+
+    def dispatch(self, ep, msg, timeout=None):
+        with self.lock:
+            self.count += 1
+        sleep(0.1)
+        if isinstance(msg, Update):
+            return Response(Changed, token=msg.token)
+        return Response(Content, {'value': self.count}, token=msg.token)
+
+
+counting = CountingTransport()
+Transports.register(counting)
+
+
+class TestSingleFlight(TestCase):
+
+    def test_error(self):
+        """Test propagation of exceptions to all callers"""
+        flights = SingleFlight()
+
+        def fail():
+            sleep(0.1)
+            raise ValueError
+
+        with ThreadPoolExecutor(4) as executor:
+            futures = [executor.submit(flights.do, 'key', fail)
+                       for _ in range(4)]
+        for future in futures:
+            self.assertIsInstance(future.exception(), ValueError)
+        self.assertFalse(flights.calls)
+
+    def test_wait(self):
+        """Test bounded wait for an in-flight call"""
+        flights = SingleFlight()
+        with ThreadPoolExecutor(2) as executor:
+            leader = executor.submit(flights.do, 'key', sleep, 0.3)
+            sleep(0.05)
+            follower = executor.submit(flights.do, 'key', sleep, 0.3,
+                                       wait=0.05)
+            self.assertIsInstance(follower.exception(), TimeoutError)
+            self.assertFalse(leader.done())
+        self.assertEqual(leader.result(), (None, False))
+
+    def test_server(self):
+        """Test coalescing of concurrent server retrievals"""
+        server = Server()
+        light = server.add('/light', SlowResource({
+            'rt': ['oic.r.switch.binary'],
+            'if': ['oic.if.baseline', 'oic.if.a'],
+            'value': False,
+        }))
+        with ThreadPoolExecutor(8) as executor:
+            rsps = list(executor.map(
+                server.dispatch,
+                [Retrieve('/light', token=bytes([i])) for i in range(8)]
+            ))
+        self.assertEqual(light.loads, 1)
+        self.assertEqual([x.token for x in rsps],
+                         [bytes([i]) for i in range(8)])
+        self.assertTrue(all(x.state['value'] is False for x in rsps))
+        rsps[0].state['value'] = True
+        self.assertIs(rsps[1].state['value'], False)
+
+    def test_server_update(self):
+        """Test that server updates are never coalesced"""
+        server = Server()
+        light = server.add('/light', SlowResource({
+            'rt': ['oic.r.switch.binary'],
+            'if': ['oic.if.baseline', 'oic.if.a'],
+            'value': False,
+        }))
+        with ThreadPoolExecutor(4) as executor:
+            rsps = list(executor.map(
+                server.dispatch,
+                [Update('/light', {'value': True}) for _ in range(4)]
+            ))
+        self.assertTrue(all(x.status is Changed for x in rsps))
+        self.assertEqual(light.saves, 4)
+
+    def test_client(self):
+        """Test coalescing of concurrent client retrievals"""
+        ep = Endpoint('counting://device')
+        counting.count = 0
+        with ThreadPoolExecutor(8) as executor:
+            rsps = list(executor.map(ep.dispatch, [
+                Retrieve('/light', token=bytes([i])) for i in range(8)
+            ]))
+            self.assertEqual(counting.count, 1)
+            self.assertEqual([x.token for x in rsps],
+                             [bytes([i]) for i in range(8)])
+            list(executor.map(ep.dispatch, [
+                Retrieve('/light', params={'if': 'oic.if.a'}),
+                Retrieve('/light', params={'if': 'oic.if.baseline'}),
+            ]))
+            self.assertEqual(counting.count, 3)
+            list(executor.map(ep.dispatch, [
+                Update('/light', {'value': True}) for _ in range(4)
+            ]))
+            self.assertEqual(counting.count, 7)
+
+    def test_client_timeout(self):
+        """Test short-timeout caller joining a slow in-flight request"""
+        ep = Endpoint('counting://device')
+        counting.count = 0
+        with ThreadPoolExecutor(2) as executor:
+            leader = executor.submit(ep.dispatch, Retrieve('/slow'))
+            sleep(0.02)
+            start = monotonic()
+            with self.assertRaises(GatewayTimeout):
+                ep.dispatch(Retrieve('/slow'), timeout=0.02)
+            self.assertLess(monotonic() - start, 0.07)
+            self.assertIs(leader.result().status, Content)
+        self.assertEqual(counting.count, 1)
@@ -0,0 +1,88 @@
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from uuid import UUID
+from iotdev.ocf.binary import BinaryEncoder, BinaryDecoder
+from iotdev.ocf.store import ResourceStore, FSYNC_WRITE, FSYNC_INTERVAL
+
+
+class TestBinary(TestCase):
+
+    def test_roundtrip(self):
+        """Test binary encoding round trip"""
+        value = {
+            'n': 'my_fridge',
+            'filter': -99,
+            'temperature': 21.5,
+            'enabled': True,
+            'missing': None,
+            'di': UUID('4b2e71c3-7f89-44f1-ba58-c8ed780ce780'),
+            'rt': ['oic.r.refrigeration'] * 200,
+            'raw': b'\x00\xff',
+        }
+        data = BinaryEncoder().encode(value)
+        self.assertEqual(BinaryDecoder().decode(data), value)
+        with self.assertRaises(ValueError):
+            BinaryDecoder().decode(data + b'\x00')
+
+
+class TestResourceStore(TestCase):
+
+    def setUp(self):
+        self.tmpdir = TemporaryDirectory()
+        self.path = self.tmpdir.name
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_recover_log(self):
+        """Test recovery from log alone"""
+        with ResourceStore(self.path, fsync=FSYNC_WRITE) as store:
+            store.save('/fridge', {'rt': ['oic.r.refrigeration'],
+                                   'filter': 99, 'defrost': False})
+            store.save('/fridge', {'filter': 42}, ['filter', 'defrost'])
+            store.save('/switch', {'value': True})
+            store.delete('/switch')
+        with ResourceStore(self.path) as store:
+            self.assertEqual(set(store), {'/fridge'})
+            self.assertEqual(dict(store.load('/fridge')),
+                             {'rt': ['oic.r.refrigeration'], 'filter': 42})
+
+    def test_recover_snapshot(self):
+        """Test recovery from snapshot and log tail"""
+        with ResourceStore(self.path, snapshot=10) as store:
+            for i in range(25):
+                store.save('/light/%d' % i, {'rt': ['oic.r.switch.binary'],
+                                             'value': bool(i % 2)})
+            self.assertEqual(store.records, 5)
+        with ResourceStore(self.path) as store:
+            self.assertEqual(store.epoch, 2)
+            self.assertEqual(len(store), 25)
+            self.assertTrue(store.load('/light/3')['value'])
+            self.assertFalse(store.load('/light/24')['value'])
+
+    def test_torn_write(self):
+        """Test recovery from a partially written log record"""
+        with ResourceStore(self.path) as store:
+            store.save('/switch', {'value': True})
+            store.save('/switch', {'value': False})
+        log = os.path.join(self.path, 'log')
+        os.truncate(log, os.path.getsize(log) - 1)
+        with ResourceStore(self.path) as store:
+            self.assertTrue(store.load('/switch')['value'])
+            store.save('/other', {'value': True})
+        with ResourceStore(self.path) as store:
+            self.assertEqual(set(store), {'/switch', '/other'})
+
+    def test_resource(self):
+        """Test persistent resource load/save hooks"""
+        with ResourceStore(self.path, fsync=FSYNC_INTERVAL,
+                           interval=0.01) as store:
+            store.save('/fridge', {'rt': ['oic.r.refrigeration'],
+                                   'if': ['oic.if.baseline', 'oic.if.a'],
+                                   'rapidFreeze': False})
+            fridge = store.resource('/fridge')
+            fridge.update({'rapidFreeze': True}, {'if': 'oic.if.a'})
+        with ResourceStore(self.path) as store:
+            fridge = store.resources()['/fridge']
+            self.assertTrue(fridge.prop.rapidFreeze)
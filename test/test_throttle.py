@@ -0,0 +1,122 @@
+from time import monotonic
+from unittest import TestCase
+from iotdev.ocf.endpoint import Endpoint
+from iotdev.ocf.http import HttpClientTransport
+from iotdev.ocf.message import Retrieve, Update, Response
+from iotdev.ocf.status import (Content, Changed, TooManyRequests,
+                               ServiceUnavailable, GatewayTimeout)
+from iotdev.ocf.throttle import (ThrottledTransport, RetryPolicy,
+                                 RetryBudget, ConcurrencyLimiter)
+from iotdev.ocf.transport import Transport
+
+
+class ScriptedTransport(Transport):
+
+    schemes = ('test',)
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.calls = []
+
+    def dispatch(self, ep, msg, timeout=None):
+        self.calls.append(monotonic())
+        rsp = self.script.pop(0) if self.script else Response(msg.success)
+        if isinstance(rsp, Exception):
+            raise rsp
+        return rsp
+
+
+class TestThrottle(TestCase):
+
+    ep = Endpoint('test://device')
+
+    def test_retry(self):
+        """Test retry of idempotent requests after overload"""
+        inner = ScriptedTransport(Response(ServiceUnavailable),
+                                  GatewayTimeout())
+        transport = ThrottledTransport(inner, retry=RetryPolicy(base=0.01))
+        rsp = transport.dispatch(self.ep, Retrieve('/x'))
+        self.assertIs(rsp.status, Content)
+        self.assertEqual(len(inner.calls), 3)
+
+    def test_no_retry_update(self):
+        """Test that non-idempotent requests are not retried"""
+        inner = ScriptedTransport(Response(TooManyRequests))
+        transport = ThrottledTransport(inner, retry=RetryPolicy(base=0.01))
+        rsp = transport.dispatch(self.ep, Update('/x', {'value': True}))
+        self.assertIs(rsp.status, TooManyRequests)
+        self.assertEqual(len(inner.calls), 1)
+        self.assertIs(transport.dispatch(self.ep, Update('/x')).status,
+                      Changed)
+
+    def test_retry_after(self):
+        """Test honouring of retry delay"""
+        inner = ScriptedTransport(Response(TooManyRequests, retry_after=0.2))
+        transport = ThrottledTransport(inner, retry=RetryPolicy(base=0.01))
+        transport.dispatch(self.ep, Retrieve('/x'))
+        self.assertGreaterEqual(inner.calls[1] - inner.calls[0], 0.2)
+        inner.script.append(Response(TooManyRequests, retry_after=10))
+        transport.dispatch(self.ep, Update('/x'))
+        with self.assertRaises(GatewayTimeout):
+            transport.dispatch(self.ep, Retrieve('/x'), timeout=0.1)
+
+    def test_max_retry_after(self):
+        """Test bounding of honoured retry delay"""
+        retry = RetryPolicy(base=0.01, max_retry_after=1.0)
+        self.assertIsNone(retry.backoff(1, 1e300))
+        self.assertEqual(retry.backoff(1, 0.5), 0.5)
+        inner = ScriptedTransport(Response(TooManyRequests, retry_after=1e300))
+        transport = ThrottledTransport(inner, retry=retry)
+        start = monotonic()
+        rsp = transport.dispatch(self.ep, Retrieve('/x'))
+        self.assertIs(rsp.status, TooManyRequests)
+        self.assertEqual(len(inner.calls), 1)
+        self.assertLessEqual(transport.throttle(self.ep).paused,
+                             monotonic() + 1.0)
+        self.assertIs(transport.dispatch(self.ep, Retrieve('/x')).status,
+                      Content)
+        self.assertGreaterEqual(inner.calls[1] - start, 0.9)
+
+    def test_budget(self):
+        """Test retry budget"""
+        inner = ScriptedTransport(*[Response(ServiceUnavailable)] * 10)
+        transport = ThrottledTransport(
+            inner, retry=RetryPolicy(attempts=10, base=0.001),
+            budget=RetryBudget(ratio=0.1, reserve=2)
+        )
+        rsp = transport.dispatch(self.ep, Retrieve('/x'))
+        self.assertIs(rsp.status, ServiceUnavailable)
+        self.assertEqual(len(inner.calls), 3)
+
+    def test_rate(self):
+        """Test token bucket rate limiting"""
+        inner = ScriptedTransport()
+        transport = ThrottledTransport(inner, rate=20, burst=2)
+        for _ in range(6):
+            transport.dispatch(self.ep, Retrieve('/x'))
+        self.assertGreaterEqual(inner.calls[-1] - inner.calls[0], 0.19)
+
+    def test_aimd(self):
+        """Test additive increase and multiplicative decrease"""
+        limiter = ConcurrencyLimiter(limit=8)
+        self.assertTrue(limiter.acquire())
+        limiter.release(overloaded=True)
+        self.assertEqual(limiter.limit, 4)
+        for _ in range(8):
+            self.assertTrue(limiter.acquire())
+            limiter.release()
+        self.assertGreater(limiter.limit, 5.5)
+        for _ in range(int(limiter.limit)):
+            limiter.acquire()
+        self.assertFalse(limiter.acquire(timeout=0.01))
+
+    def test_retry_after_header(self):
+        """Test parsing of HTTP Retry-After header"""
+        self.assertEqual(HttpClientTransport.retry_after('120'), 120)
+        self.assertEqual(HttpClientTransport.retry_after(
+            'Wed, 21 Oct 2015 07:28:00 GMT'
+        ), 0)
+        self.assertIsNone(HttpClientTransport.retry_after('soon'))
+        for value in ('inf', 'nan', '1e400', '-inf'):
+            self.assertIsNone(HttpClientTransport.retry_after(value))
+        self.assertIsNone(HttpClientTransport.retry_after(None))
@@ -0,0 +1,151 @@
+from time import monotonic, sleep
+from unittest import TestCase
+from iotdev.ocf import trace
+from iotdev.ocf.coap import CoapMessage, CoapTransport
+from iotdev.ocf.endpoint import Endpoint
+from iotdev.ocf.http import HttpServerTransport
+from iotdev.ocf.message import Retrieve
+from iotdev.ocf.resource import Resource
+from iotdev.ocf.server import Server
+from iotdev.ocf.simulator import Fleet
+from iotdev.ocf.status import Content, GatewayTimeout
+from iotdev.ocf.trace import (NULL_SPAN, MemorySpanExporter, TraceContext,
+                              set_exporter)
+from iotdev.ocf.transport import Transport, Transports
+from . import light
+
+TRACEPARENT = '00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01'
+
+Servers = {}
+
+
+class LoopTransport(Transport):
+
+    schemes = ('loop',)
+
+    def dispatch(self, ep, msg, timeout=None):
+        return Servers[ep.uri].dispatch(msg)
+
+
+Transports.register(LoopTransport())
+
+
+class ProxyResource(Resource):
+
+    def load(self, names, params):
+        rsp = Endpoint('loop://device').dispatch(Retrieve('/light'))
+        self.state['value'] = rsp.state['value']
+
+
+class TestTraceContext(TestCase):
+
+    def test_parse(self):
+        """Test traceparent parsing and formatting"""
+        context = TraceContext.parse(TRACEPARENT)
+        self.assertEqual(str(context), TRACEPARENT)
+        self.assertTrue(context.sampled)
+        self.assertIsNone(TraceContext.parse('00-00-00-00'))
+        self.assertIsNone(TraceContext.parse(TRACEPARENT.replace('4', 'x')))
+        self.assertIsNone(TraceContext.parse(None))
+        child = context.child()
+        self.assertEqual(child.trace_id, context.trace_id)
+        self.assertNotEqual(child.span_id, context.span_id)
+
+    def test_binary(self):
+        """Test binary encoding"""
+        context = TraceContext.new(sampled=False)
+        self.assertEqual(TraceContext.decode(context.encode()), context)
+        self.assertIsNone(TraceContext.decode(b'\x00' * 25))
+
+
+class TestTracing(TestCase):
+
+    def setUp(self):
+        self.device = Servers['loop://device'] = Server()
+        self.device.add('/light', light())
+        self.gateway = Servers['loop://gateway'] = Server()
+        self.gateway.add('/proxy', light(ProxyResource))
+        self.exporter = MemorySpanExporter()
+        self.addCleanup(set_exporter, set_exporter(self.exporter))
+
+    def test_disabled(self):
+        """Test no-op spans when tracing is disabled"""
+        set_exporter(None)
+        msg = Retrieve('/light')
+        self.assertIs(trace.span('handle', msg), NULL_SPAN)
+        self.device.dispatch(msg)
+        self.assertIsNone(msg.trace)
+        self.assertEqual(self.exporter.spans, [])
+
+    def test_propagate(self):
+        """Test propagation of trace context through a gateway"""
+        msg = Retrieve('/proxy', trace=TraceContext.parse(TRACEPARENT))
+        rsp = Endpoint('loop://gateway').dispatch(msg)
+        self.assertIs(rsp.status, Content)
+        spans = self.exporter.spans
+        self.assertEqual([x.name for x in spans],
+                         ['handle', 'send', 'handle', 'send'])
+        self.assertEqual({x.context.trace_id for x in spans},
+                         {msg.trace.trace_id})
+        for child, parent in zip(spans, spans[1:]):
+            self.assertEqual(child.parent, parent.context.span_id)
+        self.assertEqual(spans[-1].parent, 0x00f067aa0ba902b7)
+        self.assertEqual(spans[0].attributes['uri'], '/light')
+        self.assertIs(spans[-1].status, Content)
+        self.assertIsNone(trace.current())
+
+    def test_deadline(self):
+        """Test deadline propagation and early expiry"""
+        msg = Retrieve('/light', deadline=monotonic() - 1)
+        self.assertTrue(msg.expired)
+        self.assertIs(self.device.dispatch(msg).status, GatewayTimeout)
+        self.assertEqual(self.device.expired, 1)
+        with self.assertRaises(GatewayTimeout):
+            Endpoint('loop://device').dispatch(msg)
+        deadline = monotonic() + 5
+        rsp = Endpoint('loop://gateway').dispatch(
+            Retrieve('/proxy', deadline=deadline)
+        )
+        self.assertIs(rsp.status, Content)
+        self.assertIsNone(trace.deadline())
+        self.assertEqual(len(self.exporter.spans), 4)
+
+    def test_coap(self):
+        """Test propagation via CoAP options"""
+        msg = Retrieve('/light', trace=TraceContext.parse(TRACEPARENT),
+                       deadline=monotonic() + 2)
+        coap = CoapMessage.decode(CoapTransport.request_message(msg).encode())
+        received = CoapTransport.request(coap)
+        self.assertEqual(received.trace, msg.trace)
+        self.assertAlmostEqual(received.deadline, msg.deadline, delta=0.1)
+
+    def test_http_headers(self):
+        """Test rejection of invalid remaining time headers"""
+        propagate = HttpServerTransport.propagate
+        for value in ('nan', 'inf', '-inf', 'bogus'):
+            msg = propagate(Retrieve('/light'), {'Request-Timeout': value})
+            self.assertIsNone(msg.deadline)
+        msg = propagate(Retrieve('/light'), {'Request-Timeout': '-5'})
+        self.assertTrue(msg.expired)
+        self.assertGreater(msg.deadline, monotonic() - 1)
+        msg = propagate(Retrieve('/light'), {'Request-Timeout': '2.5'})
+        self.assertAlmostEqual(msg.remaining(), 2.5, delta=0.1)
+
+    def test_http(self):
+        """Test propagation via HTTP headers"""
+        fleet = Fleet(1, {'/light': ['oic.r.switch.binary']}, name='trace',
+                      latency=0.2)
+        self.addCleanup(fleet.close)
+        (ep,) = fleet.serve()
+        rsp = ep.dispatch(Retrieve('/light',
+                                   trace=TraceContext.parse(TRACEPARENT)))
+        self.assertIs(rsp.status, Content)
+        (handle, send) = self.exporter.spans
+        self.assertEqual(handle.parent, send.context.span_id)
+        self.assertEqual(handle.context.trace_id, send.context.trace_id)
+        start = monotonic()
+        with self.assertRaises(GatewayTimeout):
+            ep.dispatch(Retrieve('/light', deadline=monotonic() + 0.1))
+        sleep(0.2)
+        self.assertEqual(fleet.devices[0].expired, 1)
+        self.assertLess(monotonic() - start, 0.5)
@@ -0,0 +1,95 @@
+from threading import Thread
+from unittest import TestCase
+from iotdev.ocf.rt import BinarySwitch, Brightness
+from iotdev.ocf.versioned import VersionedResource, VersionedResourceState
+
+
+class TestVersioned(TestCase):
+
+    def setUp(self):
+        self.light = VersionedResource({
+            'rt': ['oic.r.switch.binary', 'oic.r.light.brightness'],
+            'if': ['oic.if.baseline', 'oic.if.a'],
+            'value': True,
+            'brightness': 0,
+        })
+
+    def test_type(self):
+        """Test use of typed versioned resource"""
+        self.assertIsInstance(self.light.prop, BinarySwitch)
+        self.assertIsInstance(self.light.prop, Brightness)
+        self.light.prop.brightness = 50
+        self.assertEqual(self.light.state['brightness'], 50)
+        self.assertEqual(self.light.state.version, 1)
+        self.assertEqual(self.light.retrieve({'if': 'oic.if.a'}),
+                         {'value': True, 'brightness': 50})
+
+    def test_snapshot(self):
+        """Test that snapshots are unaffected by later updates"""
+        snapshot = self.light.snapshot()
+        self.light.update({'value': False, 'brightness': 10})
+        self.assertIs(snapshot.prop.value, True)
+        self.assertEqual(snapshot.prop.brightness, 0)
+        self.assertIs(self.light.prop.value, False)
+        with self.assertRaises(TypeError):
+            snapshot.prop.value = False
+
+    def test_batch(self):
+        """Test batched writes and rollback"""
+        state = VersionedResourceState({'a': 1})
+        with state.batch():
+            state['a'] = 2
+            state['b'] = 3
+            self.assertEqual(state['b'], 3)
+            self.assertNotIn('b', state.snapshot())
+        self.assertEqual(state.version, 1)
+        self.assertEqual(state.snapshot(), {'a': 2, 'b': 3})
+        with self.assertRaises(ValueError):
+            with state.batch():
+                state['a'] = 4
+                raise ValueError
+        self.assertEqual(state.data, {'a': 2, 'b': 3})
+        self.assertEqual(state.version, 1)
+
+    def test_callbacks(self):
+        """Test callbacks are invoked outside the critical section"""
+        state = VersionedResourceState({'a': 1})
+        seen = []
+
+        def callback():
+            writer = Thread(target=state.__setitem__, args=('b', 2))
+            writer.start()
+            writer.join(1)
+            seen.append(writer.is_alive())
+
+        state.track('a', callback)
+        with state.batch():
+            state['a'] = 2
+            state['a'] = 3
+        state['b'] = 1
+        self.assertEqual(seen, [False])
+
+    def test_concurrent(self):
+        """Test that concurrent retrievals see only complete updates"""
+        done = []
+        errors = []
+
+        def write():
+            for i in range(2000):
+                self.light.update({'value': i % 2 == 0, 'brightness': i})
+            done.append(True)
+
+        def read():
+            while not done:
+                rsp = self.light.retrieve({'if': 'oic.if.a'})
+                if rsp['value'] != (rsp['brightness'] % 2 == 0):
+                    errors.append(rsp)
+
+        threads = [Thread(target=write)] + [Thread(target=read)
+                                            for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(self.light.state.version, 2000)